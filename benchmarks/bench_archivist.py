@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import random
+import tempfile
+import argparse
+import src.archivist as archivist
+
+MODALITIES = [
+    ("Photoreception", "Color Vision"), ("Photoreception", "UV Vision"),
+    ("Mechanoreception", "Hearing"), ("Mechanoreception", "Echolocation"),
+    ("Chemoreception", "Olfaction"), ("Chemoreception", "Gustation"),
+    ("Electroreception", "Passive Electroreception"), ("Magnetoreception", "Magnetic Compass"),
+    ("Thermoreception", "Infrared Sensing"),
+]
+
+def build_synthetic_vault(root, species_count, families_per_order=20, species_per_family=50, seed=7):
+    """Writes a synthetic species + family vault and returns (species_dir, family_dir)."""
+    rng = random.Random(seed)
+    species_dir = os.path.join(root, 'vault')
+    family_dir = os.path.join(root, 'family_vault')
+    os.makedirs(species_dir)
+    os.makedirs(family_dir)
+
+    families = set()
+    for i in range(species_count):
+        family_no = i // species_per_family
+        family = f"Family{family_no}idae"
+        order = f"Order{family_no // families_per_order}"
+        families.add((family, order))
+        record = {
+            "identity": {
+                "common_name": f"Species {i}",
+                "scientific_name": f"Genus{family_no} species{i}",
+                "gbif_id": 1000000 + i,
+                "taxonomy": {"class": "Mammalia", "order": order, "family": family}
+            },
+            "sensory_modalities": [{
+                "modality_domain": domain, "sub_type": sub_type, "stimulus_type": "Synthetic",
+                "quantitative_data": {"min": rng.randint(1, 100), "max": rng.randint(1000, 100000),
+                                      "unit": "Hz", "context": "Physiological Limit"},
+                "evidence": []
+            } for domain, sub_type in rng.sample(MODALITIES, rng.randint(1, 4))],
+            "meta": {"data_quality_flag": "Low_Data"}
+        }
+        with open(os.path.join(species_dir, f"{1000000 + i}_Genus{family_no}_species{i}.json"), 'w') as f:
+            json.dump(record, f)
+
+    for n, (family, order) in enumerate(sorted(families)):
+        profile = {
+            "family_name": family, "order_name": order, "gbif_id": 5000000 + n,
+            "sensory_modalities": {name: {"presence": rng.choice(["common", "rare", "unknown"])}
+                                   for name in ("vision", "hearing", "smell", "electroreception")},
+            "confidence": "LOW", "sources": []
+        }
+        with open(os.path.join(family_dir, f"{5000000 + n}_{family}.json"), 'w') as f:
+            json.dump(profile, f)
+    return species_dir, family_dir
+
+def add_node(c, record_path, node_id, name, node_type):
+    c.execute("INSERT OR IGNORE INTO nodes (id, name, type) VALUES (?, ?, ?)", (node_id, name, node_type))
+    c.execute("INSERT OR IGNORE INTO node_sources (record_path, node_id) VALUES (?, ?)", (record_path, node_id))
+
+def add_edge(c, record_path, source, target, relationship, attributes=None):
+    c.execute("INSERT OR IGNORE INTO edges (source, target, relationship, attributes) VALUES (?, ?, ?, ?)",
+              (source, target, relationship, archivist.attrs_json(attributes)))
+    c.execute("""
+        INSERT OR IGNORE INTO edge_sources (record_path, source, target, relationship)
+        VALUES (?, ?, ?, ?)
+    """, (record_path, source, target, relationship))
+
+def row_at_a_time(species_dir, family_dir):
+    """Per-row INSERT baseline: one INSERT per derived node/edge and its source row."""
+    archivist.init_graph_db(rebuild=True)
+    conn = sqlite3.connect(archivist.DB_PATH)
+    c = conn.cursor()
+    for vault_dir, derive in ((species_dir, archivist.derive_species), (family_dir, archivist.derive_family)):
+        for filename in sorted(os.listdir(vault_dir)):
+            record_path = os.path.join(vault_dir, filename)
+            nodes, edges = derive(archivist.read_record(record_path))
+            for node in nodes:
+                add_node(c, record_path, *node)
+            for source, target, relationship, attr_json in edges:
+                add_edge(c, record_path, source, target, relationship, json.loads(attr_json) if attr_json else None)
+    conn.commit()
+    conn.close()
+
+def graph_size(db_path):
+    conn = sqlite3.connect(db_path)
+    counts = (conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0],
+              conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0])
+    conn.close()
+    return counts
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.2f}s")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark archiving a synthetic species vault.")
+    parser.add_argument("--species", type=int, default=100000, help="Synthetic species records to generate")
+    parser.add_argument("--compare", action="store_true", help="Also time the per-row INSERT baseline")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes for the archivist (default: CPU count)")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic vault and graph on disk")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='umwelt_bench_')
+    try:
+        print(f"🧪 Generating {args.species:,} synthetic species in {root}...")
+        species_dir, family_dir = build_synthetic_vault(root, args.species)
+        archivist.DB_PATH = os.path.join(root, 'graph.db')
+        archivist.SPECIES_VAULT_DIR = species_dir
+        archivist.FAMILY_VAULT_DIR = family_dir
+
+        print("⏱  Archiving:")
+        timed("bulk rebuild", lambda: archivist.GraphArchivist(rebuild=True, workers=args.workers).run())
+        nodes, edges = graph_size(archivist.DB_PATH)
+        timed("incremental no-op", lambda: archivist.GraphArchivist().run())
+        if args.compare:
+            timed("row-at-a-time baseline", lambda: row_at_a_time(species_dir, family_dir))
+        print(f"📊 Graph: {nodes:,} nodes, {edges:,} edges")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,42 @@
 import sqlite3
 import json
 import os
-import glob
-from src.normalizer import MODALITY_MAP
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from src.normalizer import canonical_node, CANONICAL_MODALITIES, print_unmapped
+from src.similarity_index import rebuild_similarity_index, update_similarity_index
+from src.vault_codec import read_record, content_hash
+from src.change_log import changes_since, get_checkpoint, set_checkpoint
 
 DB_PATH = 'data/orchestrator.db'
 SPECIES_VAULT_DIR = 'data/vault'
 FAMILY_VAULT_DIR = 'data/family_vault'
+PARSE_CHUNK_SIZE = 256
+CHANGE_CONSUMER = 'graph_archivist'
 
-def init_graph_db():
+# Bump when the graph tables change shape; older graphs are rebuilt from scratch
+GRAPH_SCHEMA_VERSION = 2
+
+def init_graph_db(rebuild=False):
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("DROP TABLE IF EXISTS nodes")
-    c.execute("DROP TABLE IF EXISTS edges")
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    if rebuild or version != GRAPH_SCHEMA_VERSION:
+        c.execute("DROP TABLE IF EXISTS nodes")
+        c.execute("DROP TABLE IF EXISTS edges")
+        c.execute("DROP TABLE IF EXISTS archive_manifest")
+        c.execute("DROP TABLE IF EXISTS node_sources")
+        c.execute("DROP TABLE IF EXISTS edge_sources")
     c.execute('''
-        CREATE TABLE nodes (
+        CREATE TABLE IF NOT EXISTS nodes (
             id TEXT PRIMARY KEY,
             name TEXT,
-            type TEXT CHECK(type IN ('species', 'family', 'order', 'modality', 'sub_type'))
+            type TEXT CHECK(type IN ('species', 'family', 'order', 'class', 'modality', 'sub_type'))
         )
     ''')
     c.execute('''
-        CREATE TABLE edges (
+        CREATE TABLE IF NOT EXISTS edges (
             source TEXT,
             target TEXT,
             relationship TEXT,
@@ -29,93 +44,376 @@ def init_graph_db():
             PRIMARY KEY (source, target, relationship)
         )
     ''')
+    # Side tables for incremental archiving: what each vault file looked like
+    # when it was archived, and which nodes/edges it contributed.
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS archive_manifest (
+            record_path TEXT PRIMARY KEY,
+            kind TEXT CHECK(kind IN ('species', 'family')),
+            mtime REAL,
+            size INTEGER,
+            content_hash TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS node_sources (
+            record_path TEXT,
+            node_id TEXT,
+            PRIMARY KEY (record_path, node_id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS edge_sources (
+            record_path TEXT,
+            source TEXT,
+            target TEXT,
+            relationship TEXT,
+            PRIMARY KEY (record_path, source, target, relationship)
+        )
+    ''')
+    # Small key/value facts about the archive, e.g. the content hash readers key their caches on
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS graph_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    create_secondary_indexes(c)
+    c.execute(f"PRAGMA user_version = {GRAPH_SCHEMA_VERSION}")
     conn.commit()
     conn.close()
 
-class GraphArchivist:
+# Secondary indexes, dropped during bulk rebuilds and recreated after the load.
+# The graph readers (visualizer, heatmap, sankey) filter on type/name and
+# relationship/target; tests/test_graph_indexes.py guards their query plans.
+SECONDARY_INDEXES = {
+    'idx_nodes_type_name': "CREATE INDEX IF NOT EXISTS idx_nodes_type_name ON nodes(type, name)",
+    'idx_edges_target_relationship': "CREATE INDEX IF NOT EXISTS idx_edges_target_relationship ON edges(target, relationship)",
+    'idx_edges_relationship_target': "CREATE INDEX IF NOT EXISTS idx_edges_relationship_target ON edges(relationship, target)",
+    'idx_node_sources_node': "CREATE INDEX IF NOT EXISTS idx_node_sources_node ON node_sources(node_id)",
+    'idx_edge_sources_edge': "CREATE INDEX IF NOT EXISTS idx_edge_sources_edge ON edge_sources(source, target, relationship)",
+}
+
+def create_secondary_indexes(c):
+    for ddl in SECONDARY_INDEXES.values():
+        c.execute(ddl)
+
+def drop_secondary_indexes(c):
+    for name in SECONDARY_INDEXES:
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+
+# Edge attributes are stored as JSON text; constant ones are serialized once
+SPECIES_SENSE_ATTRS = json.dumps({'source': 'species_data'})
+_PREVALENCE_ATTRS = {}
+
+def prevalence_attrs(presence):
+    if presence not in _PREVALENCE_ATTRS:
+        _PREVALENCE_ATTRS[presence] = json.dumps({'prevalence': presence})
+    return _PREVALENCE_ATTRS[presence]
+
+def attrs_json(attributes):
+    return json.dumps(attributes) if attributes else None
+
+def derive_species(data):
+    """Returns the (nodes, edges) a species record contributes; edge attributes are JSON text."""
+    nodes = []
+    edges = []
+    identity = data.get('identity', {})
+    name = identity.get('common_name') or identity.get('scientific_name')
+    tax = identity.get('taxonomy', {})
+
+    klass = tax.get('class')
+    order = tax.get('order')
+    family = tax.get('family')
+    if klass: nodes.append((f"class:{klass}", klass, 'class'))
+    if order:
+        nodes.append((f"order:{order}", order, 'order'))
+        if klass: edges.append((f"order:{order}", f"class:{klass}", 'MEMBER_OF', None))
+    if family:
+        nodes.append((f"family:{family}", family, 'family'))
+        if order: edges.append((f"family:{family}", f"order:{order}", 'MEMBER_OF', None))
+
+    nodes.append((f"species:{name}", name, 'species'))
+    if family: edges.append((f"species:{name}", f"family:{family}", 'MEMBER_OF', None))
+
+    for mod in data.get('sensory_modalities', []):
+        modality = canonical_node(mod.get('modality_domain'), 'modality')
+        if not modality:
+            continue
+        nodes.append(modality)
+        edges.append((f"species:{name}", modality[0], 'HAS_SENSE', SPECIES_SENSE_ATTRS))
+
+        sub_type = canonical_node(mod.get('sub_type'), 'sub_type')
+        if sub_type and sub_type[0] != modality[0]:
+            nodes.append(sub_type)
+            if sub_type[2] == 'sub_type':
+                edges.append((sub_type[0], modality[0], 'INSTANCE_OF', None))
+            edges.append((f"species:{name}", sub_type[0], 'HAS_SENSE', attrs_json(mod.get('quantitative_data'))))
+    return nodes, edges
+
+def derive_family(data):
+    """Returns the (nodes, edges) a family profile contributes; edge attributes are JSON text."""
+    nodes = []
+    edges = []
+    family = data.get('family_name')
+    order = data.get('order_name')
+    if not family:
+        return nodes, edges
+
+    nodes.append((f"family:{family}", family, 'family'))
+    if order:
+        nodes.append((f"order:{order}", order, 'order'))
+        edges.append((f"family:{family}", f"order:{order}", 'MEMBER_OF', None))
+
+    for mod_name, mod_data in data.get('sensory_modalities', {}).items():
+        if mod_data.get('presence') == 'unknown': continue
+        modality = canonical_node(mod_name, 'modality')
+        if not modality:
+            continue
+        nodes.append(modality)
+        edges.append((f"family:{family}", modality[0], 'HAS_SENSE', prevalence_attrs(mod_data.get('presence'))))
+    return nodes, edges
+
+def record_content_hash(c):
+    """Stores a hash over every archived file's content hash in graph_meta and returns it."""
+    digest = hashlib.sha1(str(GRAPH_SCHEMA_VERSION).encode())
+    for record_path, chash in c.execute("SELECT record_path, content_hash FROM archive_manifest ORDER BY record_path"):
+        digest.update(f"{record_path}\0{chash}\n".encode())
+    c.execute("INSERT OR REPLACE INTO graph_meta (key, value) VALUES ('content_hash', ?)", (digest.hexdigest(),))
+    return digest.hexdigest()
+
+def parse_chunk(args):
+    """Worker entry point: reads and derives a chunk of vault files. Returns one result per path, in order."""
+    kind, paths = args
+    derive = derive_species if kind == 'species' else derive_family
+    results = []
+    for record_path in paths:
+        try:
+            data = read_record(record_path)
+            nodes, edges = derive(data)
+            results.append((record_path, content_hash(data), nodes, edges, None))
+        except Exception as e:
+            results.append((record_path, None, None, None, str(e)))
+    return results
+
+class GraphBulkLoader:
+    """
+    Accumulates node/edge rows in memory and writes them with executemany.
+    Duplicates are resolved in memory with INSERT OR IGNORE semantics
+    (the first row for a key wins), so the database sees each row once.
+    """
     def __init__(self):
-        init_graph_db()
+        self.nodes = {}
+        self.edges = {}
+        self.node_sources = []
+        self.edge_sources = []
+        self.manifest = []
+
+    def add(self, record_path, nodes, edges):
+        for node_id, name, node_type in nodes:
+            self.nodes.setdefault(node_id, (node_id, name, node_type))
+            self.node_sources.append((record_path, node_id))
+        for source, target, relationship, attr_json in edges:
+            self.edges.setdefault((source, target, relationship), (source, target, relationship, attr_json))
+            self.edge_sources.append((record_path, source, target, relationship))
+
+    def add_manifest(self, record_path, kind, mtime, size, chash):
+        self.manifest.append((record_path, kind, mtime, size, chash))
+
+    def flush(self, c):
+        c.executemany("INSERT OR IGNORE INTO nodes (id, name, type) VALUES (?, ?, ?)", self.nodes.values())
+        c.executemany("INSERT OR IGNORE INTO edges (source, target, relationship, attributes) VALUES (?, ?, ?, ?)",
+                      self.edges.values())
+        c.executemany("INSERT OR IGNORE INTO node_sources (record_path, node_id) VALUES (?, ?)", self.node_sources)
+        c.executemany("""
+            INSERT OR IGNORE INTO edge_sources (record_path, source, target, relationship) VALUES (?, ?, ?, ?)
+        """, self.edge_sources)
+        c.executemany("""
+            INSERT OR REPLACE INTO archive_manifest (record_path, kind, mtime, size, content_hash)
+            VALUES (?, ?, ?, ?, ?)
+        """, self.manifest)
+        counts = (len(self.nodes), len(self.edges))
+        self.__init__()
+        return counts
+
+class GraphArchivist:
+    def __init__(self, rebuild=False, workers=None, chunk_size=PARSE_CHUNK_SIZE, full_scan=False):
+        init_graph_db(rebuild=rebuild)
+        self.rebuild = rebuild
+        self.full_scan = full_scan
+        self.workers = workers
+        self.chunk_size = chunk_size
         self.conn = sqlite3.connect(DB_PATH)
         self.c = self.conn.cursor()
+        self.loader = GraphBulkLoader()
+        self.unmapped = Counter()
+        # Species/family nodes whose edges changed this run, for the similarity index
+        self.touched = set()
+
+    def retract(self, record_path):
+        """Removes everything a vault file contributed, keeping nodes/edges other files still support."""
+        self.c.execute("""
+            SELECT source, target, relationship FROM edge_sources WHERE record_path = ?
+        """, (record_path,))
+        edges = self.c.fetchall()
+        self.c.execute("SELECT node_id FROM node_sources WHERE record_path = ?", (record_path,))
+        node_ids = [r[0] for r in self.c.fetchall()]
+        self.touched.update(node_ids)
+
+        self.c.execute("DELETE FROM edge_sources WHERE record_path = ?", (record_path,))
+        self.c.execute("DELETE FROM node_sources WHERE record_path = ?", (record_path,))
+        for edge in edges:
+            self.c.execute("""
+                DELETE FROM edges WHERE source = ? AND target = ? AND relationship = ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM edge_sources s
+                    WHERE s.source = edges.source AND s.target = edges.target AND s.relationship = edges.relationship
+                )
+            """, edge)
+        for node_id in node_ids:
+            self.c.execute("""
+                DELETE FROM nodes WHERE id = ?
+                AND NOT EXISTS (SELECT 1 FROM node_sources s WHERE s.node_id = nodes.id)
+            """, (node_id,))
+        self.c.execute("DELETE FROM archive_manifest WHERE record_path = ?", (record_path,))
 
-    def add_node(self, node_id, name, node_type):
-        self.c.execute("INSERT OR IGNORE INTO nodes (id, name, type) VALUES (?, ?, ?)", 
-                      (node_id, name, node_type))
-
-    def add_edge(self, source, target, relationship, attributes=None):
-        attr_json = json.dumps(attributes) if attributes else None
-        self.c.execute("INSERT OR IGNORE INTO edges (source, target, relationship, attributes) VALUES (?, ?, ?, ?)",
-                      (source, target, relationship, attr_json))
-
-    def process_species(self):
-        files = glob.glob(os.path.join(SPECIES_VAULT_DIR, '*.json'))
-        print(f"Processing {len(files)} species files...")
-        for filepath in files:
-            try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                identity = data.get('identity', {})
-                name = identity.get('common_name') or identity.get('scientific_name')
-                tax = identity.get('taxonomy', {})
-                
-                order = tax.get('order')
-                family = tax.get('family')
-                if order: self.add_node(f"order:{order}", order, 'order')
-                if family:
-                    self.add_node(f"family:{family}", family, 'family')
-                    if order: self.add_edge(f"family:{family}", f"order:{order}", 'MEMBER_OF')
-                
-                self.add_node(f"species:{name}", name, 'species')
-                if family: self.add_edge(f"species:{name}", f"family:{family}", 'MEMBER_OF')
-
-                for mod in data.get('sensory_modalities', []):
-                    domain = MODALITY_MAP.get(mod.get('modality_domain'), mod.get('modality_domain'))
-                    sub_type = MODALITY_MAP.get(mod.get('sub_type'), mod.get('sub_type'))
-                    
-                    if domain:
-                        self.add_node(f"modality:{domain}", domain, 'modality')
-                        self.add_edge(f"species:{name}", f"modality:{domain}", 'HAS_SENSE', 
-                                     attributes={'source': 'species_data'})
-                        if sub_type and sub_type != domain:
-                            self.add_node(f"sub_type:{sub_type}", sub_type, 'sub_type')
-                            self.add_edge(f"sub_type:{sub_type}", f"modality:{domain}", 'INSTANCE_OF')
-                            self.add_edge(f"species:{name}", f"sub_type:{sub_type}", 'HAS_SENSE',
-                                         attributes=mod.get('quantitative_data'))
-            except Exception as e:
-                print(f"Error processing species {filepath}: {e}")
-
-    def process_families(self):
-        files = glob.glob(os.path.join(FAMILY_VAULT_DIR, '*.json'))
-        print(f"Processing {len(files)} family files...")
-        for filepath in files:
-            try:
-                with open(filepath, 'r') as f:
-                    data = json.load(f)
-                family = data.get('family_name')
-                order = data.get('order_name')
-                if not family: continue
-                
-                self.add_node(f"family:{family}", family, 'family')
-                if order:
-                    self.add_node(f"order:{order}", order, 'order')
-                    self.add_edge(f"family:{family}", f"order:{order}", 'MEMBER_OF')
-
-                for mod_name, mod_data in data.get('sensory_modalities', {}).items():
-                    if mod_data.get('presence') == 'unknown': continue
-                    domain = MODALITY_MAP.get(mod_name, mod_name)
-                    self.add_node(f"modality:{domain}", domain, 'modality')
-                    self.add_edge(f"family:{family}", f"modality:{domain}", 'HAS_SENSE', 
-                                 attributes={'prevalence': mod_data.get('presence')})
-            except Exception as e:
-                print(f"Error processing family {filepath}: {e}")
+    def archive_file(self, record_path, kind, nodes, edges, stat, chash):
+        """Queues a file's nodes/edges and manifest entry for the next bulk flush."""
+        self.loader.add(record_path, nodes, edges)
+        self.touched.update(node_id for node_id, _, _ in nodes)
+        self.loader.add_manifest(record_path, kind, stat.st_mtime, stat.st_size, chash)
+
+    def parse_files(self, kind, paths):
+        """
+        Reads and derives vault files, in a process pool when there is more than one chunk.
+        Results come back in input order, so the graph is identical to a serial build.
+        """
+        chunks = [(kind, paths[i:i + self.chunk_size]) for i in range(0, len(paths), self.chunk_size)]
+        if len(chunks) <= 1 or self.workers == 1:
+            for chunk in chunks:
+                yield from parse_chunk(chunk)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for results in pool.map(parse_chunk, chunks):
+                yield from results
+
+    def sync_vault(self, vault_dir, kind, logged=None):
+        """
+        Re-derives only the files that were added, changed or removed since the last archive run.
+        logged: record paths taken from the change log; when given, only those are checked
+        instead of stat-ing every file in the vault.
+        """
+        self.c.execute("SELECT record_path, mtime, size, content_hash FROM archive_manifest WHERE kind = ?", (kind,))
+        manifest = {path: (mtime, size, chash) for path, mtime, size, chash in self.c.fetchall()}
+
+        if logged is None:
+            entries = sorted((e for e in os.scandir(vault_dir) if e.name.endswith('.json')), key=lambda e: e.name)
+            print(f"Processing {len(entries)} {kind} files...")
+            present = {entry.path: entry.stat() for entry in entries}
+            removed = [path for path in manifest if path not in present]
+        else:
+            print(f"Processing {len(logged)} logged {kind} changes...")
+            present = {path: os.stat(path) for path in sorted(logged) if os.path.exists(path)}
+            removed = [path for path in sorted(logged) if path not in present and path in manifest]
+
+        stats = {}
+        for path, stat in present.items():
+            known = manifest.get(path)
+            if not (known and known[0] == stat.st_mtime and known[1] == stat.st_size):
+                stats[path] = stat
+
+        # Parsing runs in parallel; this process is the single writer
+        changed = 0
+        for record_path, chash, nodes, edges, error in self.parse_files(kind, list(stats)):
+            if error:
+                print(f"Error processing {kind} {record_path}: {error}")
+                continue
+            stat = stats[record_path]
+            known = manifest.get(record_path)
+            if known and known[2] == chash:
+                # Touched but not modified
+                self.c.execute("UPDATE archive_manifest SET mtime = ?, size = ? WHERE record_path = ?",
+                              (stat.st_mtime, stat.st_size, record_path))
+                continue
+            if known:
+                self.retract(record_path)
+            self.archive_file(record_path, kind, nodes, edges, stat, chash)
+            self.unmapped.update(name for _, name, node_type in nodes
+                                 if node_type == 'modality' and name not in CANONICAL_MODALITIES)
+            changed += 1
+
+        for record_path in removed:
+            self.retract(record_path)
+        print(f"  {changed} added/changed, {len(removed)} removed, {len(present) - changed} unchanged")
+
+    def pending_changes(self):
+        """
+        Returns (high-water seq, {kind: record paths}) from the change log since this
+        archivist's checkpoint. The paths are None (scan the whole vault) on a rebuild,
+        a forced full scan, or before the first checkpoint exists.
+        """
+        last_seq = get_checkpoint(self.conn, CHANGE_CONSUMER)
+        # Uncollapsed: a folded legacy file and its target share an entity but not a path
+        changes, high_water = changes_since(CHANGE_CONSUMER, collapse=False, conn=self.conn)
+        if self.rebuild or self.full_scan or not last_seq:
+            return high_water, {'species': None, 'family': None}
+        logged = {'species': set(), 'family': set()}
+        for change in changes:
+            if change['record_path']:
+                logged[change['entity_type']].add(change['record_path'])
+        return high_water, logged
+
+    def process_species(self, logged=None):
+        self.sync_vault(SPECIES_VAULT_DIR, 'species', logged)
+
+    def process_families(self, logged=None):
+        self.sync_vault(FAMILY_VAULT_DIR, 'family', logged)
+
+    def begin_rebuild(self):
+        # The graph shares this file with the queues and checkpoints, so the rollback journal
+        # stays on and an interrupted rebuild rolls back cleanly. Only the fsyncs are skipped:
+        # the load is at risk from an OS crash or power loss, not from the process dying.
+        self.c.execute("PRAGMA synchronous = OFF")
+        drop_secondary_indexes(self.c)
+
+    def end_rebuild(self):
+        create_secondary_indexes(self.c)
+        # Fresh statistics so the planner picks the selective indexes
+        self.c.execute("ANALYZE")
+        self.conn.commit()
+        self.c.execute("PRAGMA synchronous = FULL")
 
     def run(self):
-        self.process_species()
-        self.process_families()
+        high_water, logged = self.pending_changes()
+        if self.rebuild:
+            self.begin_rebuild()
+        self.process_species(logged['species'])
+        self.process_families(logged['family'])
+        node_count, edge_count = self.loader.flush(self.c)
+        record_content_hash(self.c)
+        # Advanced in the same transaction as the graph writes it covers
+        set_checkpoint(self.conn, CHANGE_CONSUMER, high_water)
+        if self.rebuild:
+            rebuild_similarity_index(self.conn)
+        else:
+            update_similarity_index(self.conn, self.touched)
+        if self.rebuild:
+            self.end_rebuild()
+        else:
+            self.c.execute("PRAGMA optimize")
         self.conn.commit()
         self.conn.close()
-        print("Archiving complete. Graph ready.")
+        print(f"Archiving complete. Wrote {node_count} nodes and {edge_count} edges. Graph ready.")
+        print_unmapped(self.unmapped)
 
 if __name__ == "__main__":
-    archivist = GraphArchivist()
+    import argparse
+    parser = argparse.ArgumentParser(description="Archive the species and family vaults into the graph tables.")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the graph and rebuild it from every vault file")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--full-scan", action="store_true",
+                        help="Check every vault file instead of only those in the change log (e.g. after manual edits)")
+    args = parser.parse_args()
+
+    archivist = GraphArchivist(rebuild=args.rebuild, workers=args.workers, full_scan=args.full_scan)
     archivist.run()
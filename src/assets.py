@@ -0,0 +1,142 @@
+import os
+import json
+import shutil
+import hashlib
+import urllib.request
+
+# Pinned copies of the JS the dashboards need live here (fetch them once with --fetch)
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vendor')
+# sha256sum-style pins next to the vendored files; the first fetch or import records them
+PINS_FILE = 'SHA256SUMS'
+# Directory next to the generated pages that 'local' mode copies the assets into
+LOCAL_ASSET_DIR = 'assets'
+
+ASSETS = {
+    'd3': ('d3-7.9.0.min.js', 'https://cdn.jsdelivr.net/npm/d3@7.9.0/dist/d3.min.js'),
+    'd3-sankey': ('d3-sankey-0.12.3.min.js', 'https://cdn.jsdelivr.net/npm/d3-sankey@0.12.3/dist/d3-sankey.min.js'),
+}
+
+# cdn: load from the CDN at view time; inline: embed the vendored copy in each page;
+# local: copy the vendored copy next to the pages once and share it between them
+ASSET_MODES = ('cdn', 'inline', 'local')
+ASSET_MODE = 'cdn'
+
+def load_pins():
+    path = os.path.join(ASSET_DIR, PINS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {filename: digest for digest, filename in (line.split() for line in f if line.strip())}
+
+def save_pins(pins):
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    with open(os.path.join(ASSET_DIR, PINS_FILE), 'w', encoding='utf-8') as f:
+        for filename in sorted(pins):
+            f.write(f"{pins[filename]}  {filename}\n")
+
+def check_pin(filename, body, pins):
+    """Raises ValueError when body does not match the recorded sha256 for filename."""
+    digest = hashlib.sha256(body).hexdigest()
+    if filename in pins and pins[filename] != digest:
+        raise ValueError(f"{filename} does not match its pinned sha256 ({digest} != {pins[filename]})")
+    return digest
+
+def read_vendored(name):
+    """The verified bytes of a vendored asset, or None when it has not been fetched yet."""
+    filename = ASSETS[name][0]
+    path = os.path.join(ASSET_DIR, filename)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        body = f.read()
+    check_pin(filename, body, load_pins())
+    return body
+
+def script_tags(names, output_file, mode=None):
+    """Returns the <script> tags that load the named assets for a page written to output_file."""
+    mode = mode or ASSET_MODE
+    if mode not in ASSET_MODES:
+        raise ValueError(f"Unknown asset mode: {mode} (choose from {', '.join(ASSET_MODES)})")
+    tags = []
+    for name in names:
+        filename, url = ASSETS[name]
+        body = None if mode == 'cdn' else read_vendored(name)
+        if mode != 'cdn' and body is None:
+            # Better a page that needs the network than no page at all
+            print(f"⚠️ {filename} is not vendored in {ASSET_DIR}; loading it from the CDN. "
+                  f"Run `python -m src.assets --fetch` on a connected machine (or --import DIR).")
+        if body is None:
+            tags.append(f'<script src="{url}"></script>')
+        elif mode == 'inline':
+            # A literal </script> inside the code would end the tag early
+            code = body.decode('utf-8').replace('</script', '<\\/script')
+            tags.append(f"<script>{code}</script>")
+        else:
+            out_dir = os.path.join(os.path.dirname(output_file), LOCAL_ASSET_DIR)
+            target = os.path.join(out_dir, filename)
+            current = None
+            if os.path.exists(target):
+                with open(target, 'rb') as f:
+                    current = f.read()
+            if current != body:
+                os.makedirs(out_dir, exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(body)
+            tags.append(f'<script src="{LOCAL_ASSET_DIR}/{filename}"></script>')
+    return '\n    '.join(tags)
+
+def inline_json(data):
+    """Compact JSON that is safe to embed in a <script> block."""
+    return json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+
+def store_asset(filename, body, pins):
+    """Writes a vendored file once it matches its pin, recording a pin for new files."""
+    pins[filename] = check_pin(filename, body, pins)
+    path = os.path.join(ASSET_DIR, filename)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(body)
+    os.replace(path + '.tmp', path)
+
+def fetch_assets():
+    """Downloads the pinned assets into ASSET_DIR, refusing any that do not match their sha256."""
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    pins = load_pins()
+    for filename, url in ASSETS.values():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            body = response.read()
+        store_asset(filename, body, pins)
+        print(f"📦 {filename} ({len(body) // 1024} KB)")
+    save_pins(pins)
+
+def import_assets(source_dir):
+    """Copies assets from a directory holding either the pinned filenames or the upstream ones."""
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    pins = load_pins()
+    for filename, url in ASSETS.values():
+        for candidate in (filename, url.rsplit('/', 1)[1]):
+            path = os.path.join(source_dir, candidate)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    store_asset(filename, f.read(), pins)
+                print(f"📦 {filename} <- {path}")
+                break
+        else:
+            print(f"⚠️ Neither {filename} nor {url.rsplit('/', 1)[1]} found in {source_dir}")
+    save_pins(pins)
+
+def add_asset_argument(parser):
+    """The --assets option shared by the page generators."""
+    parser.add_argument("--assets", choices=ASSET_MODES, default=ASSET_MODE,
+                        help="How pages load their JS: from the CDN, inlined, or from a shared local copy")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Vendor the JS libraries the dashboards use, for offline viewing.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--fetch", action="store_true", help="Download the pinned versions")
+    group.add_argument("--import", dest="source", metavar="DIR", help="Copy them from a local directory")
+    args = parser.parse_args()
+    if args.fetch:
+        fetch_assets()
+    else:
+        import_assets(args.source)
@@ -0,0 +1,153 @@
+import sqlite3
+from src.vault_codec import content_hash
+
+DB_PATH = 'data/orchestrator.db'
+
+OPS = ('UPSERT', 'DELETE')
+
+def init_change_log(conn):
+    """Creates the sequence-numbered change log and the per-consumer checkpoint table."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS vault_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity_type TEXT CHECK(entity_type IN ('species', 'family')),
+            entity_id TEXT,
+            op TEXT CHECK(op IN ('UPSERT', 'DELETE')),
+            content_hash TEXT,
+            record_path TEXT,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_vault_changes_entity ON vault_changes(entity_type, entity_id)")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS change_checkpoints (
+            consumer TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def append_changes(conn, changes):
+    """
+    Appends changes within the caller's transaction and returns the last sequence number.
+    changes: iterable of (entity_type, entity_id, op, content_hash, record_path).
+    """
+    init_change_log(conn)
+    c = conn.cursor()
+    c.executemany("""
+        INSERT INTO vault_changes (entity_type, entity_id, op, content_hash, record_path)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(etype, str(eid), op, chash, path) for etype, eid, op, chash, path in changes])
+    return c.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+def record_change(entity_type, entity_id, op, record_path=None, data=None, db_path=DB_PATH, conn=None):
+    """
+    Durably appends one change and returns its sequence number.
+    With conn the append joins the caller's transaction and the caller commits.
+    """
+    if op not in OPS:
+        raise ValueError(f"Unknown change op: {op}")
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        chash = content_hash(data) if data is not None else None
+        seq = append_changes(conn, [(entity_type, entity_id, op, chash, record_path)])
+        if own_conn:
+            conn.commit()
+        return seq
+    finally:
+        if own_conn:
+            conn.close()
+
+def record_changes(changes, db_path=DB_PATH):
+    """Durably appends a batch of changes in a single transaction."""
+    changes = list(changes)
+    if not changes:
+        return
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        append_changes(conn, changes)
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_checkpoint(conn, consumer):
+    init_change_log(conn)
+    row = conn.execute("SELECT last_seq FROM change_checkpoints WHERE consumer = ?", (consumer,)).fetchone()
+    return row[0] if row else 0
+
+def set_checkpoint(conn, consumer, seq):
+    init_change_log(conn)
+    conn.execute("""
+        INSERT INTO change_checkpoints (consumer, last_seq, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(consumer) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at
+    """, (consumer, seq))
+
+def changes_since(consumer, db_path=DB_PATH, collapse=True, conn=None):
+    """
+    Returns (changes, high_water_seq) for everything after the consumer's checkpoint.
+    With collapse=True only the latest change per entity is returned, so
+    consumers process each entity once no matter how often it was rewritten.
+    With conn the read uses the caller's connection, e.g. to advance the
+    checkpoint in the same transaction as the work it covers.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        last_seq = get_checkpoint(conn, consumer)
+        c = conn.cursor()
+        # Fix the high-water mark first so concurrent appends are left for the next call
+        high_water = c.execute("SELECT COALESCE(MAX(seq), 0) FROM vault_changes").fetchone()[0]
+        if collapse:
+            c.execute("""
+                SELECT seq, entity_type, entity_id, op, content_hash, record_path
+                FROM vault_changes
+                WHERE seq IN (
+                    SELECT MAX(seq) FROM vault_changes
+                    WHERE seq > ? AND seq <= ?
+                    GROUP BY entity_type, entity_id
+                )
+                ORDER BY seq
+            """, (last_seq, high_water))
+        else:
+            c.execute("""
+                SELECT seq, entity_type, entity_id, op, content_hash, record_path
+                FROM vault_changes WHERE seq > ? AND seq <= ? ORDER BY seq
+            """, (last_seq, high_water))
+        rows = [{
+            "seq": seq, "entity_type": etype, "entity_id": eid, "op": op,
+            "content_hash": chash, "record_path": path
+        } for seq, etype, eid, op, chash, path in c.fetchall()]
+        if own_conn:
+            conn.commit()
+        return rows, max(high_water, last_seq)
+    finally:
+        if own_conn:
+            conn.close()
+
+def commit_checkpoint(consumer, seq, db_path=DB_PATH):
+    """Marks every change up to seq as processed by the consumer."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        set_checkpoint(conn, consumer, seq)
+        conn.commit()
+    finally:
+        conn.close()
+
+def print_status(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        init_change_log(conn)
+        head = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM vault_changes").fetchone()[0]
+        print(f"📜 Change log head: seq {head}")
+        for consumer, last_seq in conn.execute("SELECT consumer, last_seq FROM change_checkpoints ORDER BY consumer"):
+            print(f"  {consumer}: seq {last_seq} ({head - last_seq} behind)")
+        conn.commit()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    print_status()
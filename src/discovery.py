@@ -1,40 +1,27 @@
-import requests
 import sqlite3
 import os
 import json
+from src.http_client import PooledClient
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB, drop_extinct
+from src.scout_checkpoints import Checkpoints
 
 DB_PATH = 'data/orchestrator.db'
 ANIMALIA_KEY = 1
 
+api_client = PooledClient()
+# Taxonomy queries go here; --backbone swaps in a local snapshot
+client = api_client
+
 def get_all_orders():
-    """Fetches all accepted orders under Animalia."""
+    """Fetches all accepted, living orders under Animalia."""
     print("📡 Fetching all orders in Animalia...")
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": ANIMALIA_KEY,
-        "rank": "ORDER",
-        "status": "ACCEPTED",
-        "limit": 1000  # We know there are ~644
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    data = response.json()
-    return data.get("results", [])
+    params = dict(higherTaxonKey=ANIMALIA_KEY, rank="ORDER", status="ACCEPTED")
+    return drop_extinct(client.gbif_all(**params), client, api_client, **params)
 
 def get_top_families_for_order(order_key, limit=10):
     """Fetches top families for a given order, ranked by number of descendants."""
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": order_key,
-        "rank": "FAMILY",
-        "status": "ACCEPTED",
-        "limit": 100 # Fetch a pool to sort
-    }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        families = data.get("results", [])
+        families = client.gbif_all(higherTaxonKey=order_key, rank="FAMILY", status="ACCEPTED")
         # Sort by numDescendants descending
         families.sort(key=lambda x: x.get("numDescendants", 0), reverse=True)
         return families[:limit]
@@ -44,25 +31,16 @@ def get_top_families_for_order(order_key, limit=10):
 
 def get_representative_species(family_key):
     """Fetches the most 'prominent' species for a family."""
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": family_key,
-        "rank": "SPECIES",
-        "status": "ACCEPTED",
-        "limit": 1
-    }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("results", [])
+        results = client.gbif_search(higherTaxonKey=family_key, rank="SPECIES", status="ACCEPTED",
+                                     limit=1).get("results", [])
         if results:
             return results[0]
     except Exception as e:
         print(f"  ❌ Error fetching species for family {family_key}: {e}")
     return None
 
-def main(sample_only=True):
+def main(sample_only=True, restart=False):
     orders = get_all_orders()
     print(f"✅ Found {len(orders)} orders.")
     
@@ -72,11 +50,20 @@ def main(sample_only=True):
 
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
+    # Each finished order is checkpointed with its queue rows, so a rerun resumes after it
+    checkpoints = Checkpoints(conn, "discovery")
+    if restart:
+        checkpoints.reset()
+    completed = checkpoints.completed()
+    if completed:
+        print(f"⏩ Resuming: skipping {len(completed)} orders finished by an earlier run.")
 
     total_added = 0
     for order in orders:
         order_name = order.get("canonicalName")
         order_key = order.get("key")
+        if str(order_key) in completed:
+            continue
         print(f"\n🌿 Processing Order: {order_name} ({order_key})")
         
         families = get_top_families_for_order(order_key)
@@ -104,7 +91,9 @@ def main(sample_only=True):
             else:
                 print(f"    ⚠️ No representative species found for family: {family_name}")
 
-    conn.commit()
+        if families:
+            checkpoints.complete(order_key)
+        conn.commit()
     conn.close()
     print(f"\n✨ Discovery complete. Added {total_added} new items to the research queue.")
 
@@ -112,6 +101,10 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--full", action="store_true", help="Run for all orders (default is sample of 5)")
+    parser.add_argument("--restart", action="store_true", help="Forget checkpoints and process every order again")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Query a local GBIF backbone snapshot instead of the API")
     args = parser.parse_args()
+    if args.backbone:
+        client = LocalBackbone(args.backbone)
     
-    main(sample_only=not args.full)
+    main(sample_only=not args.full, restart=args.restart)
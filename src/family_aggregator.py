@@ -1,11 +1,76 @@
 import os
-import json
 import sqlite3
+from src.change_log import record_change
 from src.models import FamilySensoryProfile
+from src.normalizer import canonical_modality
+from src.range_merge import merge_family_ranges, index_record, family_key, family_ranges
+from src.species_index import species_for_family
+from src.vault_codec import read_record, write_record
 
 DB_PATH = 'data/orchestrator.db'
 FAMILY_VAULT_DIR = 'data/family_vault'
 
+NOTE_SEPARATOR = " | "
+
+def merge_notes(existing_note, new_note):
+    """Joins notes with ' | ', keeping each distinct segment once."""
+    segments = []
+    seen = set()
+    for note in (existing_note or '', new_note or ''):
+        for segment in note.split(NOTE_SEPARATOR):
+            segment = segment.strip()
+            key = ' '.join(segment.lower().split())
+            if segment and key not in seen:
+                seen.add(key)
+                segments.append(segment)
+    return NOTE_SEPARATOR.join(segments)
+
+def merge_profile_dicts(existing_dict, new_dict):
+    """Merges a newer family profile dict into an existing one (in place)."""
+    run_label = new_dict['sources'][0] if new_dict.get('sources') else str(new_dict.get('generated_at'))
+
+    # 1. Update basic fields if they are missing in existing
+    for key in ['gbif_id', 'order_name']:
+        if not existing_dict.get(key) and new_dict.get(key):
+            existing_dict[key] = new_dict[key]
+
+    # 2. Merge Sensory Modalities
+    existing_modalities = existing_dict.get('sensory_modalities', {})
+    for mod_name, new_mod_data in new_dict.get('sensory_modalities', {}).items():
+        if mod_name not in existing_modalities:
+            existing_modalities[mod_name] = new_mod_data
+        else:
+            # Merge existing modality data
+            existing_mod = existing_modalities[mod_name]
+
+            # Merge inferred_from_species
+            existing_reps = set(existing_mod.get('inferred_from_species', []))
+            new_reps = set(new_mod_data.get('inferred_from_species', []))
+            existing_mod['inferred_from_species'] = sorted(existing_reps.union(new_reps))
+
+            # Append notes if they are different
+            merged_note = merge_notes(existing_mod.get('notes', ''), new_mod_data.get('notes', ''))
+            if merged_note:
+                existing_mod['notes'] = merged_note
+
+            # Prefer higher presence confidence or just keep existing if it's 'common'
+            if new_mod_data.get('presence') == 'common':
+                existing_mod['presence'] = 'common'
+
+            # Merge frequency ranges (union/intersection plus per-source bounds)
+            merge_family_ranges(existing_mod, new_mod_data, source=run_label)
+    existing_dict['sensory_modalities'] = existing_modalities
+
+    # 3. Merge Sources
+    existing_sources = set(existing_dict.get('sources', []))
+    new_sources = set(new_dict.get('sources', []))
+    existing_dict['sources'] = sorted(existing_sources.union(new_sources))
+
+    # 4. Update metadata
+    if new_dict.get('generated_at'):
+        existing_dict['generated_at'] = new_dict['generated_at']
+    return existing_dict
+
 class FamilyAggregator:
     def __init__(self):
         os.makedirs(FAMILY_VAULT_DIR, exist_ok=True)
@@ -18,92 +83,57 @@ class FamilyAggregator:
             
         filepath = os.path.join(FAMILY_VAULT_DIR, filename)
         
-        # Cross-link with species data if available
-        profile = self.augment_with_species_links(profile)
-        
         if os.path.exists(filepath):
             print(f"  📂 Existing family profile found for {profile.family_name}. Merging...")
-            with open(filepath, 'r') as f:
-                existing_dict = json.load(f)
-            
-            new_dict = profile.model_dump()
-            
-            # 1. Update basic fields if they are missing in existing
-            for key in ['gbif_id', 'order_name']:
-                if not existing_dict.get(key) and new_dict.get(key):
-                    existing_dict[key] = new_dict[key]
-            
-            # 2. Merge Sensory Modalities
-            existing_modalities = existing_dict.get('sensory_modalities', {})
-            for mod_name, new_mod_data in new_dict.get('sensory_modalities', {}).items():
-                if mod_name not in existing_modalities:
-                    existing_modalities[mod_name] = new_mod_data
-                else:
-                    # Merge existing modality data
-                    existing_mod = existing_modalities[mod_name]
-                    
-                    # Merge inferred_from_species
-                    existing_reps = set(existing_mod.get('inferred_from_species', []))
-                    new_reps = set(new_mod_data.get('inferred_from_species', []))
-                    existing_mod['inferred_from_species'] = list(existing_reps.union(new_reps))
-                    
-                    # Append notes if they are different
-                    new_note = new_mod_data.get('notes', '')
-                    if new_note and new_note not in existing_mod.get('notes', ''):
-                        existing_mod['notes'] = (existing_mod.get('notes', '') + " | " + new_note).strip(" | ")
-                    
-                    # Prefer higher presence confidence or just keep existing if it's 'common'
-                    if new_mod_data.get('presence') == 'common':
-                        existing_mod['presence'] = 'common'
-                    
-                    # Update frequency range if new one is more expansive (simplified)
-                    # (In a real system we'd do more complex range merging)
-            
-            # 3. Merge Sources
-            existing_sources = set(existing_dict.get('sources', []))
-            new_sources = set(new_dict.get('sources', []))
-            existing_dict['sources'] = list(existing_sources.union(new_sources))
-            
-            # 4. Update metadata
-            existing_dict['generated_at'] = new_dict['generated_at']
-            
+            existing_dict = merge_profile_dicts(read_record(filepath), profile.model_dump())
             final_data = FamilySensoryProfile(**existing_dict)
         else:
             final_data = profile
 
-        with open(filepath, 'w') as f:
-            f.write(final_data.model_dump_json(indent=2))
+        # One connection serves the species lookup, the range index and the change log
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        try:
+            # Cross-link with species data (after merging, so every modality is linked)
+            final_data = self.augment_with_species_links(final_data, conn=conn)
+
+            final_dict = final_data.model_dump(mode='json')
+            write_record(filepath, final_dict)
+            entity_id = family_key(final_dict)
+            index_record('family', entity_id, family_ranges(final_dict), conn=conn)
+            record_change('family', entity_id, 'UPSERT', record_path=filepath, data=final_dict, conn=conn)
+            conn.commit()
+        finally:
+            conn.close()
         print(f"📁 Family profile saved to {filepath}")
 
-    def augment_with_species_links(self, profile: FamilySensoryProfile):
-        """Find species in our vault that belong to this family and add them as supporting data."""
-        # This is a placeholder for future cross-linking logic
-        # For now, we'll check the DB for processed species in this family
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
+    def augment_with_species_links(self, profile: FamilySensoryProfile, conn=None):
+        """Attach species in our vault that belong to this family as supporting data."""
         try:
-            # Look for species in this family that have been COMPLETED
-            # We don't have family in the research_queue table yet, but we can search for it in GBIF_Expansion_...
-            # Actually, let's just use the taxonomy_source which often contains the family name
-            family_pattern = f"%{profile.family_name}%"
-            c.execute("""
-                SELECT animal_name 
-                FROM research_queue 
-                WHERE status = 'COMPLETED' 
-                AND taxonomy_source LIKE ?
-            """, (family_pattern,))
-            species = [r[0] for r in c.fetchall()]
-            
-            # If we find species, we could add them to the profile metadata or specific modalities
-            # For now, let's just log it.
-            if species:
-                print(f"  🔗 Linked {len(species)} species records to {profile.family_name}")
+            species = species_for_family(profile.family_name, db_path=DB_PATH, conn=conn)
         except Exception as e:
             print(f"  ⚠ Cross-linking failed: {e}")
-        finally:
-            conn.close()
-            
+            return profile
+
+        profile.supporting_species = [
+            {
+                "gbif_id": s["gbif_id"],
+                "scientific_name": s["scientific_name"],
+                "modalities": s["modalities"]
+            }
+            for s in species
+        ]
+
+        # Link each family-level modality to the species that claim the same canonical domain
+        for mod_name, mod_data in profile.sensory_modalities.items():
+            domain = canonical_modality(mod_name)
+            mod_data['supporting_species'] = [
+                s["gbif_id"] or s["scientific_name"]
+                for s in profile.supporting_species
+                if any(m.get("modality_domain") == domain for m in s["modalities"])
+            ]
+
+        if species:
+            print(f"  🔗 Linked {len(species)} species records to {profile.family_name}")
         return profile
 
 if __name__ == "__main__":
@@ -1,43 +1,90 @@
 import sqlite3
 import re
+import json
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from src.http_client import PooledClient
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB
 
 DB_PATH = 'data/orchestrator.db'
+WORKERS = 8
+RESOLVE_BATCH = 200 # Families resolved and written per transaction
+REPRESENTATIVES = 3
+SOURCE_PATTERN = re.compile(r"Sampler: (.*?) > (.*?) \(")
 
-def bulk_enqueue():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    print("🔍 Extracting unique families from species queue...")
-    c.execute("SELECT DISTINCT taxonomy_source FROM research_queue WHERE taxonomy_source LIKE 'Sampler%'")
-    sources = [r[0] for r in c.fetchall()]
-    
-    pattern = r"Sampler: (.*?) > (.*?) \("
-    
-    families_to_enqueue = {}
-    for source in sources:
-        match = re.search(pattern, source)
+def sampled_families(conn):
+    """{family: order} for every family the sampler drew species from."""
+    families = {}
+    for (source,) in conn.execute(
+            "SELECT DISTINCT taxonomy_source FROM research_queue WHERE taxonomy_source LIKE 'Sampler%'"):
+        match = SOURCE_PATTERN.search(source)
         if match:
-            order = match.group(1).strip()
-            family = match.group(2).strip()
-            families_to_enqueue[family] = order
-
-    print(f"📦 Found {len(families_to_enqueue)} families. Enqueuing...")
-    
-    count = 0
-    for family, order in families_to_enqueue.items():
-        try:
-            # We skip GBIF ID and reps here; Researcher will handle it
-            c.execute("""
-                INSERT INTO family_research_queue (family_name, order_name, status, priority)
-                VALUES (?, ?, 'PENDING', 5)
-            """, (family, order))
-            count += 1
-        except sqlite3.IntegrityError:
-            pass # Already exists
-            
-    conn.commit()
+            families[match.group(2).strip()] = match.group(1).strip()
+    return families
+
+def resolve_family(gbif, family_name, order_name=None):
+    """
+    (gbif_id, representative species) for a family, as FamilyResearcher would resolve it.
+    Failures give (None, []) so the researcher can still try again at research time.
+    """
+    try:
+        data = gbif.gbif_match(name=family_name, rank="FAMILY", kingdom="Animalia", order=order_name, strict=True)
+        gbif_id = data.get("usageKey") if data.get("matchType") != "NONE" else None
+        if not gbif_id:
+            return None, []
+        results = gbif.gbif_search(higherTaxonKey=gbif_id, rank="SPECIES", status="ACCEPTED",
+                                   limit=REPRESENTATIVES).get("results", [])
+        return gbif_id, [s["canonicalName"] for s in results if "canonicalName" in s]
+    except requests.RequestException as e:
+        print(f"  ⚠ Could not resolve {family_name}: {e}")
+        return None, []
+
+def bulk_enqueue(gbif=None, workers=WORKERS):
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+
+    print("🔍 Extracting unique families from species queue...")
+    families = sampled_families(conn)
+    # Rows queued earlier without metadata get it filled in while they are still pending
+    resolved = {name for (name,) in conn.execute(
+        "SELECT family_name FROM family_research_queue WHERE gbif_id IS NOT NULL OR status != 'PENDING'")}
+    todo = [(family, order) for family, order in families.items() if family not in resolved]
+    print(f"📦 Found {len(families)} families, {len(todo)} to resolve and enqueue...")
+
+    gbif = gbif or PooledClient()
+    added = 0
+    backfilled = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for start in range(0, len(todo), RESOLVE_BATCH):
+            batch = todo[start:start + RESOLVE_BATCH]
+            metadata = pool.map(lambda fo: resolve_family(gbif, *fo), batch)
+            rows = [(family, gbif_id, order, json.dumps(reps) if reps else None)
+                    for (family, order), (gbif_id, reps) in zip(batch, metadata)]
+
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT INTO family_research_queue (family_name, gbif_id, order_name, representative_species, status, priority)
+                VALUES (?, ?, ?, ?, 'PENDING', 5)
+                ON CONFLICT(family_name) DO NOTHING
+            """, rows)
+            added += conn.total_changes - before
+            before = conn.total_changes
+            conn.executemany("""
+                UPDATE family_research_queue
+                SET gbif_id = ?, representative_species = COALESCE(representative_species, ?)
+                WHERE family_name = ? AND gbif_id IS NULL AND status = 'PENDING'
+            """, [(gbif_id, reps, family) for family, gbif_id, _, reps in rows if gbif_id])
+            backfilled += conn.total_changes - before
+            conn.commit()
+            print(f"  ✅ {start + len(batch)}/{len(todo)} resolved")
+
     conn.close()
-    print(f"✨ Bulk enqueue complete. Added {count} families to the queue instantly.")
+    print(f"✨ Bulk enqueue complete. Added {added} families and filled in metadata for {backfilled} queued ones.")
 
 if __name__ == "__main__":
-    bulk_enqueue()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Enqueue every sampled family for family-level research.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent GBIF lookups (default: %(default)s)")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Resolve from a local GBIF backbone snapshot")
+    args = parser.parse_args()
+
+    bulk_enqueue(gbif=LocalBackbone(args.backbone) if args.backbone else None, workers=args.workers)
@@ -4,13 +4,14 @@ import time
 import os
 from src.family_researcher import FamilyResearcher
 from src.family_aggregator import FamilyAggregator
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB
 
 DB_PATH = 'data/orchestrator.db'
 SLEEP_BETWEEN_JOBS = 4 # Seconds, to stay under 15 RPM (60/15 = 4)
 
 class FamilyOrchestrator:
-    def __init__(self):
-        self.researcher = FamilyResearcher()
+    def __init__(self, gbif=None):
+        self.researcher = FamilyResearcher(gbif=gbif)
         self.aggregator = FamilyAggregator()
 
     def get_next_job(self):
@@ -70,5 +71,10 @@ class FamilyOrchestrator:
                 time.sleep(60)
 
 if __name__ == "__main__":
-    orchestrator = FamilyOrchestrator()
+    import argparse
+    parser = argparse.ArgumentParser(description="Research queued families.")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Resolve GBIF metadata from a local backbone snapshot")
+    args = parser.parse_args()
+
+    orchestrator = FamilyOrchestrator(gbif=LocalBackbone(args.backbone) if args.backbone else None)
     orchestrator.run_loop()
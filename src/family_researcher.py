@@ -1,9 +1,9 @@
 import os
 import json
 import wikipediaapi
-import requests
 from src.models import FamilySensoryProfile
 from src.gemini_adapter import GeminiAdapter
+from src.http_client import PooledClient
 
 WIKI_USER_AGENT = "UmweltProject/1.0 (contact@example.com)"
 
@@ -40,28 +40,26 @@ No markdown. Just pure JSON.
 """
 
 class FamilyResearcher:
-    def __init__(self):
+    def __init__(self, gbif=None):
+        # PooledClient for the live API, or a LocalBackbone snapshot
+        self.gbif = gbif or PooledClient()
         self.wiki = wikipediaapi.Wikipedia(user_agent=WIKI_USER_AGENT, language='en')
         self.adapter = GeminiAdapter()
 
     def resolve_family_metadata(self, family_name):
         """Fetch GBIF ID and representative species on the fly."""
         print(f"  🌐 Resolving metadata for {family_name}...")
-        url = "https://api.gbif.org/v1/species/match"
-        params = {"name": family_name, "rank": "FAMILY", "strict": True}
         gbif_id = None
         reps = []
         try:
-            resp = requests.get(url, params=params)
-            data = resp.json()
+            data = self.gbif.gbif_match(name=family_name, rank="FAMILY", strict=True)
             gbif_id = data.get("usageKey")
             
             if gbif_id:
                 # Get reps
-                search_url = "https://api.gbif.org/v1/species/search"
-                search_params = {"higherTaxonKey": gbif_id, "rank": "SPECIES", "status": "ACCEPTED", "limit": 3}
-                s_resp = requests.get(search_url, params=search_params)
-                reps = [s.get("canonicalName") for s in s_resp.json().get("results", []) if "canonicalName" in s]
+                results = self.gbif.gbif_search(higherTaxonKey=gbif_id, rank="SPECIES", status="ACCEPTED",
+                                                limit=3).get("results", [])
+                reps = [s.get("canonicalName") for s in results if "canonicalName" in s]
         except Exception as e:
             print(f"  ⚠ Metadata resolution error: {e}")
             
@@ -1,37 +1,28 @@
-import requests
 import sqlite3
 import os
 import json
 from src.models import TaxonFamily
+from src.http_client import PooledClient
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB
 
 DB_PATH = 'data/orchestrator.db'
 ANIMALIA_KEY = 1
 
+client = PooledClient()
+
 def get_families_for_order(order_name, limit=10):
-# ... (rest of the function stays same)
     """Query GBIF for families within an order, ranked by species count."""
     print(f"🔭 Searching for families in order: {order_name}")
     
     # 1. Resolve order key
-    url = "https://api.gbif.org/v1/species/match"
-    params = {"name": order_name, "rank": "ORDER", "strict": True}
-    resp = requests.get(url, params=params)
-    data = resp.json()
+    data = client.gbif_match(name=order_name, rank="ORDER", strict=True)
     if data.get("matchType") == "NONE":
         print(f"  ⚠ Could not find GBIF match for order: {order_name}")
         return []
     order_key = data.get("usageKey")
 
-    # 2. Get families
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": order_key,
-        "rank": "FAMILY",
-        "status": "ACCEPTED",
-        "limit": 100
-    }
-    resp = requests.get(url, params=params)
-    families = resp.json().get("results", [])
+    # 2. Get families, all pages of them, so big orders are ranked in full
+    families = client.gbif_all(higherTaxonKey=order_key, rank="FAMILY", status="ACCEPTED")
     
     # Sort by species count (numDescendants)
     families.sort(key=lambda x: x.get("numDescendants", 0), reverse=True)
@@ -39,15 +30,9 @@ def get_families_for_order(order_name, limit=10):
 
 def get_representative_species(family_key, limit=3):
     """Get top N species for a family to use as research context."""
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": family_key,
-        "rank": "SPECIES",
-        "status": "ACCEPTED",
-        "limit": limit
-    }
-    resp = requests.get(url, params=params)
-    return [s.get("canonicalName") for s in resp.json().get("results", []) if "canonicalName" in s]
+    results = client.gbif_search(higherTaxonKey=family_key, rank="SPECIES", status="ACCEPTED",
+                                 limit=limit).get("results", [])
+    return [s.get("canonicalName") for s in results if "canonicalName" in s]
 
 def enqueue_families(order_name, limit=5):
     families = get_families_for_order(order_name, limit=limit)
@@ -82,6 +67,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Discover and enqueue families for research.")
     parser.add_argument("order", type=str, help="Order name (e.g. Cetacea)")
     parser.add_argument("--limit", type=int, default=5, help="Number of families to enqueue")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Query a local GBIF backbone snapshot instead of the API")
     
     args = parser.parse_args()
+    if args.backbone:
+        client = LocalBackbone(args.backbone)
     enqueue_families(args.order, limit=args.limit)
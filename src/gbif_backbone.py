@@ -0,0 +1,375 @@
+import io
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+import requests
+
+BACKBONE_DB = 'data/gbif_backbone.db'
+BACKBONE_KINGDOM = 'Animalia' # Keeps the snapshot to the part of the tree we research
+INSERT_BATCH = 50000
+# Taxa that make up the classification tree; synonyms only point into it
+TREE_STATUSES = ('ACCEPTED', 'DOUBTFUL')
+
+# Taxon.tsv column -> taxa column
+TAXON_COLUMNS = {
+    'taxonID': 'key',
+    'parentNameUsageID': 'parent_key',
+    'acceptedNameUsageID': 'accepted_key',
+    'canonicalName': 'canonical_name',
+    'scientificName': 'scientific_name',
+    'taxonRank': 'rank',
+    'taxonomicStatus': 'status',
+    'kingdom': 'kingdom',
+    'phylum': 'phylum',
+    'class': 'class',
+    'order': 'order_name',
+    'family': 'family',
+    'genus': 'genus',
+}
+# taxa column -> GBIF API field for search results, so callers can use either source.
+# Kept to what the scouts read: building dicts is most of the cost of a big listing.
+API_FIELDS = {
+    'key': 'key', 'parent_key': 'parentKey', 'accepted_key': 'acceptedKey',
+    'canonical_name': 'canonicalName', 'scientific_name': 'scientificName',
+    'rank': 'rank', 'status': 'taxonomicStatus', 'num_descendants': 'numDescendants', 'extinct': 'extinct',
+}
+INT_COLUMNS = {'key', 'parent_key', 'accepted_key'}
+
+def init_backbone(conn):
+    """
+    One row per name usage. lft/rgt number the accepted tree as nested sets, so
+    "everything below X" is a range scan; they are NULL for synonyms.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS taxa (
+            key INTEGER PRIMARY KEY,
+            parent_key INTEGER,
+            accepted_key INTEGER,
+            canonical_name TEXT,
+            scientific_name TEXT,
+            rank TEXT,
+            status TEXT,
+            kingdom TEXT,
+            phylum TEXT,
+            class TEXT,
+            order_name TEXT,
+            family TEXT,
+            genus TEXT,
+            lft INTEGER,
+            rgt INTEGER,
+            depth INTEGER,
+            num_descendants INTEGER DEFAULT 0,
+            num_species INTEGER DEFAULT 0,
+            extinct INTEGER
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS backbone_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+def index_backbone(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxa_parent ON taxa(parent_key)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxa_rank_lft ON taxa(rank, lft)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxa_name ON taxa(canonical_name, rank)")
+
+def open_taxon_file(source):
+    """Taxon.tsv, read directly or from inside the backbone.zip archive."""
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        member = next(n for n in archive.namelist() if os.path.basename(n) == 'Taxon.tsv')
+        return io.TextIOWrapper(archive.open(member), encoding='utf-8')
+    return open(source, encoding='utf-8')
+
+def open_profile_file(source):
+    """SpeciesProfile.tsv (which carries isExtinct) from the archive or next to Taxon.tsv, or None."""
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        member = next((n for n in archive.namelist() if os.path.basename(n) == 'SpeciesProfile.tsv'), None)
+        return io.TextIOWrapper(archive.open(member), encoding='utf-8') if member else None
+    path = os.path.join(os.path.dirname(source), 'SpeciesProfile.tsv')
+    return open(path, encoding='utf-8') if os.path.exists(path) else None
+
+def read_extinct(lines):
+    """Yields the keys of taxa that any species profile marks as extinct."""
+    header = next(lines).rstrip('\n').split('\t')
+    key_pos = header.index('taxonID') if 'taxonID' in header else 0
+    extinct_pos = header.index('isExtinct')
+    for line in lines:
+        fields = line.rstrip('\n').split('\t')
+        if fields[extinct_pos].lower() == 'true':
+            yield int(fields[key_pos])
+
+def normalize(column, value):
+    if value == '':
+        return None
+    if column in INT_COLUMNS:
+        return int(value)
+    if column in ('rank', 'status'):
+        # The dump says "homotypic synonym", the API says HOMOTYPIC_SYNONYM
+        return value.upper().replace(' ', '_')
+    return value
+
+def read_taxa(lines, kingdom=BACKBONE_KINGDOM):
+    """Yields taxa rows (in TAXON_COLUMNS order) from Taxon.tsv lines, optionally for one kingdom."""
+    header = next(lines).rstrip('\n').split('\t')
+    positions = [(header.index(src), dst) for src, dst in TAXON_COLUMNS.items()]
+    kingdom_pos = header.index('kingdom')
+    for line in lines:
+        # Taxon.tsv is unquoted: fields never contain tabs or newlines
+        fields = line.rstrip('\n').split('\t')
+        if kingdom and fields[kingdom_pos] != kingdom:
+            continue
+        yield tuple(normalize(dst, fields[pos]) for pos, dst in positions)
+
+def number_tree(conn):
+    """
+    Assigns nested-set bounds, depth and descendant counts to the accepted tree with an
+    iterative depth-first walk. Children are held as one sorted key list plus per-parent
+    ranges, which keeps a multi-million-node tree to a few hundred MB.
+    """
+    placeholders = ','.join('?' * len(TREE_STATUSES))
+    keys = []
+    is_species = bytearray()
+    ranges = {}
+    for parent, key, rank in conn.execute(f"""
+            SELECT parent_key, key, rank FROM taxa WHERE status IN ({placeholders})
+            ORDER BY parent_key, key""", TREE_STATUSES):
+        if parent not in ranges:
+            ranges[parent] = [len(keys), len(keys)]
+        ranges[parent][1] += 1
+        keys.append(key)
+        is_species.append(rank == 'SPECIES')
+    in_tree = set(keys)
+    # Roots: tree taxa whose parent is missing (the kingdom, or orphans of a partial dump)
+    roots = [i for parent, (start, end) in ranges.items() if parent not in in_tree
+             for i in range(start, end)]
+    del in_tree
+
+    counter = 0
+    updates = []
+    def flush():
+        conn.executemany("""
+            UPDATE taxa SET lft = ?, rgt = ?, depth = ?, num_descendants = ?, num_species = ? WHERE key = ?
+        """, updates)
+        updates.clear()
+
+    for root in roots:
+        # frame: [index into keys, next child index, end of children, lft, species below]
+        start, end = ranges.get(keys[root], (0, 0))
+        stack = [[root, start, end, counter, 0]]
+        counter += 1
+        while stack:
+            frame = stack[-1]
+            if frame[1] < frame[2]:
+                child = frame[1]
+                frame[1] += 1
+                start, end = ranges.get(keys[child], (0, 0))
+                stack.append([child, start, end, counter, 0])
+                counter += 1
+                continue
+            stack.pop()
+            i, _, _, lft, below = frame
+            rgt = counter
+            counter += 1
+            if stack:
+                stack[-1][4] += below + is_species[i]
+            updates.append((lft, rgt, len(stack), (rgt - lft - 1) // 2, below, keys[i]))
+            if len(updates) >= INSERT_BATCH:
+                flush()
+    flush()
+    return len(keys)
+
+def import_backbone(source, db_path=BACKBONE_DB, kingdom=BACKBONE_KINGDOM):
+    """
+    Loads GBIF's backbone Taxon.tsv (or backbone.zip) into a fresh SQLite snapshot.
+    The new file replaces db_path only once it is complete.
+    """
+    started = time.time()
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    # A throwaway file until the swap, so durability buys nothing here
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    init_backbone(conn)
+
+    columns = ', '.join(TAXON_COLUMNS.values())
+    insert = f"INSERT OR REPLACE INTO taxa ({columns}) VALUES ({', '.join('?' * len(TAXON_COLUMNS))})"
+    count = 0
+    with open_taxon_file(source) as f:
+        batch = []
+        for row in read_taxa(f, kingdom):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(insert, batch)
+                count += len(batch)
+                batch = []
+        conn.executemany(insert, batch)
+        count += len(batch)
+    print(f"📥 Loaded {count} name usages in {time.time() - started:.1f}s")
+
+    profile = open_profile_file(source)
+    if profile:
+        with profile:
+            conn.executemany("UPDATE taxa SET extinct = 1 WHERE key = ?", ((key,) for key in read_extinct(profile)))
+    else:
+        print("⚠️ No SpeciesProfile.tsv next to the taxa: extinct taxa will be looked up on the GBIF API")
+
+    conn.execute("CREATE INDEX idx_taxa_parent ON taxa(parent_key)")
+    tree_size = number_tree(conn)
+    index_backbone(conn)
+    conn.executemany("INSERT OR REPLACE INTO backbone_meta (key, value) VALUES (?, ?)", [
+        ('source', os.path.basename(source)),
+        ('kingdom', kingdom or ''),
+        ('imported_at', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('extinct_flags', '1' if profile else '0'),
+    ])
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, db_path)
+    print(f"🌳 Numbered {tree_size} accepted taxa; snapshot written to {db_path} in {time.time() - started:.1f}s")
+    return count
+
+class LocalBackbone:
+    """
+    Answers the GBIF species searches our scouts make from a local snapshot, with the same
+    method names and result fields as PooledClient. Results come in taxonomic (depth-first)
+    order rather than GBIF's relevance order. Thread-safe: each thread reads over its own
+    connection.
+    """
+    def __init__(self, db_path=BACKBONE_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No GBIF backbone snapshot at {db_path}; run python -m src.gbif_backbone first")
+        self.db_path = db_path
+        self.local = threading.local()
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(taxa)")}
+        # Snapshots imported before a field was added simply leave it out of results
+        self.fields = {column: field for column, field in API_FIELDS.items() if column in columns}
+        meta = dict(self.conn.execute("SELECT key, value FROM backbone_meta").fetchall())
+        self.has_extinct_flags = meta.get('extinct_flags') == '1'
+
+    @property
+    def conn(self):
+        if not hasattr(self.local, 'conn'):
+            self.local.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self.local.conn.row_factory = sqlite3.Row
+        return self.local.conn
+
+    def bounds(self, key):
+        return self.conn.execute("SELECT lft, rgt FROM taxa WHERE key = ?", (int(key),)).fetchone()
+
+    def search_rows(self, higherTaxonKey=None, rank=None, status=None, offset=0, limit=20, after=None):
+        """
+        Raw taxa rows in taxonomic order. Within a higherTaxonKey, after continues past a
+        nested-set position (keyset paging), which stays fast deep into a listing where
+        OFFSET would rescan everything before it.
+        """
+        where = []
+        args = []
+        if higherTaxonKey is not None:
+            bounds = self.bounds(higherTaxonKey)
+            if bounds is None or bounds['lft'] is None:
+                return []
+            where.append("lft > ? AND lft < ?")
+            args += [bounds['lft'] if after is None else max(after, bounds['lft']), bounds['rgt']]
+        if rank:
+            where.append("rank = ?")
+            args.append(rank.upper())
+        if status:
+            where.append("status = ?")
+            args.append(status.upper())
+        # Inside the tree lft is unique, and ordering by it alone lets the (rank, lft) index
+        # hand rows over presorted; only a tree-wide listing has synonyms (no lft) to place
+        order = "lft" if higherTaxonKey is not None else "lft IS NULL, lft, key"
+        columns = ', '.join(self.fields)
+        sql = f"SELECT {columns}, lft FROM taxa {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            args += [limit, offset]
+        return self.conn.execute(sql, args).fetchall()
+
+    def gbif_search(self, offset=0, limit=20, **params):
+        """A page of taxa, filtered like GBIF's species search; limit=None returns everything."""
+        # One extra row tells us whether another page exists
+        rows = self.search_rows(offset=offset, limit=None if limit is None else limit + 1, **self.filters(params))
+        end = limit is None or len(rows) <= limit
+        results = [self.to_api(r) for r in (rows if limit is None else rows[:limit])]
+        return {"offset": offset, "limit": limit, "endOfRecords": end, "results": results}
+
+    def gbif_pages(self, page_size=1000, offset=0, max_results=None, **params):
+        """Yields (next_offset, results) pages, like PooledClient.gbif_pages."""
+        filters = self.filters(params)
+        end = None if max_results is None else offset + max_results
+        after = None
+        while True:
+            limit = page_size if end is None else min(page_size, end - offset)
+            rows = self.search_rows(offset=offset if after is None else 0, limit=limit + 1, after=after, **filters)
+            page = rows[:limit]
+            offset += len(page)
+            yield offset, [self.to_api(r) for r in page]
+            if len(rows) <= limit or (end is not None and offset >= end):
+                return
+            # Keyset paging needs a subtree; tree-wide listings also hold synonyms, which have no lft
+            after = page[-1]['lft'] if 'higherTaxonKey' in filters else None
+
+    @staticmethod
+    def filters(params):
+        # Everything else GBIF accepts (datasetKey, ...) is implied by the snapshot
+        return {k: params[k] for k in ('higherTaxonKey', 'rank', 'status') if k in params}
+
+    def gbif_all(self, **params):
+        return self.gbif_search(limit=None, **params)["results"]
+
+    def gbif_match(self, name, rank=None, strict=True, **params):
+        """Exact canonical-name match, preferring accepted usages, shaped like /species/match."""
+        sql = "SELECT * FROM taxa WHERE canonical_name = ?"
+        args = [name]
+        if rank:
+            sql += " AND rank = ?"
+            args.append(rank.upper())
+        row = self.conn.execute(sql + " ORDER BY status != 'ACCEPTED', num_descendants DESC LIMIT 1", args).fetchone()
+        if row is None:
+            return {"matchType": "NONE"}
+        return {"usageKey": row['key'], "acceptedUsageKey": row['accepted_key'], "matchType": "EXACT",
+                "canonicalName": row['canonical_name'], "rank": row['rank'], "status": row['status']}
+
+    def to_api(self, row):
+        return {field: value for field, value in zip(self.fields.values(), row) if value is not None}
+
+    def close(self):
+        if hasattr(self.local, 'conn'):
+            self.local.conn.close()
+            del self.local.conn
+
+def drop_extinct(taxa, gbif, api, **params):
+    """
+    Filters extinct taxa out of a listing made with params. A backbone snapshot imported
+    without species profiles has no extinct flags, so the flags then come from the same
+    listing on the GBIF API (api); if that fails, nothing is filtered.
+    """
+    if isinstance(gbif, LocalBackbone) and not gbif.has_extinct_flags:
+        try:
+            extinct = {t.get("key") for t in api.gbif_all(**params) if t.get("extinct")}
+        except requests.RequestException as e:
+            print(f"  ⚠️ Could not look up extinct taxa on the GBIF API: {e}")
+            return taxa
+        return [t for t in taxa if t.get("key") not in extinct]
+    return [t for t in taxa if not t.get("extinct")]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Import the GBIF backbone taxonomy into a local SQLite snapshot.")
+    parser.add_argument("source", help="Path to Taxon.tsv or backbone.zip from https://hosted-datasets.gbif.org/datasets/backbone/")
+    parser.add_argument("--db", default=BACKBONE_DB, help="Snapshot to write (default: %(default)s)")
+    parser.add_argument("--kingdom", default=BACKBONE_KINGDOM, help="Only import this kingdom (default: %(default)s)")
+    parser.add_argument("--all-kingdoms", action="store_true", help="Import the whole backbone")
+    args = parser.parse_args()
+
+    import_backbone(args.source, args.db, kingdom=None if args.all_kingdoms else args.kingdom)
@@ -1,67 +1,61 @@
-import sqlite3
-import json
 import os
+from src.graph_matrix import order_modality_matrix
+from src.reports import report_product, load_product
+from src.assets import script_tags, inline_json
 
 DB_PATH = 'data/orchestrator.db'
 OUTPUT_FILE = 'sensory_heatmap.html'
 
-def generate_heatmap_html():
-    conn = sqlite3.connect(DB_PATH)
+# Placeholder order names left behind by the LLM
+NOISE = ('Unknown', 'Not Available', 'Not specified in context', 'Unspecified', 'None', 'NULL')
+
+TOP_ORDERS_QUERY = f"""
+    SELECT n.name, COUNT(*) as count
+    FROM nodes n
+    JOIN edges e ON n.id = e.target
+    WHERE n.type = 'order'
+      AND e.relationship = 'MEMBER_OF'
+      AND n.name NOT IN ({','.join(['?'] * len(NOISE))})
+    GROUP BY n.name
+    ORDER BY count DESC
+    LIMIT 40
+"""
+
+MODALITY_FREQUENCY_QUERY = """
+    SELECT target, COUNT(*) as freq
+    FROM edges
+    WHERE relationship = 'HAS_SENSE' AND target LIKE 'modality:%'
+    GROUP BY target
+    ORDER BY freq DESC
+"""
+
+@report_product('order_modality_heatmap')
+def heatmap_data(conn):
     c = conn.cursor()
-    
+
     # 1. Get Top 40 Orders (filtering out noise like 'Unknown')
-    noise = ('Unknown', 'Not Available', 'Not specified in context', 'Unspecified', 'None', 'NULL')
-    placeholders = ','.join(['?'] * len(noise))
-    
-    c.execute(f"""
-        SELECT n.name, COUNT(*) as count 
-        FROM nodes n
-        JOIN edges e ON n.id = e.target
-        WHERE n.type = 'order' 
-          AND e.relationship = 'MEMBER_OF'
-          AND n.name NOT IN ({placeholders})
-        GROUP BY n.name 
-        ORDER BY count DESC 
-        LIMIT 40
-    """, noise)
+    c.execute(TOP_ORDERS_QUERY, NOISE)
     orders = [r[0] for r in c.fetchall()]
     
     # 2. Get All Modalities and sort by global frequency
-    c.execute("""
-        SELECT target, COUNT(*) as freq 
-        FROM edges 
-        WHERE relationship = 'HAS_SENSE' 
-        GROUP BY target 
-        ORDER BY freq DESC
-    """)
+    c.execute(MODALITY_FREQUENCY_QUERY)
     modalities = [r[0].replace('modality:', '') for r in c.fetchall()]
     
-    # 3. Calculate "Sensation Density" per order
-    matrix = []
-    for order in orders:
-        row = {"order": order}
-        for mod in modalities:
-            c.execute("""
-                SELECT COUNT(DISTINCT f.id)
-                FROM nodes o
-                JOIN edges e1 ON o.id = e1.target AND e1.relationship = 'MEMBER_OF'
-                JOIN nodes f ON e1.source = f.id
-                JOIN edges e2 ON f.id = e2.source AND e2.relationship = 'HAS_SENSE'
-                JOIN nodes m ON e2.target = m.id
-                WHERE o.name = ? AND m.name = ?
-            """, (order, mod))
-            count = c.fetchone()[0]
-            row[mod] = count
-        matrix.append(row)
-
-    data_json = json.dumps({"orders": orders, "modalities": modalities, "matrix": matrix})
+    # 3. Calculate "Sensation Density" per order (distinct families per modality) in one grouped query
+    matrix = order_modality_matrix(rows=orders, columns=modalities, conn=conn).records('order')
+
+    return {"orders": orders, "modalities": modalities, "matrix": matrix}
+
+def generate_heatmap_html():
+    data_json = inline_json(load_product('order_modality_heatmap', db_path=DB_PATH))
+    scripts = script_tags(['d3'], OUTPUT_FILE)
     
     html_template = f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>Umwelt: Sensory Heatmap</title>
-    <script src="https://d3js.org/d3.v7.min.js"></script>
+    {scripts}
     <style>
         body {{ margin: 0; font-family: sans-serif; background: #0a0a0a; color: #eee; display: flex; flex-direction: column; align-items: center; }}
         .chart-container {{ margin-top: 50px; margin-bottom: 50px; }}
@@ -154,7 +148,12 @@ def generate_heatmap_html():
     with open(OUTPUT_FILE, 'w') as f:
         f.write(html_template)
     print(f"✨ Improved Sensory Heatmap generated: {OUTPUT_FILE}")
-    conn.close()
 
 if __name__ == "__main__":
+    import argparse
+    from src import assets
+    parser = argparse.ArgumentParser(description="Generate the order × sense heatmap.")
+    assets.add_asset_argument(parser)
+    args = parser.parse_args()
+    assets.ASSET_MODE = args.assets
     generate_heatmap_html()
\ No newline at end of file
@@ -1,46 +1,113 @@
-import sqlite3
-import json
 import os
+import math
+import shutil
+from src.graph_engine import graph_signature
+from src.graph_layout import LAYOUT_VERSION, stored_layout
+from src.reports import report_product, load_product
+from src.assets import script_tags, inline_json
 
 DB_PATH = 'data/orchestrator.db'
 OUTPUT_FILE = 'web_of_senses.html'
+# Species tiles are written next to the page and fetched on demand
+TILE_DIR = 'web_of_senses_tiles'
+TILE_SIZE = 250
+
+NODE_TYPES = ['modality', 'sub_type', 'order', 'family', 'species']
+
+def build_graph_data(conn, layout, tile_size=TILE_SIZE):
+    """
+    Packs the laid-out graph into columnar arrays (node attributes by index, links as flat
+    index pairs). The skeleton (everything but species) is returned inline; species are
+    partitioned into square tiles of the layout plane, keyed "tx_ty", that the page fetches
+    only once they come into view. Returns (skeleton, tiles).
+    """
+    type_codes = {t: n for n, t in enumerate(NODE_TYPES)}
+    names, types, xs, ys = [], [], [], []
+    index = {}
+    tiles = {}
+    species_at = {}
+    for node_id, name, node_type in conn.execute("SELECT id, name, type FROM nodes ORDER BY type, id"):
+        if node_id not in layout or node_type not in type_codes:
+            continue
+        x, y = (round(v, 1) for v in layout[node_id][:2])
+        if node_type == 'species':
+            key = f"{math.floor(x / tile_size)}_{math.floor(y / tile_size)}"
+            tile = tiles.setdefault(key, {"name": [], "x": [], "y": [], "parent": [], "senses": []})
+            species_at[node_id] = (tile, len(tile["name"]))
+            tile["name"].append(name)
+            tile["x"].append(x)
+            tile["y"].append(y)
+            continue
+        index[node_id] = len(names)
+        names.append(name)
+        types.append(type_codes[node_type])
+        xs.append(x)
+        ys.append(y)
+
+    sizes = [0] * len(names)
+    for node_id, (tile, _) in species_at.items():
+        parent = layout[node_id][2]
+        tile["parent"].append(index.get(parent, -1))
+        if parent in index:
+            sizes[index[parent]] += 1
+
+    links = []
+    for source, target, relationship in conn.execute("SELECT source, target, relationship FROM edges"):
+        if target not in index:
+            continue
+        if source in species_at:
+            # Species edges travel with their tile and are only drawn for the focused node
+            if relationship == 'HAS_SENSE':
+                tile, local = species_at[source]
+                tile["senses"].extend((local, index[target]))
+        elif source in index:
+            links.extend((index[source], index[target]))
+
+    skeleton = {"types": NODE_TYPES, "name": names, "type": types, "x": xs, "y": ys,
+                "parent": [-1] * len(names), "size": sizes, "links": links, "senses": [],
+                "tileSize": tile_size, "tiles": {key: len(tile["name"]) for key, tile in tiles.items()}}
+    return skeleton, tiles
+
+def write_tiles(tiles, tile_dir):
+    """
+    Replaces tile_dir with one script per tile, so tiles from an older graph never linger.
+    Tiles are loaded with <script> tags rather than fetch(), which also works from file://.
+    """
+    tmp = tile_dir + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for key, tile in tiles.items():
+        with open(os.path.join(tmp, f"{key}.js"), 'w') as f:
+            f.write(f'umweltTile("{key}",{inline_json(tile)});\n')
+    shutil.rmtree(tile_dir, ignore_errors=True)
+    os.replace(tmp, tile_dir)
+
+@report_product('web_of_senses', version=LAYOUT_VERSION)
+def web_of_senses_data(conn, tile_size=TILE_SIZE):
+    skeleton, tiles = build_graph_data(conn, stored_layout(conn), tile_size)
+    # Tile URLs carry the graph signature so browsers never mix tiles from different builds
+    skeleton["version"] = graph_signature(conn)[:12]
+    return {"skeleton": skeleton, "tiles": tiles}
 
 def generate_html():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Fetch ALL nodes
-    c.execute("SELECT id, name, type FROM nodes")
-    nodes = [{"id": r[0], "name": r[1], "type": r[2]} for r in c.fetchall()]
-    
-    # Fetch ALL edges
-    c.execute("SELECT source, target, relationship FROM edges")
-    links = [{"source": r[0], "target": r[1], "rel": r[2]} for r in c.fetchall()]
-    
-    graph_data = {"nodes": nodes, "links": links}
-    
+    product = load_product('web_of_senses', db_path=DB_PATH)
+    graph_data, tiles = product["skeleton"], product["tiles"]
+    tile_dir = os.path.join(os.path.dirname(OUTPUT_FILE), TILE_DIR)
+    write_tiles(tiles, tile_dir)
+    graph_data["tileDir"] = TILE_DIR
+
     html_template = f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>Umwelt: Web of Senses</title>
-    <script src="https://d3js.org/d3.v7.min.js"></script>
+    {script_tags(['d3'], OUTPUT_FILE)}
     <style>
         body {{ margin: 0; font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: #0a0a0a; color: #eee; overflow: hidden; }}
-        svg {{ background: #0a0a0a; }}
+        canvas {{ display: block; background: #0a0a0a; }}
         .controls {{ position: absolute; top: 20px; left: 20px; background: rgba(15,15,15,0.95); padding: 20px; border-radius: 12px; border: 1px solid #444; pointer-events: auto; z-index: 100; box-shadow: 0 8px 32px rgba(0,0,0,0.8); width: 250px; }}
         .legend-item {{ display: flex; align-items: center; margin-bottom: 8px; font-size: 0.9em; }}
         .color-box {{ width: 14px; height: 14px; margin-right: 10px; border-radius: 50%; }}
-        .node-label {{ pointer-events: none; font-size: 10px; fill: #aaa; opacity: 0.8; }}
-        .modality-label {{ pointer-events: none; font-size: 18px; font-weight: bold; fill: #fff; text-shadow: 0 0 10px #000; }}
-        line {{ stroke: #444; stroke-opacity: 0.2; transition: stroke-opacity 0.3s, stroke 0.3s; }}
-        circle {{ stroke: #000; stroke-width: 1px; transition: r 0.3s, opacity 0.3s; }}
-        
-        /* Highlight Classes */
-        .dimmed {{ opacity: 0.1 !important; }}
-        .highlighted-node {{ stroke: #fff !important; stroke-width: 3px !important; opacity: 1 !important; }}
-        .highlighted-link {{ stroke: #00d4ff !important; stroke-opacity: 0.8 !important; stroke-width: 2px !important; }}
-        
         #details {{ margin-top: 15px; padding-top: 15px; border-top: 1px solid #333; min-height: 60px; color: #00d4ff; font-size: 0.95em; line-height: 1.4; }}
         .hint {{ font-size: 0.75em; opacity: 0.5; margin-top: 10px; font-style: italic; }}
     </style>
@@ -49,150 +116,275 @@ def generate_html():
     <div class="controls">
         <h2 style="margin-top:0; color: #00d4ff; letter-spacing: 1px;">UMWELT</h2>
         <div class="legend-item"><div class="color-box" style="background: #ff4444;"></div> <b>Modality</b></div>
+        <div class="legend-item"><div class="color-box" style="background: #ff8888;"></div> Sub-type</div>
         <div class="legend-item"><div class="color-box" style="background: #44ff44;"></div> Order</div>
         <div class="legend-item"><div class="color-box" style="background: #4444ff;"></div> Family</div>
         <div class="legend-item"><div class="color-box" style="background: #ffaa00;"></div> Species</div>
-        
+
         <div id="details">Click a node to focus its connections</div>
-        <div class="hint">Click background to reset view</div>
+        <div class="hint">Zoom in to expand families into species. Click background to reset view.</div>
     </div>
-    <svg id="viz"></svg>
+    <canvas id="viz"></canvas>
 
     <script>
-        const data = {json.dumps(graph_data)};
-        const width = window.innerWidth;
-        const height = window.innerHeight;
-        
-        const colorMap = {{
-            'modality': '#ff4444',
-            'order': '#44ff44',
-            'family': '#4444ff',
-            'species': '#ffaa00'
-        }};
+        const data = {inline_json(graph_data)};
+        const T = Object.fromEntries(data.types.map((t, i) => [t, i]));
+        const colors = ['#ff4444', '#ff8888', '#44ff44', '#4444ff', '#ffaa00'];
+        const SPECIES_ZOOM = 2.5; // Families expand into their species past this zoom level
+        const n = data.name.length; // Skeleton nodes; species are appended as their tiles load
 
-        const svg = d3.select("#viz")
-            .attr("width", width)
-            .attr("height", height);
+        const canvas = document.getElementById('viz');
+        const ctx = canvas.getContext('2d');
+        let width, height, transform = d3.zoomIdentity, focus = null, focusSet = null, pending = false;
 
-        const container = svg.append("g");
+        function radius(i) {{
+            const t = data.type[i];
+            if (t === T.modality) return 18;
+            if (t === T.family) return 4 + Math.sqrt(data.size[i]);
+            if (t === T.species) return 1.5;
+            return 6;
+        }}
 
-        // Background click to reset
-        svg.on("click", (event) => {{
-            if (event.target.tagName === 'svg') resetFocus();
-        }});
+        // Spatial indexes for picking: the skeleton is always visible, species only when zoomed in
+        const skeleton = d3.range(n);
+        const skeletonTree = d3.quadtree(skeleton, i => data.x[i], i => data.y[i]);
+        const speciesTree = d3.quadtree().x(i => data.x[i]).y(i => data.y[i]);
 
-        // Zoom setup
-        const zoom = d3.zoom()
-            .scaleExtent([0.01, 8])
-            .on("zoom", (event) => container.attr("transform", event.transform));
-        
-        svg.call(zoom);
-
-        const simulation = d3.forceSimulation(data.nodes)
-            .force("link", d3.forceLink(data.links).id(d => d.id).distance(120).strength(0.2))
-            .force("charge", d3.forceManyBody().strength(-300))
-            .force("center", d3.forceCenter(width / 2, height / 2))
-            .force("collision", d3.forceCollide().radius(d => d.type === 'modality' ? 50 : 25));
-
-        const link = container.append("g")
-            .selectAll("line")
-            .data(data.links)
-            .join("line");
-
-        const node = container.append("g")
-            .selectAll("g")
-            .data(data.nodes)
-            .join("g")
-            .attr("cursor", "pointer")
-            .call(d3.drag()
-                .on("start", dragstarted)
-                .on("drag", dragged)
-                .on("end", dragended));
-
-        node.append("circle")
-            .attr("r", d => d.type === 'modality' ? 18 : 8)
-            .attr("fill", d => colorMap[d.type] || '#ccc');
-
-        node.append("text")
-            .filter(d => d.type === 'modality')
-            .attr("dy", -25)
-            .attr("text-anchor", "middle")
-            .attr("class", "modality-label")
-            .text(d => d.name);
-
-        node.on("click", (event, d) => {{
-            event.stopPropagation();
-            focusOnNode(d);
-        }});
+        const tileState = {{}};
+        window.umweltTile = (key, tile) => {{
+            if (tileState[key] !== 'loading') return;
+            const offset = data.name.length;
+            tile.name.forEach((name, i) => {{
+                data.name.push(name);
+                data.type.push(T.species);
+                data.x.push(tile.x[i]);
+                data.y.push(tile.y[i]);
+                data.parent.push(tile.parent[i]);
+                data.size.push(0);
+            }});
+            for (let k = 0; k < tile.senses.length; k += 2) data.senses.push(offset + tile.senses[k], tile.senses[k + 1]);
+            speciesTree.addAll(d3.range(offset, data.name.length));
+            tileState[key] = 'loaded';
+            if (focus !== null) focusSet = neighbors(focus);
+            requestDraw();
+        }};
 
-        simulation.on("tick", () => {{
-            link
-                .attr("x1", d => d.source.x)
-                .attr("y1", d => d.source.y)
-                .attr("x2", d => d.target.x)
-                .attr("y2", d => d.target.y);
+        function loadTile(key) {{
+            tileState[key] = 'loading';
+            const script = document.createElement('script');
+            script.src = `${{data.tileDir}}/${{key}}.js?v=${{data.version}}`;
+            script.onload = () => script.remove();
+            script.onerror = () => {{
+                tileState[key] = 'failed';
+                script.remove();
+                d3.select("#details").text(`Species tile ${{key}} could not be loaded from ${{data.tileDir}}.`);
+            }};
+            document.head.appendChild(script);
+        }}
 
-            node.attr("transform", d => `translate(${{d.x}},${{d.y}})`);
-        }});
+        function loadTilesIn(x0, y0, x1, y1) {{
+            const s = data.tileSize;
+            for (let tx = Math.floor(x0 / s); tx <= Math.floor(x1 / s); tx++) {{
+                for (let ty = Math.floor(y0 / s); ty <= Math.floor(y1 / s); ty++) {{
+                    const key = `${{tx}}_${{ty}}`;
+                    if (key in data.tiles && !tileState[key]) loadTile(key);
+                }}
+            }}
+        }}
 
-        function focusOnNode(focusD) {{
-            // Find neighbors
-            const neighbors = new Set();
-            neighbors.add(focusD.id);
-            
-            data.links.forEach(l => {{
-                if (l.source.id === focusD.id) neighbors.add(l.target.id);
-                if (l.target.id === focusD.id) neighbors.add(l.source.id);
-            }});
+        function resize() {{
+            width = window.innerWidth;
+            height = window.innerHeight;
+            canvas.width = width * devicePixelRatio;
+            canvas.height = height * devicePixelRatio;
+            canvas.style.width = width + 'px';
+            canvas.style.height = height + 'px';
+            requestDraw();
+        }}
 
-            // Dim others
-            node.selectAll("circle").classed("dimmed", n => !neighbors.has(n.id));
-            node.selectAll("circle").classed("highlighted-node", n => n.id === focusD.id);
-            node.selectAll("text").classed("dimmed", n => !neighbors.has(n.id) && n.type !== 'modality');
-            
-            link.classed("dimmed", l => l.source.id !== focusD.id && l.target.id !== focusD.id);
-            link.classed("highlighted-link", l => l.source.id === focusD.id || l.target.id === focusD.id);
-
-            d3.select("#details").html(`
-                <span style="font-size: 0.8em; opacity: 0.7;">${{focusD.type.toUpperCase()}}</span><br>
-                <span style="font-size: 1.2em; color: #fff;">${{focusD.name}}</span><br>
-                <span style="font-size: 0.8em; color: #44ff44;">Connections: ${{neighbors.size - 1}}</span>
-            `);
+        function requestDraw() {{
+            if (!pending) {{ pending = true; requestAnimationFrame(draw); }}
         }}
 
-        function resetFocus() {{
-            node.selectAll("circle").classed("dimmed", false).classed("highlighted-node", false);
-            node.selectAll("text").classed("dimmed", false);
-            link.classed("dimmed", false).classed("highlighted-link", false);
-            d3.select("#details").text("Click a node to focus its connections");
+        function visibleSpecies() {{
+            // Only walk the quadtree cells inside the viewport
+            const [x0, y0] = transform.invert([0, 0]);
+            const [x1, y1] = transform.invert([width, height]);
+            const found = [];
+            speciesTree.visit((node, nx0, ny0, nx1, ny1) => {{
+                if (!node.length) {{
+                    do {{
+                        const i = node.data;
+                        if (data.x[i] >= x0 && data.x[i] <= x1 && data.y[i] >= y0 && data.y[i] <= y1) found.push(i);
+                    }} while (node = node.next);
+                }}
+                return nx0 > x1 || ny0 > y1 || nx1 < x0 || ny1 < y0;
+            }});
+            loadTilesIn(x0, y0, x1, y1);
+            return found;
+        }}
+
+        function drawNode(i) {{
+            ctx.beginPath();
+            ctx.arc(data.x[i], data.y[i], radius(i), 0, 2 * Math.PI);
+            ctx.fillStyle = colors[data.type[i]];
+            ctx.globalAlpha = focusSet && !focusSet.has(i) ? 0.1 : 1;
+            ctx.fill();
         }}
 
-        function dragstarted(event) {{
-            if (!event.active) simulation.alphaTarget(0.3).restart();
-            event.subject.fx = event.subject.x;
-            event.subject.fy = event.subject.y;
+        function draw() {{
+            pending = false;
+            ctx.setTransform(devicePixelRatio, 0, 0, devicePixelRatio, 0, 0);
+            ctx.clearRect(0, 0, width, height);
+            ctx.translate(transform.x, transform.y);
+            ctx.scale(transform.k, transform.k);
+
+            const showSpecies = transform.k >= SPECIES_ZOOM;
+            const inView = showSpecies ? visibleSpecies() : [];
+
+            ctx.lineWidth = 1 / transform.k;
+            ctx.strokeStyle = '#444';
+            ctx.globalAlpha = focusSet ? 0.05 : 0.2;
+            ctx.beginPath();
+            for (let k = 0; k < data.links.length; k += 2) {{
+                const a = data.links[k], b = data.links[k + 1];
+                ctx.moveTo(data.x[a], data.y[a]);
+                ctx.lineTo(data.x[b], data.y[b]);
+            }}
+            for (const i of inView) {{
+                const p = data.parent[i];
+                if (p >= 0) {{ ctx.moveTo(data.x[i], data.y[i]); ctx.lineTo(data.x[p], data.y[p]); }}
+            }}
+            ctx.stroke();
+
+            if (focus !== null) {{
+                ctx.strokeStyle = '#00d4ff';
+                ctx.globalAlpha = 0.8;
+                ctx.lineWidth = 2 / transform.k;
+                ctx.beginPath();
+                for (const j of focusSet) {{
+                    ctx.moveTo(data.x[focus], data.y[focus]);
+                    ctx.lineTo(data.x[j], data.y[j]);
+                }}
+                ctx.stroke();
+            }}
+
+            for (const i of skeleton) drawNode(i);
+            for (const i of inView) drawNode(i);
+            if (focus !== null) {{
+                focusSet.forEach(drawNode);
+                ctx.globalAlpha = 1;
+                ctx.strokeStyle = '#fff';
+                ctx.lineWidth = 3 / transform.k;
+                ctx.beginPath();
+                ctx.arc(data.x[focus], data.y[focus], radius(focus), 0, 2 * Math.PI);
+                ctx.stroke();
+            }}
+
+            // Labels appear as their level of detail comes into range
+            ctx.globalAlpha = 1;
+            ctx.textAlign = 'center';
+            for (const i of skeleton) {{
+                const t = data.type[i];
+                if (t === T.modality) {{
+                    ctx.font = `bold ${{18 / Math.sqrt(transform.k)}}px sans-serif`;
+                    ctx.fillStyle = '#fff';
+                    ctx.fillText(data.name[i], data.x[i], data.y[i] - 25);
+                }} else if ((t === T.order && transform.k > 0.8) || (t !== T.order && transform.k > 2)) {{
+                    ctx.font = `${{10 / transform.k}}px sans-serif`;
+                    ctx.fillStyle = '#aaa';
+                    ctx.fillText(data.name[i], data.x[i], data.y[i] - radius(i) - 2);
+                }}
+            }}
+            if (transform.k > 8) {{
+                ctx.font = `${{8 / transform.k}}px sans-serif`;
+                ctx.fillStyle = '#aaa';
+                for (const i of inView) ctx.fillText(data.name[i], data.x[i], data.y[i] - 3);
+            }}
         }}
 
-        function dragged(event) {{
-            event.subject.fx = event.x;
-            event.subject.fy = event.y;
+        function neighbors(i) {{
+            const set = new Set([i]);
+            const scan = (pairs) => {{
+                for (let k = 0; k < pairs.length; k += 2) {{
+                    if (pairs[k] === i) set.add(pairs[k + 1]);
+                    if (pairs[k + 1] === i) set.add(pairs[k]);
+                }}
+            }};
+            scan(data.links);
+            scan(data.senses);
+            if (data.parent[i] >= 0) set.add(data.parent[i]);
+            for (let j = n; j < data.name.length; j++) if (data.parent[j] === i) set.add(j);
+            set.delete(i);
+            return set;
         }}
 
-        function dragended(event) {{
-            if (!event.active) simulation.alphaTarget(0);
-            event.subject.fx = null;
-            event.subject.fy = null;
+        function pick(event) {{
+            const [x, y] = transform.invert(d3.pointer(event));
+            const r = 20 / transform.k;
+            let hit = skeletonTree.find(x, y, r);
+            if (transform.k >= SPECIES_ZOOM) {{
+                const s = speciesTree.find(x, y, r);
+                if (s !== undefined && (hit === undefined ||
+                    Math.hypot(data.x[s] - x, data.y[s] - y) < Math.hypot(data.x[hit] - x, data.y[hit] - y))) hit = s;
+            }}
+            return hit;
         }}
+
+        canvas.addEventListener('click', (event) => {{
+            const i = pick(event);
+            if (i === undefined) {{
+                focus = null;
+                focusSet = null;
+                d3.select("#details").text("Click a node to focus its connections");
+            }} else {{
+                focus = i;
+                focusSet = neighbors(i);
+                if (data.size[i]) {{
+                    // Fetch the tiles under the family's species spiral so their senses can be shown
+                    const r = 2 * Math.sqrt(data.size[i]) + 1;
+                    loadTilesIn(data.x[i] - r, data.y[i] - r, data.x[i] + r, data.y[i] + r);
+                }}
+                const members = data.size[i] ? `<br><span style="font-size: 0.8em; color: #ffaa00;">Species: ${{data.size[i]}}</span>` : '';
+                d3.select("#details").html(`
+                    <span style="font-size: 0.8em; opacity: 0.7;">${{data.types[data.type[i]].toUpperCase()}}</span><br>
+                    <span style="font-size: 1.2em; color: #fff;">${{data.name[i]}}</span><br>
+                    <span style="font-size: 0.8em; color: #44ff44;">Connections: ${{focusSet.size}}</span>${{members}}
+                `);
+            }}
+            requestDraw();
+        }});
+
+        const zoom = d3.zoom()
+            .scaleExtent([0.01, 64])
+            .on("zoom", (event) => {{ transform = event.transform; requestDraw(); }});
+        d3.select(canvas).call(zoom).on("dblclick.zoom", null);
+
+        window.addEventListener('resize', resize);
+        resize();
+
+        // Fit the precomputed layout to the window
+        const [minX, maxX] = d3.extent(skeleton, i => data.x[i]);
+        const [minY, maxY] = d3.extent(skeleton, i => data.y[i]);
+        const k = 0.9 * Math.min(width / ((maxX - minX) || 1), height / ((maxY - minY) || 1));
+        d3.select(canvas).call(zoom.transform, d3.zoomIdentity
+            .translate(width / 2, height / 2).scale(k).translate(-(minX + maxX) / 2, -(minY + maxY) / 2));
     </script>
 </body>
 </html>
     """
-    
+
     with open(OUTPUT_FILE, 'w') as f:
         f.write(html_template)
     
-    print(f"✨ Interactive Focus-Graph generated: {OUTPUT_FILE}")
-    conn.close()
+    print(f"✨ Interactive Focus-Graph generated: {OUTPUT_FILE} ({len(graph_data['name'])} nodes, "
+          f"{sum(graph_data['tiles'].values())} species in {len(tiles)} tiles under {tile_dir})")
 
 if __name__ == "__main__":
+    import argparse
+    from src import assets
+    parser = argparse.ArgumentParser(description="Generate the interactive focus graph.")
+    assets.add_asset_argument(parser)
+    args = parser.parse_args()
+    assets.ASSET_MODE = args.assets
     generate_html()
@@ -1,69 +1,95 @@
-import sqlite3
-import json
 import os
+from collections import Counter
+from src.reports import report_product, load_product
+from src.assets import script_tags, inline_json
 
 DB_PATH = 'data/orchestrator.db'
 OUTPUT_FILE = 'sensory_flow.html'
 
-def generate_sankey_html():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # We'll build nodes and links for: Order -> Family -> Modality
-    nodes = []
-    links = []
-    node_map = {} # name -> index
+TOP_ORDERS = 20
+TOP_FAMILIES = 60
+OTHER = 'Other'
+
+# One pass over species membership: per-family species counts (modality NULL) and,
+# per family and modality, how many of its species have that sense.
+FLOWS_QUERY = """
+    WITH membership AS (
+        SELECT sf.source AS species, sf.target AS family, fo.target AS ord, oc.target AS class
+        FROM edges sf
+        JOIN edges fo ON fo.source = sf.target AND fo.relationship = 'MEMBER_OF' AND fo.target LIKE 'order:%'
+        LEFT JOIN edges oc ON oc.source = fo.target AND oc.relationship = 'MEMBER_OF' AND oc.target LIKE 'class:%'
+        WHERE sf.relationship = 'MEMBER_OF' AND sf.source LIKE 'species:%' AND sf.target LIKE 'family:%'
+    )
+    SELECT class, ord, family, NULL, COUNT(DISTINCT species) FROM membership
+    GROUP BY class, ord, family
+    UNION ALL
+    SELECT m.class, m.ord, m.family, e.target, COUNT(DISTINCT m.species) FROM membership m
+    JOIN edges e ON e.source = m.species AND e.relationship = 'HAS_SENSE' AND e.target LIKE 'modality:%'
+    GROUP BY m.class, m.ord, m.family, e.target
+"""
+
+def label(node_id):
+    return node_id.split(':', 1)[1] if node_id else None
+
+@report_product('sankey_flows')
+def sankey_flows(conn, top_orders=TOP_ORDERS, top_families=TOP_FAMILIES, with_class=False):
+    """
+    Builds weighted Sankey nodes and links (species counts) from FLOWS_QUERY.
+    Orders and families outside the top K by species volume are merged into "Other" nodes.
+    """
+    rows = conn.execute(FLOWS_QUERY).fetchall()
+    def top(volume, k):
+        return {key for key, _ in sorted(volume.items(), key=lambda kv: (-kv[1], kv[0]))[:k]}
 
-    def get_node(name, ntype):
-        key = f"{ntype}:{name}"
+    order_volume = Counter()
+    for _, order, _, modality, count in rows:
+        if modality is None:
+            order_volume[order] += count
+    orders = top(order_volume, top_orders)
+    # Families compete only within the orders that are shown
+    family_volume = Counter()
+    for _, order, family, modality, count in rows:
+        if modality is None and order in orders:
+            family_volume[family] += count
+    families = top(family_volume, top_families)
+
+    flows = Counter()
+    for klass, order, family, modality, count in rows:
+        order_name = label(order) if order in orders else OTHER
+        family_name = label(family) if family in families else OTHER
+        if modality is None:
+            if with_class:
+                flows[(('class', label(klass) or 'Unclassified'), ('order', order_name))] += count
+            flows[(('order', order_name), ('family', family_name))] += count
+        else:
+            flows[(('family', family_name), ('modality', label(modality)))] += count
+
+    nodes = []
+    node_map = {}
+    def get_node(key):
         if key not in node_map:
             node_map[key] = len(nodes)
-            nodes.append({"name": name, "type": ntype})
+            nodes.append({"name": key[1], "type": key[0]})
         return node_map[key]
 
-    # 1. Fetch Top 20 Orders
-    c.execute("""
-        SELECT name, id FROM nodes 
-        WHERE type = 'order' 
-        LIMIT 20
-    """)
-    orders = c.fetchall()
-    
-    for o_name, o_id in orders:
-        o_idx = get_node(o_name, 'order')
-        
-        # 2. Get Families for this order
-        c.execute("""
-            SELECT f.name, f.id FROM nodes f
-            JOIN edges e ON f.id = e.source AND e.relationship = 'MEMBER_OF'
-            WHERE e.target = ?
-        """, (o_id,))
-        families = c.fetchall()
-        
-        for f_name, f_id in families:
-            f_idx = get_node(f_name, 'family')
-            links.append({"source": o_idx, "target": f_idx, "value": 1})
-            
-            # 3. Get Senses for this family
-            c.execute("""
-                SELECT m.name FROM nodes m
-                JOIN edges e ON m.id = e.target AND e.relationship = 'HAS_SENSE'
-                WHERE e.source = ?
-            """, (f_id,))
-            senses = c.fetchall()
-            for (s_name,) in senses:
-                s_idx = get_node(s_name, 'modality')
-                links.append({"source": f_idx, "target": s_idx, "value": 1})
-
-    data_json = json.dumps({"nodes": nodes, "links": links})
+    links = [{"source": get_node(source), "target": get_node(target), "value": value}
+             for (source, target), value in sorted(flows.items())]
+    return {"nodes": nodes, "links": links}
+
+def generate_sankey_html(top_orders=TOP_ORDERS, top_families=TOP_FAMILIES, with_class=False):
+    data = load_product('sankey_flows', db_path=DB_PATH,
+                        top_orders=top_orders, top_families=top_families, with_class=with_class)
+    title = "Class → Order → Family → Sense" if with_class else "Order → Family → Sense"
+
+    data_json = inline_json(data)
+    scripts = script_tags(['d3', 'd3-sankey'], OUTPUT_FILE)
     
     html_template = f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>Umwelt: Sensory Flow</title>
-    <script src="https://d3js.org/d3.v7.min.js"></script>
-    <script src="https://unpkg.com/d3-sankey@0.12.3/dist/d3-sankey.min.js"></script>
+    {scripts}
     <style>
         body {{ margin: 0; font-family: sans-serif; background: #0f0f0f; color: #eee; }}
         .node rect {{ fill-opacity: 0.9; shape-rendering: crispEdges; stroke-width: 0; }}
@@ -74,7 +100,7 @@ def generate_sankey_html():
     </style>
 </head>
 <body>
-    <h1>Sensory Flow: Order → Family → Sense</h1>
+    <h1>Sensory Flow: {title}</h1>
     <div id="chart"></div>
 
     <script>
@@ -96,6 +122,7 @@ def generate_sankey_html():
         const {{nodes, links}} = sankey(data);
 
         const colorMap = {{
+            'class': '#ffff44',
             'order': '#44ff44',
             'family': '#4444ff',
             'modality': '#ff4444'
@@ -110,7 +137,7 @@ def generate_sankey_html():
             .attr("height", d => d.y1 - d.y0)
             .attr("width", d => d.x1 - d.x0)
             .attr("fill", d => colorMap[d.type] || "#ccc")
-            .append("title").text(d => d.name);
+            .append("title").text(d => `${{d.name}}: ${{d.value}} species`);
 
         svg.append("g")
             .attr("fill", "none")
@@ -138,7 +165,15 @@ def generate_sankey_html():
     with open(OUTPUT_FILE, 'w') as f:
         f.write(html_template)
     print(f"✨ Sensory Flow (Sankey) generated: {OUTPUT_FILE}")
-    conn.close()
 
 if __name__ == "__main__":
-    generate_sankey_html()
+    import argparse
+    from src import assets
+    parser = argparse.ArgumentParser(description="Generate the order → family → sense Sankey diagram.")
+    parser.add_argument("--top-orders", type=int, default=TOP_ORDERS, help="Orders shown before the rest merge into 'Other'")
+    parser.add_argument("--top-families", type=int, default=TOP_FAMILIES, help="Families shown before the rest merge into 'Other'")
+    parser.add_argument("--with-class", action="store_true", help="Add a Class level in front of the orders")
+    assets.add_asset_argument(parser)
+    args = parser.parse_args()
+    assets.ASSET_MODE = args.assets
+    generate_sankey_html(args.top_orders, args.top_families, args.with_class)
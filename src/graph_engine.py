@@ -0,0 +1,234 @@
+import os
+import time
+import pickle
+import hashlib
+import sqlite3
+from array import array
+from collections import Counter
+from itertools import combinations
+
+DB_PATH = 'data/orchestrator.db'
+SNAPSHOT_PATH = 'data/graph_snapshot.pkl'
+SNAPSHOT_VERSION = 1
+
+# The taxonomy chain MEMBER_OF edges walk up
+RANKS = ('species', 'family', 'order', 'class')
+
+def graph_signature(conn):
+    """
+    Cheap fingerprint of the archived graph, used to tell whether snapshots, layouts and
+    cached reports are stale. Prefers the content hash the archivist records in graph_meta.
+    """
+    digest = hashlib.sha1()
+    for table in ('nodes', 'edges'):
+        digest.update(str(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]).encode())
+    content = None
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'graph_meta'").fetchone():
+        content = conn.execute("SELECT value FROM graph_meta WHERE key = 'content_hash'").fetchone()
+    if content:
+        digest.update(content[0].encode())
+    elif conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'archive_manifest'").fetchone():
+        row = conn.execute("SELECT COUNT(*), TOTAL(mtime), TOTAL(size) FROM archive_manifest").fetchone()
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+def build_csr(pairs, node_count):
+    """
+    Builds CSR adjacency from (from, to) integer pairs.
+    Returns (offsets, targets): node i's neighbours are targets[offsets[i]:offsets[i + 1]].
+    """
+    offsets = array('i', [0]) * (node_count + 1)
+    for src, _ in pairs:
+        offsets[src + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    targets = array('i', [0]) * len(pairs)
+    cursor = array('i', offsets)
+    for src, dst in pairs:
+        targets[cursor[src]] = dst
+        cursor[src] += 1
+    return offsets, targets
+
+class GraphEngine:
+    """
+    Read-only, in-memory copy of the archived graph.
+    Nodes are integers (position in the id-sorted node list); edges are stored
+    as CSR arrays per relationship, outgoing and incoming.
+    """
+    def __init__(self, ids, names, types, adjacency, signature=None):
+        self.ids = ids
+        self.names = names
+        self.types = types
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        # relationship -> {'out': (offsets, targets), 'in': (offsets, targets)}
+        self.adjacency = adjacency
+        self.signature = signature
+        self.by_type = {}
+        for i, node_type in enumerate(types):
+            self.by_type.setdefault(node_type, array('i')).append(i)
+        self._parents = None
+
+    @classmethod
+    def from_db(cls, db_path=DB_PATH):
+        conn = sqlite3.connect(db_path)
+        try:
+            ids, names, types = [], [], []
+            for node_id, name, node_type in conn.execute("SELECT id, name, type FROM nodes ORDER BY id"):
+                ids.append(node_id)
+                names.append(name)
+                types.append(node_type)
+            index = {node_id: i for i, node_id in enumerate(ids)}
+
+            pairs = {}
+            for source, target, relationship in conn.execute(
+                    "SELECT source, target, relationship FROM edges ORDER BY source, target"):
+                s, t = index.get(source), index.get(target)
+                if s is None or t is None:
+                    continue # Dangling edge (endpoint node was never archived)
+                pairs.setdefault(relationship, []).append((s, t))
+
+            adjacency = {}
+            for relationship, rel_pairs in pairs.items():
+                adjacency[relationship] = {
+                    'out': build_csr(rel_pairs, len(ids)),
+                    'in': build_csr(sorted((t, s) for s, t in rel_pairs), len(ids)),
+                }
+            return cls(ids, names, types, adjacency, graph_signature(conn))
+        finally:
+            conn.close()
+
+    def save(self, path=SNAPSHOT_PATH):
+        """Writes a snapshot that load_snapshot() can restore without touching SQLite."""
+        payload = {
+            "version": SNAPSHOT_VERSION, "signature": self.signature,
+            "ids": self.ids, "names": self.names, "types": self.types,
+            "adjacency": {rel: {d: (o.tobytes(), t.tobytes()) for d, (o, t) in dirs.items()}
+                          for rel, dirs in self.adjacency.items()},
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_snapshot(cls, path=SNAPSHOT_PATH):
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported graph snapshot version: {payload.get('version')}")
+        adjacency = {}
+        for rel, dirs in payload["adjacency"].items():
+            adjacency[rel] = {}
+            for direction, (offsets, targets) in dirs.items():
+                o, t = array('i'), array('i')
+                o.frombytes(offsets)
+                t.frombytes(targets)
+                adjacency[rel][direction] = (o, t)
+        return cls(payload["ids"], payload["names"], payload["types"], adjacency, payload["signature"])
+
+    @classmethod
+    def load(cls, db_path=DB_PATH, snapshot_path=SNAPSHOT_PATH):
+        """Loads from the snapshot when it matches the database, otherwise from SQLite (refreshing the snapshot)."""
+        conn = sqlite3.connect(db_path)
+        try:
+            signature = graph_signature(conn)
+        finally:
+            conn.close()
+        if snapshot_path and os.path.exists(snapshot_path):
+            try:
+                engine = cls.load_snapshot(snapshot_path)
+                if engine.signature == signature:
+                    return engine
+            except (ValueError, pickle.UnpicklingError, EOFError):
+                pass # Stale or unreadable snapshot: rebuild below
+        engine = cls.from_db(db_path)
+        if snapshot_path:
+            engine.save(snapshot_path)
+        return engine
+
+    # --- Traversals -------------------------------------------------------
+
+    def neighbors(self, node, relationship=None, direction='out'):
+        """Integer ids adjacent to node (an id string or integer), optionally for one relationship."""
+        i = self.index[node] if isinstance(node, str) else node
+        relationships = [relationship] if relationship else list(self.adjacency)
+        result = []
+        for rel in relationships:
+            if rel not in self.adjacency:
+                continue
+            offsets, targets = self.adjacency[rel][direction]
+            result.extend(targets[offsets[i]:offsets[i + 1]])
+        return result
+
+    def nodes_of_type(self, node_type):
+        return self.by_type.get(node_type, array('i'))
+
+    def member_parents(self):
+        """parents[i] is the first MEMBER_OF target of node i, or -1 (built once, then cached)."""
+        if self._parents is None:
+            self._parents = array('i', [-1]) * len(self.ids)
+            if 'MEMBER_OF' in self.adjacency:
+                offsets, targets = self.adjacency['MEMBER_OF']['out']
+                for i in range(len(self.ids)):
+                    if offsets[i + 1] > offsets[i]:
+                        self._parents[i] = targets[offsets[i]]
+        return self._parents
+
+    def rollup(self, from_type='species', to_type='order'):
+        """Counts from_type nodes under each to_type node, e.g. species per order. Returns {name: count}."""
+        if from_type not in RANKS or to_type not in RANKS or RANKS.index(to_type) <= RANKS.index(from_type):
+            raise ValueError(f"Cannot roll {from_type} up to {to_type}")
+        parents = self.member_parents()
+        # Aggregate one level at a time so each family is visited once, not once per species
+        level = Counter(parents[i] for i in self.nodes_of_type(from_type))
+        counts = Counter()
+        for _ in RANKS: # Bounded, so a MEMBER_OF cycle cannot loop forever
+            next_level = Counter()
+            for node, count in level.items():
+                if node < 0:
+                    continue
+                if self.types[node] == to_type:
+                    counts[self.names[node]] += count
+                elif self.types[node] != from_type:
+                    next_level[parents[node]] += count
+            level = next_level
+        return dict(counts)
+
+    def modalities_of(self, i):
+        """Canonical modalities a node senses (HAS_SENSE edges that land on modality nodes)."""
+        return sorted({t for t in self.neighbors(i, 'HAS_SENSE') if self.types[t] == 'modality'})
+
+    def modality_cooccurrence(self, node_type='species'):
+        """Counts, over nodes of node_type, how often each pair of modalities is held together."""
+        # Most nodes share a handful of modality sets; expand each distinct set once
+        signatures = Counter(tuple(self.modalities_of(i)) for i in self.nodes_of_type(node_type))
+        counts = Counter()
+        for modalities, n in signatures.items():
+            for a, b in combinations(modalities, 2):
+                counts[(self.names[a], self.names[b])] += n
+        return dict(counts)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Load the archived graph into memory and run sample analytics.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore any snapshot and reload from SQLite")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.refresh:
+        engine = GraphEngine.from_db()
+        engine.save()
+    else:
+        engine = GraphEngine.load()
+    print(f"🧠 Loaded {len(engine.ids)} nodes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    species_per_order = engine.rollup('species', 'order')
+    families_per_order = engine.rollup('family', 'order')
+    print(f"⏱  Rollups in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for order, count in sorted(species_per_order.items(), key=lambda kv: -kv[1])[:10]:
+        print(f"  {order}: {count} species, {families_per_order.get(order, 0)} families")
+
+    print("\nTop modality pairs (species):")
+    for (a, b), count in sorted(engine.modality_cooccurrence().items(), key=lambda kv: -kv[1])[:10]:
+        print(f"  {a} + {b}: {count}")
@@ -0,0 +1,190 @@
+import os
+import csv
+import json
+import sqlite3
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+DB_PATH = 'data/orchestrator.db'
+EXPORT_DIR = 'data/graph_export'
+CHUNK_SIZE = 5000
+
+FORMATS = ('csv', 'jsonl', 'graphml', 'parquet', 'arrow')
+
+NODES_QUERY = "SELECT id, name, type FROM nodes ORDER BY id"
+EDGES_QUERY = "SELECT source, target, relationship, attributes FROM edges ORDER BY source, target, relationship"
+
+def iter_chunks(conn, query, chunk_size=CHUNK_SIZE):
+    """Yields lists of rows with fetchmany, so only one chunk is in memory at a time."""
+    cursor = conn.execute(query)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def parse_attributes(attr_json):
+    if not attr_json:
+        return None
+    try:
+        return json.loads(attr_json)
+    except ValueError:
+        return {"raw": attr_json}
+
+def quantitative_columns(attributes):
+    """Pulls min/max/unit out of an edge's attributes (present on species -> sub_type edges)."""
+    if not isinstance(attributes, dict):
+        return None, None, None
+    def number(value):
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    return number(attributes.get('min')), number(attributes.get('max')), attributes.get('unit')
+
+@contextmanager
+def atomic_open(path, mode='w'):
+    """Writes to a temp file and moves it into place, so readers never see a half-written export."""
+    tmp = path + '.tmp'
+    kwargs = {} if 'b' in mode else {'encoding': 'utf-8', 'newline': ''}
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def write_csv(conn, out_dir, chunk_size=CHUNK_SIZE):
+    """Gephi-compatible node and edge tables."""
+    paths = [os.path.join(out_dir, 'nodes.csv'), os.path.join(out_dir, 'edges.csv')]
+    with atomic_open(paths[0]) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(["ID", "Label", "Type"])
+        for rows in iter_chunks(conn, NODES_QUERY, chunk_size):
+            writer.writerows(rows)
+    with atomic_open(paths[1]) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(["Source", "Target", "Type", "Attributes"])
+        for rows in iter_chunks(conn, EDGES_QUERY, chunk_size):
+            writer.writerows((s, t, rel, attrs or '') for s, t, rel, attrs in rows)
+    return paths
+
+def write_jsonl(conn, out_dir, chunk_size=CHUNK_SIZE):
+    paths = [os.path.join(out_dir, 'nodes.jsonl'), os.path.join(out_dir, 'edges.jsonl')]
+    with atomic_open(paths[0]) as f:
+        for rows in iter_chunks(conn, NODES_QUERY, chunk_size):
+            f.writelines(json.dumps({"id": i, "name": n, "type": t}, ensure_ascii=False) + '\n' for i, n, t in rows)
+    with atomic_open(paths[1]) as f:
+        for rows in iter_chunks(conn, EDGES_QUERY, chunk_size):
+            f.writelines(json.dumps({"source": s, "target": t, "relationship": rel,
+                                     "attributes": parse_attributes(attrs)}, ensure_ascii=False) + '\n'
+                         for s, t, rel, attrs in rows)
+    return paths
+
+def write_graphml(conn, out_dir, chunk_size=CHUNK_SIZE):
+    path = os.path.join(out_dir, 'graph.graphml')
+    with atomic_open(path) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+                '  <key id="type" for="node" attr.name="type" attr.type="string"/>\n'
+                '  <key id="relationship" for="edge" attr.name="relationship" attr.type="string"/>\n'
+                '  <key id="attributes" for="edge" attr.name="attributes" attr.type="string"/>\n'
+                '  <key id="min" for="edge" attr.name="min" attr.type="double"/>\n'
+                '  <key id="max" for="edge" attr.name="max" attr.type="double"/>\n'
+                '  <key id="unit" for="edge" attr.name="unit" attr.type="string"/>\n'
+                '  <graph id="umwelt" edgedefault="directed">\n')
+        for rows in iter_chunks(conn, NODES_QUERY, chunk_size):
+            f.writelines(f'    <node id={quoteattr(i)}><data key="label">{escape(n or "")}</data>'
+                         f'<data key="type">{escape(t or "")}</data></node>\n' for i, n, t in rows)
+        for rows in iter_chunks(conn, EDGES_QUERY, chunk_size):
+            for s, t, rel, attrs in rows:
+                parts = [f'<data key="relationship">{escape(rel)}</data>']
+                if attrs:
+                    parts.append(f'<data key="attributes">{escape(attrs)}</data>')
+                    lo, hi, unit = quantitative_columns(parse_attributes(attrs))
+                    if lo is not None: parts.append(f'<data key="min">{lo!r}</data>')
+                    if hi is not None: parts.append(f'<data key="max">{hi!r}</data>')
+                    if unit: parts.append(f'<data key="unit">{escape(str(unit))}</data>')
+                f.write(f'    <edge source={quoteattr(s)} target={quoteattr(t)}>{"".join(parts)}</edge>\n')
+        f.write('  </graph>\n</graphml>\n')
+    return [path]
+
+def _arrow_schemas():
+    nodes = pa.schema([("id", pa.string()), ("name", pa.string()), ("type", pa.string())])
+    edges = pa.schema([("source", pa.string()), ("target", pa.string()), ("relationship", pa.string()),
+                       ("attributes", pa.string()), ("min", pa.float64()), ("max", pa.float64()), ("unit", pa.string())])
+    return nodes, edges
+
+def _arrow_batches(conn, chunk_size):
+    """Yields ('nodes' | 'edges', RecordBatch) one chunk at a time."""
+    node_schema, edge_schema = _arrow_schemas()
+    for rows in iter_chunks(conn, NODES_QUERY, chunk_size):
+        ids, names, types = zip(*rows)
+        yield 'nodes', pa.record_batch([pa.array(ids), pa.array(names), pa.array(types)], schema=node_schema)
+    for rows in iter_chunks(conn, EDGES_QUERY, chunk_size):
+        columns = [[], [], [], [], [], [], []]
+        for s, t, rel, attrs in rows:
+            for column, value in zip(columns, (s, t, rel, attrs) + quantitative_columns(parse_attributes(attrs))):
+                column.append(value)
+        yield 'edges', pa.record_batch([pa.array(c, type=f.type) for c, f in zip(columns, edge_schema)],
+                                       schema=edge_schema)
+
+def _open_columnar(path, schema, fmt):
+    return pq.ParquetWriter(path, schema) if fmt == 'parquet' else pa.ipc.new_file(path, schema)
+
+def write_columnar(conn, out_dir, fmt, chunk_size=CHUNK_SIZE):
+    """Streams record batches into Parquet or Arrow IPC files (needs pyarrow)."""
+    if pa is None:
+        raise ImportError(f"pyarrow is required for the {fmt} export (pip install pyarrow)")
+    suffix = 'parquet' if fmt == 'parquet' else 'arrow'
+    schemas = dict(zip(('nodes', 'edges'), _arrow_schemas()))
+    paths = {name: os.path.join(out_dir, f"{name}.{suffix}") for name in schemas}
+    # Open both up front so an empty table still gets a file with its schema
+    writers = {name: _open_columnar(paths[name] + '.tmp', schema, fmt) for name, schema in schemas.items()}
+    try:
+        for name, batch in _arrow_batches(conn, chunk_size):
+            writers[name].write_batch(batch)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    for name in schemas:
+        os.replace(paths[name] + '.tmp', paths[name])
+    return list(paths.values())
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'graphml': write_graphml,
+    'parquet': lambda conn, out_dir, chunk_size=CHUNK_SIZE: write_columnar(conn, out_dir, 'parquet', chunk_size),
+    'arrow': lambda conn, out_dir, chunk_size=CHUNK_SIZE: write_columnar(conn, out_dir, 'arrow', chunk_size),
+}
+
+def export_graph(formats=('csv',), out_dir=EXPORT_DIR, db_path=DB_PATH, chunk_size=CHUNK_SIZE):
+    """Streams the graph tables into each requested format. Returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    written = []
+    try:
+        for fmt in formats:
+            if fmt not in WRITERS:
+                raise ValueError(f"Unknown export format: {fmt} (choose from {', '.join(FORMATS)})")
+            written.extend(WRITERS[fmt](conn, out_dir, chunk_size=chunk_size))
+    finally:
+        conn.close()
+    return written
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export the archived graph for Gephi and analysis tools.")
+    parser.add_argument("--format", nargs='+', default=['csv'], choices=FORMATS, help="Output formats (default: csv)")
+    parser.add_argument("--out", default=EXPORT_DIR, help=f"Output directory (default: {EXPORT_DIR})")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched per round trip")
+    args = parser.parse_args()
+    for path in export_graph(args.format, out_dir=args.out, chunk_size=args.chunk_size):
+        print(f"💾 {path}")
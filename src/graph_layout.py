@@ -0,0 +1,204 @@
+import math
+import random
+import sqlite3
+from src.graph_engine import graph_signature
+
+DB_PATH = 'data/orchestrator.db'
+
+# Bump when the layout algorithm changes so stored layouts are recomputed
+LAYOUT_VERSION = 2
+ITERATIONS = 80
+THETA = 1.2 # Barnes-Hut opening angle: larger is faster and coarser
+SEED = 7
+
+# Node types laid out by the force simulation; species are placed around their family afterwards
+SKELETON_TYPES = ('modality', 'sub_type', 'order', 'family')
+
+SKELETON_EDGES_QUERY = """
+    SELECT e.source, e.target FROM edges e
+    JOIN nodes s ON s.id = e.source AND s.type IN ('modality', 'sub_type', 'order', 'family')
+    JOIN nodes t ON t.id = e.target AND t.type IN ('modality', 'sub_type', 'order', 'family')
+    UNION
+    -- Families inherit the senses of their species so they settle near those modalities
+    SELECT m.target, e.target FROM edges m
+    JOIN edges e ON e.source = m.source AND e.relationship = 'HAS_SENSE'
+    JOIN nodes t ON t.id = e.target AND t.type = 'modality'
+    WHERE m.relationship = 'MEMBER_OF' AND m.source LIKE 'species:%' AND m.target LIKE 'family:%'
+"""
+
+def init_layout_db(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS node_layout (
+            node_id TEXT PRIMARY KEY,
+            x REAL,
+            y REAL,
+            parent_id TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS layout_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+
+def _build_tree(points, x0, y0, size):
+    """
+    Quadtree over (mass, x, y) points. Each cell is [mass, cx, cy, size, children]
+    where children is a list of cells, or None for a leaf holding a single point.
+    """
+    mass = sum(p[0] for p in points)
+    cx = sum(p[0] * p[1] for p in points) / mass
+    cy = sum(p[0] * p[2] for p in points) / mass
+    if len(points) == 1 or size < 1e-6:
+        return [mass, cx, cy, size, None]
+    half = size / 2
+    quads = ([], [], [], [])
+    for p in points:
+        quads[(p[1] >= x0 + half) + 2 * (p[2] >= y0 + half)].append(p)
+    children = [_build_tree(q, x0 + half * (k & 1), y0 + half * (k >> 1), half) for k, q in enumerate(quads) if q]
+    return [mass, cx, cy, size, children]
+
+def _repulsion(cell, x, y, k2, theta):
+    """Barnes-Hut approximation of the summed repulsive force on a point at (x, y)."""
+    fx = fy = 0.0
+    stack = [cell]
+    while stack:
+        mass, cx, cy, size, children = stack.pop()
+        dx, dy = x - cx, y - cy
+        d2 = dx * dx + dy * dy
+        if children is None or size * size < theta * theta * d2:
+            if d2 < 1e-9:
+                continue # The point itself (or an exact overlap)
+            f = k2 * mass / d2
+            fx += dx * f
+            fy += dy * f
+        else:
+            stack.extend(children)
+    return fx, fy
+
+def force_layout(n, edges, masses=None, iterations=ITERATIONS, theta=THETA, seed=SEED):
+    """
+    Fruchterman-Reingold layout with Barnes-Hut repulsion, O(n log n) per iteration.
+    edges are (i, j) index pairs; masses optionally scale each node's repulsion.
+    Deterministic for a given seed and input order.
+    """
+    masses = masses or [1] * n
+    rng = random.Random(seed)
+    k = 10.0
+    side = k * math.sqrt(max(n, 1)) * 4
+    xs = [rng.uniform(-side / 2, side / 2) for _ in range(n)]
+    ys = [rng.uniform(-side / 2, side / 2) for _ in range(n)]
+    if n < 2:
+        return xs, ys
+    k2 = k * k
+    temperature = side / 10
+    for step in range(iterations):
+        x0, y0 = min(xs), min(ys)
+        size = max(max(xs) - x0, max(ys) - y0) + 1e-6
+        tree = _build_tree([(masses[i], xs[i], ys[i]) for i in range(n)], x0, y0, size)
+        dx = [0.0] * n
+        dy = [0.0] * n
+        for i in range(n):
+            dx[i], dy[i] = _repulsion(tree, xs[i], ys[i], k2 * masses[i], theta)
+        for i, j in edges:
+            ex, ey = xs[i] - xs[j], ys[i] - ys[j]
+            d = math.sqrt(ex * ex + ey * ey) + 1e-9
+            f = d / k
+            dx[i] -= ex * f
+            dy[i] -= ey * f
+            dx[j] += ex * f
+            dy[j] += ey * f
+        for i in range(n):
+            # Weak gravity keeps disconnected components from drifting away
+            dx[i] -= xs[i] * 0.01
+            dy[i] -= ys[i] * 0.01
+            d = math.sqrt(dx[i] * dx[i] + dy[i] * dy[i])
+            if d > 0:
+                limited = min(d, temperature)
+                xs[i] += dx[i] / d * limited
+                ys[i] += dy[i] / d * limited
+        temperature *= 0.95
+    return xs, ys
+
+def place_members(center, members, spacing=2.0):
+    """Places members on a sunflower spiral around center; returns [(member, x, y)]."""
+    golden = math.pi * (3 - math.sqrt(5))
+    cx, cy = center
+    placed = []
+    for n, member in enumerate(members, start=1):
+        r = spacing * math.sqrt(n)
+        placed.append((member, cx + r * math.cos(n * golden), cy + r * math.sin(n * golden)))
+    return placed
+
+def compute_layout(conn):
+    """Lays out the skeleton with forces and spirals species around their family. Returns row tuples."""
+    skeleton = [r[0] for r in conn.execute(
+        "SELECT id FROM nodes WHERE type IN ('modality', 'sub_type', 'order', 'family') ORDER BY id")]
+    index = {node_id: i for i, node_id in enumerate(skeleton)}
+    edges = sorted({(index[s], index[t]) for s, t in conn.execute(SKELETON_EDGES_QUERY)
+                    if s in index and t in index and s != t})
+
+    members = {}
+    orphans = []
+    for species, family in conn.execute("""
+        SELECT n.id, (SELECT e.target FROM edges e
+                      WHERE e.source = n.id AND e.relationship = 'MEMBER_OF' AND e.target LIKE 'family:%'
+                      ORDER BY e.target LIMIT 1)
+        FROM nodes n WHERE n.type = 'species' ORDER BY n.id
+    """):
+        if family in index:
+            members.setdefault(family, []).append(species)
+        else:
+            orphans.append(species)
+
+    # Repulsion grows with degree, as in ForceAtlas2, so hubs do not pull the graph into a knot;
+    # families also repel in proportion to their species, leaving room for the spirals
+    masses = [1 + len(members.get(node_id, ())) for node_id in skeleton]
+    for i, j in edges:
+        masses[i] += 1
+        masses[j] += 1
+    xs, ys = force_layout(len(skeleton), edges, masses)
+    rows = [(node_id, xs[i], ys[i], None) for i, node_id in enumerate(skeleton)]
+    for family, species in members.items():
+        i = index[family]
+        rows.extend((s, x, y, family) for s, x, y in place_members((xs[i], ys[i]), species))
+    # Species without a family ring the outside of the layout
+    radius = max((math.hypot(x, y) for x, y in zip(xs, ys)), default=0) + 50
+    for n, species in enumerate(orphans):
+        angle = 2 * math.pi * n / len(orphans)
+        rows.append((species, radius * math.cos(angle), radius * math.sin(angle), None))
+    return rows
+
+def stored_layout(conn, force=False):
+    """
+    Returns {node_id: (x, y, parent_id)}, recomputing the stored layout only when the
+    graph (or the layout algorithm) changed since it was last saved.
+    """
+    init_layout_db(conn)
+    signature = f"{LAYOUT_VERSION}:{graph_signature(conn)}"
+    stored = conn.execute("SELECT value FROM layout_meta WHERE key = 'signature'").fetchone()
+    if force or not stored or stored[0] != signature:
+        rows = compute_layout(conn)
+        conn.execute("DELETE FROM node_layout")
+        conn.executemany("INSERT INTO node_layout (node_id, x, y, parent_id) VALUES (?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO layout_meta (key, value) VALUES ('signature', ?)", (signature,))
+        conn.commit()
+        print(f"📐 Computed layout for {len(rows)} nodes")
+    return {node_id: (x, y, parent) for node_id, x, y, parent in conn.execute(
+        "SELECT node_id, x, y, parent_id FROM node_layout")}
+
+def ensure_layout(db_path=DB_PATH, force=False):
+    conn = sqlite3.connect(db_path)
+    try:
+        return stored_layout(conn, force)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Precompute the web-of-senses layout and store it with the graph.")
+    parser.add_argument("--force", action="store_true", help="Recompute even if the stored layout is current")
+    args = parser.parse_args()
+    layout = ensure_layout(force=args.force)
+    print(f"✨ Layout ready for {len(layout)} nodes")
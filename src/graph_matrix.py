@@ -0,0 +1,67 @@
+import sqlite3
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DB_PATH = 'data/orchestrator.db'
+
+# Distinct members (families of an order, species of a family) sensing each modality,
+# for every (group, modality) pair in one grouped pass over the edge list.
+MODALITY_MATRIX_QUERY = """
+    SELECT g.name, m.name, COUNT(DISTINCT e1.source)
+    FROM nodes g
+    JOIN edges e1 ON e1.target = g.id AND e1.relationship = 'MEMBER_OF'
+    JOIN nodes f ON f.id = e1.source AND f.type = ?
+    JOIN edges e2 ON e2.source = e1.source AND e2.relationship = 'HAS_SENSE'
+    JOIN nodes m ON m.id = e2.target AND m.type = 'modality'
+    WHERE g.type = ?
+    GROUP BY g.name, m.name
+"""
+
+class LabeledMatrix(namedtuple('LabeledMatrix', ['rows', 'columns', 'values'])):
+    """A dense count matrix: values[i][j] is the count for rows[i] × columns[j]."""
+    __slots__ = ()
+
+    def cell(self, row, column):
+        return self.values[self.rows.index(row)][self.columns.index(column)]
+
+    def records(self, row_key):
+        """One dict per row, e.g. {"order": "Carnivora", "Photoreception": 3, ...}."""
+        return [dict({row_key: row}, **dict(zip(self.columns, values))) for row, values in zip(self.rows, self.values)]
+
+    def to_numpy(self):
+        if np is None:
+            raise ImportError("numpy is required for LabeledMatrix.to_numpy()")
+        return np.array(self.values, dtype=np.int64).reshape(len(self.rows), len(self.columns))
+
+def modality_matrix(group_type='order', member_type='family', rows=None, columns=None, db_path=DB_PATH, conn=None):
+    """
+    Builds the group × modality matrix of distinct members with a HAS_SENSE edge to each modality.
+    rows/columns pick and order the labels; by default every group/modality present, sorted by name.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        counts = {}
+        for group, modality, count in conn.execute(MODALITY_MATRIX_QUERY, (member_type, group_type)):
+            counts[(group, modality)] = count
+    finally:
+        if own_conn:
+            conn.close()
+
+    rows = list(rows) if rows is not None else sorted({g for g, _ in counts})
+    columns = list(columns) if columns is not None else sorted({m for _, m in counts})
+    values = [[counts.get((row, column), 0) for column in columns] for row in rows]
+    return LabeledMatrix(rows, columns, values)
+
+def order_modality_matrix(rows=None, columns=None, db_path=DB_PATH, conn=None):
+    """Orders × modalities, counting distinct families."""
+    return modality_matrix('order', 'family', rows, columns, db_path, conn)
+
+def family_modality_matrix(rows=None, columns=None, db_path=DB_PATH, conn=None):
+    """Families × modalities, counting distinct species."""
+    return modality_matrix('family', 'species', rows, columns, db_path, conn)
@@ -0,0 +1,115 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+
+GBIF_API = "https://api.gbif.org/v1"
+GBIF_PAGE_SIZE = 1000 # Largest page GBIF's species search serves
+
+# Concurrent requests allowed per host; everything else gets DEFAULT_HOST_LIMIT
+HOST_LIMITS = {
+    'api.gbif.org': 8,
+    'en.wikipedia.org': 4,
+}
+DEFAULT_HOST_LIMIT = 4
+
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1.0 # Seconds, doubled after every failed attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TIMEOUT = 30
+
+def retry_after(resp, default):
+    """Seconds the server asked us to wait, if it said so in seconds."""
+    try:
+        return float(resp.headers.get('Retry-After', default))
+    except ValueError:
+        return default
+
+class HostLimiter:
+    """Caps the number of in-flight requests per host across all worker threads."""
+    def __init__(self, limits=None, default=DEFAULT_HOST_LIMIT):
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.default = default
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host):
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.limits.get(host, self.default))
+            semaphore = self.semaphores[host]
+        with semaphore:
+            yield
+
+class PooledClient:
+    """
+    JSON-over-HTTP client for worker pools: one keep-alive session per thread,
+    per-host concurrency limits, and retries with backoff on throttling and 5xx.
+    """
+    def __init__(self, limiter=None, max_retries=MAX_RETRIES, timeout=TIMEOUT, headers=None):
+        self.limiter = limiter or HostLimiter()
+        self.headers = headers or {}
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        # requests.Session is not guaranteed thread-safe, so each worker keeps its own
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.headers)
+        return self.local.session
+
+    def get_json(self, url, params=None):
+        host = urlparse(url).hostname
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.limiter.slot(host):
+                    resp = self.session.get(url, params=params, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp.json()
+                wait = retry_after(resp, RETRY_BACKOFF * 2 ** attempt)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                wait = RETRY_BACKOFF * 2 ** attempt
+            if attempt == self.max_retries:
+                resp.raise_for_status()
+            time.sleep(wait)
+
+    def gbif_search(self, **params):
+        """One page of GBIF's species search."""
+        return self.get_json(f"{GBIF_API}/species/search", params)
+
+    def gbif_match(self, **params):
+        """GBIF's best backbone match for a name."""
+        return self.get_json(f"{GBIF_API}/species/match", params)
+
+    def gbif_pages(self, page_size=GBIF_PAGE_SIZE, offset=0, max_results=None, **params):
+        """
+        Yields (next_offset, results) for every page of a GBIF species search, starting at
+        offset. The next page is requested while the caller works through the current one.
+        """
+        end = None if max_results is None else offset + max_results
+        def fetch(start):
+            limit = page_size if end is None else min(page_size, end - start)
+            return self.gbif_search(offset=start, limit=limit, **params)
+
+        with ThreadPoolExecutor(1) as prefetch:
+            future = prefetch.submit(fetch, offset)
+            while future:
+                page = future.result()
+                results = page.get("results", [])
+                offset += len(results)
+                more = results and not page.get("endOfRecords", True) and (end is None or offset < end)
+                future = prefetch.submit(fetch, offset) if more else None
+                yield offset, results
+
+    def gbif_all(self, **params):
+        """Every result of a GBIF species search, across all pages."""
+        return [r for _, results in self.gbif_pages(**params) for r in results]
@@ -53,6 +53,8 @@ class SensoryModality(BaseModel):
     quantitative_data: Optional[QuantitativeData] = None
     mechanism: Optional[Mechanism] = None
     evidence: List[Evidence] = Field(default_factory=list)
+    # Unit-normalized merge of every source's bounds: {unit: {"union", "intersection", "sources"}}
+    range_summary: Optional[dict] = None
 
 class DataQualityMeta(BaseModel):
     data_quality_flag: Literal['High_Evidence', 'Inferred_Only', 'Contested', 'Low_Data']
@@ -80,4 +82,6 @@ class FamilySensoryProfile(BaseModel):
     sensory_modalities: dict[str, dict]
     confidence: Literal['LOW', 'MEDIUM', 'HIGH']
     sources: List[str]
+    # Vault species in this family, e.g. {"gbif_id": 2440502, "scientific_name": "...", "modalities": [...]}
+    supporting_species: List[dict] = Field(default_factory=list)
     generated_at: datetime = Field(default_factory=datetime.now)
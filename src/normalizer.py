@@ -1,5 +1,9 @@
+import os
+import re
 import sqlite3
 import json
+from collections import Counter
+from functools import lru_cache
 
 DB_PATH = 'data/orchestrator.db'
 
@@ -99,44 +103,176 @@ MODALITY_MAP = {
     'Magnetoreception': 'Magnetoreception',
 }
 
+CANONICAL_MODALITIES = frozenset(MODALITY_MAP.values())
+
+# Fallback rules for modality labels missing from MODALITY_MAP, matched against
+# normalized keys. Sub_type labels only use exact keys so 'UV Vision' stays a sub_type.
+MODALITY_PATTERNS = [
+    ('Electroreception', r'\belectr'),
+    ('Magnetoreception', r'\bmagnet'),
+    ('Thermoreception', r'\btherm|\bheat|\binfrared|\btemperature'),
+    ('Photoreception', r'\bphoto|\bvision|\bvisual|\blight\b|\boptic|\bocell'),
+    ('Chemoreception', r'\bchemo|\bchemic|\bolfact|\bsmell|\btaste|\bgustat|\bpheromone'),
+    ('Mechanoreception', r'\bmechano|\bhear|\baudit|\bacoustic|\bvibrat|\btactil|\btouch|\bsomatosens'
+                         r'|\bproprio|\blateral line|\bstatocyst|\becholocat'),
+]
+_MODALITY_MATCHER = re.compile('|'.join(f'(?P<g{i}>{pattern})' for i, (_, pattern) in enumerate(MODALITY_PATTERNS)))
+
+# Labels that fell through both the map and the patterns, with how often they were seen
+UNMAPPED_LABELS = Counter()
+
+def normalize_key(label):
+    """Lowercases, folds separators (space, _, -, /, parentheses) and strips plural 's' from each word."""
+    words = re.split(r'[\s_\-/().,:;]+', str(label).lower())
+    return ' '.join(w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith(('ss', 'is', 'us')) else w
+                    for w in words if w)
+
+_KEYED_MAP = {normalize_key(k): v for k, v in MODALITY_MAP.items()}
+_KEYED_MAP.update({normalize_key(v): v for v in CANONICAL_MODALITIES})
+
+@lru_cache(maxsize=None)
+def _resolve_modality(label):
+    """Returns (canonical_name, mapped) for a stripped modality label."""
+    key = normalize_key(label)
+    if key in _KEYED_MAP:
+        return _KEYED_MAP[key], True
+    match = _MODALITY_MATCHER.search(key)
+    if match:
+        return MODALITY_PATTERNS[int(match.lastgroup[1:])][0], True
+    return label, False
+
+def canonical_modality(label):
+    """Maps a raw modality label onto its canonical domain; unmapped labels pass through stripped."""
+    if label is None:
+        return None
+    label = str(label).strip()
+    if not label:
+        return None
+    name, mapped = _resolve_modality(label)
+    if not mapped:
+        UNMAPPED_LABELS[label] += 1
+    return name
+
+@lru_cache(maxsize=None)
+def _resolve_sub_type(label):
+    return _KEYED_MAP.get(normalize_key(label))
+
+def canonical_node(label, node_type):
+    """
+    Returns the canonical (id, name, type) for a modality or sub_type label.
+    A sub_type label that names a modality (e.g. 'Olfaction') becomes that modality node.
+    """
+    if label is None or not str(label).strip():
+        return None
+    label = str(label).strip()
+    if node_type == 'modality':
+        name = canonical_modality(label)
+        return (f"modality:{name}", name, 'modality')
+    modality = _resolve_sub_type(label)
+    if modality:
+        return (f"modality:{modality}", modality, 'modality')
+    return (f"sub_type:{label}", label, 'sub_type')
+
+def print_unmapped(counts, limit=15):
+    if not counts:
+        return
+    print(f"🏷  {len(counts)} unmapped modality labels (add them to MODALITY_MAP or MODALITY_PATTERNS):")
+    for label, freq in counts.most_common(limit):
+        print(f"  {freq:>5}  {label}")
+
+def report_unmapped(vault_dirs=('data/vault', 'data/family_vault')):
+    """Scans the vaults and reports modality labels the canonicalizer cannot place."""
+    from src.vault_codec import read_record
+    UNMAPPED_LABELS.clear()
+    for vault_dir in vault_dirs:
+        for filename in sorted(os.listdir(vault_dir)):
+            if not filename.endswith('.json'):
+                continue
+            modalities = read_record(os.path.join(vault_dir, filename)).get('sensory_modalities', [])
+            # Species list claims; family profiles key them by name
+            labels = modalities.keys() if isinstance(modalities, dict) else [m.get('modality_domain') for m in modalities]
+            for label in labels:
+                canonical_modality(label)
+    print_unmapped(UNMAPPED_LABELS, limit=None)
+    return UNMAPPED_LABELS
+
 def normalize_database():
+    """
+    Migrates an existing graph onto canonical modality labels with set-based SQL.
+    Graphs written by the current archivist are already canonical; this is for older ones.
+    """
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    
+
     print("🧹 Normalizing labels in graph tables...")
-    
-    # We'll update the nodes table directly.
-    # Note: This might create duplicates if we have 'vision' and 'Vision' both becoming 'Photoreception'.
-    # We'll handle this by merging edges next.
-    
-    # 1. Get all nodes
-    c.execute("SELECT id, name FROM nodes WHERE type IN ('modality', 'sub_type')")
-    nodes = c.fetchall()
-    
-    for node_id, name in nodes:
-        if name in MODALITY_MAP:
-            new_name = MODALITY_MAP[name]
-            # Since node_id often contains the name (modality:vision), we might need to update the ID too
-            new_id = f"modality:{new_name}"
-            
-            # Update Edges first to point to the new ID
-            c.execute("UPDATE edges SET source = ? WHERE source = ?", (new_id, node_id))
-            c.execute("UPDATE edges SET target = ? WHERE target = ?", (new_id, node_id))
-            
-            # Update Node
-            # We use INSERT OR REPLACE to handle the potential duplicate ID
-            c.execute("UPDATE nodes SET id = ?, name = ? WHERE id = ?", (new_id, new_name, node_id))
-
-    # 2. Cleanup orphaned or duplicate nodes
-    c.execute("DELETE FROM nodes WHERE id NOT IN (SELECT source FROM edges UNION SELECT target FROM edges)")
-    
-    # 3. Consolidate duplicate edges (source, target, relationship)
-    # SQLite doesn't have a simple 'GROUP BY' for updates, so we'll just let the primary key handle it if possible
-    # or just trust the next archivist run to do it cleaner.
-    
+
+    c.execute("CREATE TEMP TABLE label_map (old_id TEXT PRIMARY KEY, new_id TEXT, new_name TEXT, new_type TEXT)")
+    c.execute("SELECT id, name, type FROM nodes WHERE type IN ('modality', 'sub_type')")
+    mapping = []
+    for node_id, name, node_type in c.fetchall():
+        canonical = canonical_node(name, node_type)
+        if canonical and canonical[0] != node_id:
+            mapping.append((node_id, *canonical))
+    c.executemany("INSERT INTO label_map VALUES (?, ?, ?, ?)", mapping)
+
+    c.execute("INSERT OR IGNORE INTO nodes (id, name, type) SELECT new_id, new_name, new_type FROM label_map")
+
+    # Re-point edges in one pass; INSERT OR IGNORE merges edges that collide on the primary key
+    c.execute("""
+        INSERT OR IGNORE INTO edges (source, target, relationship, attributes)
+        SELECT COALESCE(ms.new_id, e.source), COALESCE(mt.new_id, e.target), e.relationship, e.attributes
+        FROM edges e
+        LEFT JOIN label_map ms ON ms.old_id = e.source
+        LEFT JOIN label_map mt ON mt.old_id = e.target
+        WHERE ms.old_id IS NOT NULL OR mt.old_id IS NOT NULL
+    """)
+    c.execute("""
+        DELETE FROM edges
+        WHERE source IN (SELECT old_id FROM label_map) OR target IN (SELECT old_id FROM label_map)
+    """)
+
+    # Keep archive provenance in step so incremental archiving can still retract these rows
+    if c.execute("SELECT 1 FROM sqlite_master WHERE name = 'edge_sources'").fetchone():
+        c.execute("""
+            INSERT OR IGNORE INTO edge_sources (record_path, source, target, relationship)
+            SELECT s.record_path, COALESCE(ms.new_id, s.source), COALESCE(mt.new_id, s.target), s.relationship
+            FROM edge_sources s
+            LEFT JOIN label_map ms ON ms.old_id = s.source
+            LEFT JOIN label_map mt ON mt.old_id = s.target
+            WHERE ms.old_id IS NOT NULL OR mt.old_id IS NOT NULL
+        """)
+        c.execute("""
+            DELETE FROM edge_sources
+            WHERE source IN (SELECT old_id FROM label_map) OR target IN (SELECT old_id FROM label_map)
+        """)
+        c.execute("""
+            INSERT OR IGNORE INTO node_sources (record_path, node_id)
+            SELECT s.record_path, m.new_id FROM node_sources s JOIN label_map m ON m.old_id = s.node_id
+        """)
+        c.execute("DELETE FROM node_sources WHERE node_id IN (SELECT old_id FROM label_map)")
+        c.execute("""
+            DELETE FROM edge_sources
+            WHERE source = target OR (relationship = 'INSTANCE_OF' AND source LIKE 'modality:%')
+        """)
+
+    # Sub_types that collapsed into a modality leave self-loops and modality -> modality INSTANCE_OF edges
+    c.execute("DELETE FROM edges WHERE source = target OR (relationship = 'INSTANCE_OF' AND source LIKE 'modality:%')")
+    c.execute("DELETE FROM nodes WHERE id IN (SELECT old_id FROM label_map)")
+    c.execute("""
+        DELETE FROM nodes WHERE type IN ('modality', 'sub_type')
+        AND id NOT IN (SELECT source FROM edges UNION SELECT target FROM edges)
+    """)
+
     conn.commit()
     conn.close()
-    print("✨ Normalization complete.")
+    print(f"✨ Normalization complete. {len(mapping)} labels remapped.")
 
 if __name__ == "__main__":
-    normalize_database()
+    import argparse
+    parser = argparse.ArgumentParser(description="Canonicalize modality labels in the graph.")
+    parser.add_argument("--report", action="store_true", help="List vault modality labels that do not map to a canonical domain")
+    args = parser.parse_args()
+    if args.report:
+        report_unmapped()
+    else:
+        normalize_database()
@@ -0,0 +1,336 @@
+import os
+import sqlite3
+from src.claim_linker import UNIT_CONVERSIONS
+from src.vault_codec import read_record
+
+DB_PATH = 'data/orchestrator.db'
+SPECIES_VAULT_DIR = 'data/vault'
+FAMILY_VAULT_DIR = 'data/family_vault'
+
+# Spellings the LLM uses for units that are already base units
+UNIT_ALIASES = {
+    'hz': 'Hz',
+    'hertz': 'Hz',
+    'khz': 'kHz',
+    'mhz': 'MHz',
+    'ghz': 'GHz',
+    'nm': 'nm',
+    'nanometers': 'nm',
+    'nanometres': 'nm',
+    'μm': 'µm',
+}
+
+def normalize_unit(unit):
+    """Maps a unit to its base unit (via UNIT_CONVERSIONS) and returns (base_unit, multiplier)."""
+    if not unit:
+        return None, 1
+    unit = unit.strip()
+    unit = UNIT_ALIASES.get(unit.lower(), unit)
+    if unit in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[unit]
+    return unit, 1
+
+def source_bound(qd, source):
+    """Converts a quantitative_data-style dict into a unit-normalized per-source bound."""
+    if not qd:
+        return None
+    lo, hi = qd.get('min'), qd.get('max')
+    if lo is None and hi is None:
+        return None
+    if lo is not None and hi is not None and lo > hi:
+        # Model output sometimes lists the bounds the wrong way round
+        lo, hi = hi, lo
+    unit, multiplier = normalize_unit(qd.get('unit'))
+    return {
+        "source": source,
+        "min": lo * multiplier if lo is not None else None,
+        "max": hi * multiplier if hi is not None else None,
+        "unit": unit,
+        "context": qd.get('context')
+    }
+
+def _interval(bound):
+    # A single-bound measurement is treated as the point it names
+    lo = bound['min'] if bound['min'] is not None else bound['max']
+    hi = bound['max'] if bound['max'] is not None else bound['min']
+    return lo, hi
+
+def union_intervals(intervals):
+    """Merges overlapping [lo, hi] intervals into a sorted, disjoint list."""
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+def intersect_intervals(intervals):
+    """Returns the [lo, hi] range shared by every interval, or None if they are disjoint."""
+    if not intervals:
+        return None
+    lo = max(i[0] for i in intervals)
+    hi = min(i[1] for i in intervals)
+    return [lo, hi] if lo <= hi else None
+
+def summarize(bounds):
+    """Builds the per-unit range summary (union, intersection, per-source bounds)."""
+    summary = {}
+    for bound in bounds:
+        group = summary.setdefault(bound['unit'], {"union": [], "intersection": None, "sources": []})
+        group['sources'].append(bound)
+    for group in summary.values():
+        intervals = [_interval(b) for b in group['sources']]
+        group['union'] = union_intervals(intervals)
+        group['intersection'] = intersect_intervals(intervals)
+    return summary
+
+def add_bound(bounds, bound):
+    """Appends a bound unless the same source already reported the same range."""
+    if bound is None:
+        return bounds
+    key = (bound['source'], bound['min'], bound['max'], bound['unit'])
+    if not any((b['source'], b['min'], b['max'], b['unit']) == key for b in bounds):
+        bounds.append(bound)
+    return bounds
+
+def hull(group):
+    """Outermost known [min, max] of a unit group."""
+    mins = [b['min'] for b in group['sources'] if b['min'] is not None]
+    maxs = [b['max'] for b in group['sources'] if b['max'] is not None]
+    return (min(mins) if mins else None), (max(maxs) if maxs else None)
+
+def _all_bounds(summary):
+    return [b for group in (summary or {}).values() for b in group['sources']]
+
+def _evidence_label(mod):
+    for ev in mod.get('evidence', []):
+        label = ev.get('citation') or ev.get('url') or ev.get('source_name')
+        if label:
+            return label
+    return 'unattributed'
+
+def merge_modality_ranges(existing_mod, new_mod=None):
+    """
+    Merges species-level quantitative data into existing_mod.
+    Keeps every source's normalized bounds in 'range_summary' and rewrites
+    'quantitative_data' to the hull of the primary unit.
+    """
+    bounds = _all_bounds(existing_mod.get('range_summary'))
+    if not bounds:
+        add_bound(bounds, source_bound(existing_mod.get('quantitative_data'), _evidence_label(existing_mod)))
+    if new_mod is not None:
+        new_bounds = _all_bounds(new_mod.get('range_summary')) or \
+            [source_bound(new_mod.get('quantitative_data'), _evidence_label(new_mod))]
+        for bound in new_bounds:
+            add_bound(bounds, bound)
+    if not bounds:
+        return existing_mod
+
+    summary = summarize(bounds)
+    existing_qd = existing_mod.get('quantitative_data') or (new_mod or {}).get('quantitative_data') or {}
+    unit = normalize_unit(existing_qd.get('unit'))[0]
+    if unit not in summary:
+        unit = bounds[0]['unit']
+    lo, hi = hull(summary[unit])
+
+    existing_mod['range_summary'] = summary
+    existing_mod['quantitative_data'] = {
+        "min": lo,
+        "max": hi,
+        "unit": unit,
+        "context": existing_qd.get('context')
+    }
+    return existing_mod
+
+def _family_bound(mod_data, source):
+    fr = mod_data.get('frequency_range_hz')
+    if not fr:
+        return None
+    # The family prompt emits {min: 0, max: 0} when the range is unknown
+    if not fr.get('min') and not fr.get('max'):
+        return None
+    return source_bound({"min": fr.get('min'), "max": fr.get('max'), "unit": 'Hz'}, source)
+
+def merge_family_ranges(existing_mod, new_mod=None, source='unattributed'):
+    """Merges family-level 'frequency_range_hz' values, keeping per-source bounds."""
+    summary = existing_mod.get('frequency_range_summary')
+    bounds = list(summary['sources']) if summary else []
+    if not summary:
+        add_bound(bounds, _family_bound(existing_mod, 'unattributed'))
+    if new_mod is not None:
+        add_bound(bounds, _family_bound(new_mod, source))
+    if not bounds:
+        return existing_mod
+
+    group = summarize(bounds)['Hz']
+    lo, hi = hull(group)
+    existing_mod['frequency_range_summary'] = group
+    existing_mod['frequency_range_hz'] = {"min": lo, "max": hi}
+    return existing_mod
+
+class RangeIndex:
+    """
+    Persistent interval index over merged ranges, backed by an SQLite R*Tree
+    (a 1-D R*Tree is an interval tree on disk). Falls back to a plain indexed
+    table when the SQLite build lacks the rtree module. Given a connection, the
+    index works inside the caller's transaction and leaves commit/close to it.
+    """
+    def __init__(self, db_path=DB_PATH, conn=None):
+        self.own_conn = conn is None
+        self.conn = sqlite3.connect(db_path, timeout=30) if self.own_conn else conn
+        self.c = self.conn.cursor()
+        self.c.execute('''
+            CREATE TABLE IF NOT EXISTS range_entries (
+                id INTEGER PRIMARY KEY,
+                taxon_kind TEXT,
+                taxon_key TEXT,
+                modality TEXT,
+                unit TEXT,
+                lo REAL,
+                hi REAL
+            )
+        ''')
+        self.c.execute("CREATE INDEX IF NOT EXISTS idx_range_entries_taxon ON range_entries(taxon_kind, taxon_key)")
+        try:
+            self.c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS range_rtree USING rtree(id, lo, hi)")
+            self.has_rtree = True
+        except sqlite3.OperationalError:
+            self.c.execute("CREATE INDEX IF NOT EXISTS idx_range_entries_unit_lo ON range_entries(unit, lo)")
+            self.has_rtree = False
+
+    def replace(self, taxon_kind, taxon_key, ranges):
+        """Replaces every interval of a taxon. ranges: iterable of (modality, unit, [[lo, hi], ...])."""
+        taxon_key = str(taxon_key)
+        if self.has_rtree:
+            self.c.execute("""
+                DELETE FROM range_rtree WHERE id IN
+                    (SELECT id FROM range_entries WHERE taxon_kind = ? AND taxon_key = ?)
+            """, (taxon_kind, taxon_key))
+        self.c.execute("DELETE FROM range_entries WHERE taxon_kind = ? AND taxon_key = ?", (taxon_kind, taxon_key))
+        for modality, unit, intervals in ranges:
+            for lo, hi in intervals:
+                # The R*Tree rejects lo > hi; records written before bounds were ordered may hold them
+                lo, hi = sorted((float(lo), float(hi)))
+                self.c.execute("""
+                    INSERT INTO range_entries (taxon_kind, taxon_key, modality, unit, lo, hi)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (taxon_kind, taxon_key, modality, unit, lo, hi))
+                if self.has_rtree:
+                    self.c.execute("INSERT INTO range_rtree (id, lo, hi) VALUES (?, ?, ?)",
+                                   (self.c.lastrowid, lo, hi))
+
+    def clear(self):
+        """Drops every interval, e.g. before a rebuild from the vaults."""
+        if self.has_rtree:
+            self.c.execute("DELETE FROM range_rtree")
+        self.c.execute("DELETE FROM range_entries")
+
+    def query(self, lo, hi, unit='Hz'):
+        """Returns (taxon_kind, taxon_key, modality, lo, hi) for every range overlapping [lo, hi]."""
+        base_unit, multiplier = normalize_unit(unit)
+        lo, hi = lo * multiplier, hi * multiplier
+        if self.has_rtree:
+            # R*Tree coordinates are float32 and rounded outward; re-check exact bounds
+            self.c.execute("""
+                SELECT e.taxon_kind, e.taxon_key, e.modality, e.lo, e.hi
+                FROM range_rtree r JOIN range_entries e ON e.id = r.id
+                WHERE r.lo <= ? AND r.hi >= ? AND e.unit = ? AND e.lo <= ? AND e.hi >= ?
+                ORDER BY e.taxon_kind, e.taxon_key, e.modality
+            """, (hi, lo, base_unit, hi, lo))
+        else:
+            self.c.execute("""
+                SELECT taxon_kind, taxon_key, modality, lo, hi
+                FROM range_entries
+                WHERE unit = ? AND lo <= ? AND hi >= ?
+                ORDER BY taxon_kind, taxon_key, modality
+            """, (base_unit, hi, lo))
+        return self.c.fetchall()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        if self.own_conn:
+            self.conn.commit()
+            self.conn.close()
+
+def species_ranges(data):
+    """Extracts (modality, unit, union) triples from a species record."""
+    ranges = []
+    for mod in data.get('sensory_modalities', []):
+        summary = mod.get('range_summary')
+        if not summary:
+            bound = source_bound(mod.get('quantitative_data'), None)
+            summary = summarize([bound]) if bound else {}
+        for unit, group in summary.items():
+            ranges.append((mod.get('sub_type') or mod.get('modality_domain'), unit, group['union']))
+    return ranges
+
+def family_ranges(data):
+    """Extracts (modality, unit, union) triples from a family profile."""
+    ranges = []
+    for mod_name, mod_data in data.get('sensory_modalities', {}).items():
+        group = mod_data.get('frequency_range_summary')
+        if not group:
+            bound = _family_bound(mod_data, None)
+            group = summarize([bound])['Hz'] if bound else None
+        if group:
+            ranges.append((mod_name, 'Hz', group['union']))
+    return ranges
+
+def species_key(data, filepath):
+    return data.get('identity', {}).get('gbif_id') or os.path.basename(filepath)
+
+def family_key(data):
+    return data.get('gbif_id') or data.get('family_name')
+
+def index_record(kind, key, ranges, db_path=DB_PATH, conn=None):
+    """Incrementally re-indexes one saved record."""
+    index = RangeIndex(db_path, conn=conn)
+    try:
+        index.replace(kind, key, ranges)
+    finally:
+        index.close()
+
+def rebuild_range_index(db_path=DB_PATH):
+    """Rebuilds the range index from scratch out of both vaults."""
+    records = []
+    for vault_dir, kind in ((SPECIES_VAULT_DIR, 'species'), (FAMILY_VAULT_DIR, 'family')):
+        for filename in sorted(os.listdir(vault_dir)):
+            if not filename.endswith('.json'):
+                continue
+            filepath = os.path.join(vault_dir, filename)
+            try:
+                data = read_record(filepath)
+            except Exception as e:
+                print(f"  ⚠ Could not read {filepath}: {e}")
+                continue
+            if kind == 'species':
+                records.append((kind, species_key(data, filepath), species_ranges(data)))
+            else:
+                records.append((kind, family_key(data), family_ranges(data)))
+
+    # Cleared and refilled in one transaction, so deleted or renamed records leave nothing behind
+    index = RangeIndex(db_path)
+    index.clear()
+    for kind, key, ranges in records:
+        index.replace(kind, key, ranges)
+    index.close()
+    print(f"📏 Indexed quantitative ranges from {len(records)} records")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or query the quantitative range index.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the vaults")
+    parser.add_argument("--query", type=float, nargs=2, metavar=("LO", "HI"), help="Find taxa whose ranges overlap [LO, HI]")
+    parser.add_argument("--unit", type=str, default="Hz", help="Unit of the query bounds (e.g. kHz)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_range_index()
+    if args.query:
+        index = RangeIndex()
+        for kind, key, modality, lo, hi in index.query(args.query[0], args.query[1], args.unit):
+            print(f"  {kind}:{key} | {modality} | {lo:g}–{hi:g}")
+        index.close()
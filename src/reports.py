@@ -0,0 +1,79 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+from src import assets
+from src.graph_engine import graph_signature
+from src.graph_export import atomic_open
+
+DB_PATH = 'data/orchestrator.db'
+REPORT_CACHE_DIR = 'data/report_cache'
+
+# name -> (compute(conn, **params), version)
+PRODUCTS = {}
+
+def report_product(name, version=1):
+    """
+    Registers compute(conn, **params) as a named data product. Its JSON-serializable result
+    is cached per graph version; bump version when the computation changes.
+    """
+    def register(compute):
+        PRODUCTS[name] = (compute, version)
+        return compute
+    return register
+
+def product_path(name, signature, params, cache_dir=REPORT_CACHE_DIR):
+    _, version = PRODUCTS[name]
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+    return os.path.join(cache_dir, signature[:16], f"{name}-v{version}-{key}.json")
+
+def prune_report_cache(signature, cache_dir=REPORT_CACHE_DIR):
+    """Removes products cached for any other graph version."""
+    if not os.path.isdir(cache_dir):
+        return
+    for entry in os.listdir(cache_dir):
+        if entry != signature[:16]:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+def load_product(name, db_path=DB_PATH, cache_dir=REPORT_CACHE_DIR, **params):
+    """Returns the named product for the current graph, computing and caching it on a miss."""
+    if name not in PRODUCTS:
+        raise KeyError(f"Unknown report product: {name} (registered: {', '.join(sorted(PRODUCTS))})")
+    compute, _ = PRODUCTS[name]
+    conn = sqlite3.connect(db_path)
+    try:
+        signature = graph_signature(conn)
+        path = product_path(name, signature, params, cache_dir)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        result = compute(conn, **params)
+    finally:
+        conn.close()
+    prune_report_cache(signature, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_open(path) as f:
+        json.dump(result, f, separators=(',', ':'))
+    # Serve the JSON round trip on a miss too, so callers see the same types either way
+    return json.loads(json.dumps(result))
+
+def generate_all():
+    """Renders every dashboard from the cached products."""
+    from src.generate_heatmap import generate_heatmap_html
+    from src.generate_sankey import generate_sankey_html
+    from src.generate_interactive_graph import generate_html
+    generate_heatmap_html()
+    generate_sankey_html()
+    generate_html()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Render the dashboards from cached data products.")
+    parser.add_argument("--clear", action="store_true", help="Drop every cached product first")
+    assets.add_asset_argument(parser)
+    args = parser.parse_args()
+    assets.ASSET_MODE = args.assets
+    if args.clear:
+        shutil.rmtree(REPORT_CACHE_DIR, ignore_errors=True)
+    generate_all()
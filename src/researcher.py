@@ -11,6 +11,10 @@ from src.models import AnimalSensoryData
 from pydantic import ValidationError
 from src.gemini_adapter import GeminiAdapter
 from src.ollama_adapter import OllamaAdapter
+from src.change_log import record_change
+from src.range_merge import merge_modality_ranges, index_record, species_key, species_ranges
+from src.species_index import index_species
+from src.vault_codec import read_record, write_record
 
 DB_PATH = 'data/orchestrator.db'
 VAULT_DIR = 'data/vault'
@@ -360,8 +364,7 @@ class Researcher:
         
         if os.path.exists(filepath):
             print(f"  📂 Existing record found for {scientific_name} ({filename}). Merging claims...")
-            with open(filepath, 'r') as f:
-                existing_data = json.load(f)
+            existing_data = read_record(filepath)
             
             # 1. Update Identity / Aliases
             if animal_name not in existing_data['identity'].get('aliases', []):
@@ -386,9 +389,8 @@ class Researcher:
                         if ev.get('citation') not in existing_citations:
                             match['evidence'].append(ev)
                     
-                    # Update quantitative data if the new one is 'better' (has more fields)
-                    if not match.get('quantitative_data') and new_mod.get('quantitative_data'):
-                        match['quantitative_data'] = new_mod['quantitative_data']
+                    # Merge quantitative ranges (unit-normalized, per-source bounds kept)
+                    merge_modality_ranges(match, new_mod)
                 else:
                     # New modality, just add it
                     existing_modalities.append(new_mod)
@@ -409,8 +411,17 @@ class Researcher:
             if gbif_id:
                 final_data['identity']['gbif_id'] = gbif_id
 
-        with open(filepath, 'w') as f:
-            json.dump(final_data, f, indent=2)
+        write_record(filepath, final_data)
+        # Index updates and the change log entry commit together on one connection
+        entity_id = species_key(final_data, filepath)
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        try:
+            index_species(final_data, filepath, conn=conn)
+            index_record('species', entity_id, species_ranges(final_data), conn=conn)
+            record_change('species', entity_id, 'UPSERT', record_path=filepath, data=final_data, conn=conn)
+            conn.commit()
+        finally:
+            conn.close()
         print(f"✓ Saved/Merged research to {filepath}")
 
     def is_already_researched(self, gbif_id):
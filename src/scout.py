@@ -1,22 +1,19 @@
 import requests
 import sqlite3
 import os
+from src.http_client import PooledClient
+from src.scout_checkpoints import Checkpoints
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB
 
 DB_PATH = 'data/orchestrator.db'
 GBIF_BACKBONE_KEY = "d7dddbf4-2cf0-4f39-9b2a-bb099caae36c"
 
+client = PooledClient()
+
 def get_family_key(family_name):
     """Matches a family name to its canonical GBIF backbone key."""
-    url = "https://api.gbif.org/v1/species/match"
-    params = {
-        "name": family_name,
-        "rank": "FAMILY",
-        "strict": True
-    }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = client.gbif_match(name=family_name, rank="FAMILY", strict=True)
         if data.get("matchType") == "NONE":
             print(f"  ⚠ Could not find canonical GBIF match for family: {family_name}")
             return None
@@ -25,69 +22,69 @@ def get_family_key(family_name):
         print(f"  ❌ Error matching family name: {e}")
         return None
 
-def expand_taxonomy(family_name, limit=50, offset=0):
-    print(f"🔭 Scout looking for members of family: {family_name} (limit={limit}, offset={offset})")
-    
+def expand_taxonomy(family_name, limit=None, offset=None, restart=False):
+    """
+    Queues every accepted species of a family, page by page. Progress is checkpointed
+    per family, so an interrupted run resumes at the next unqueued page. limit caps the
+    number of species fetched this run; offset overrides the checkpointed start.
+    """
     # 1. Resolve canonical Family Key
     family_key = get_family_key(family_name)
     if not family_key:
         return
 
-    # 2. Query GBIF for species UNDER this family key
-    url = "https://api.gbif.org/v1/species/search"
-    params = {
-        "higherTaxonKey": family_key,
-        "rank": "SPECIES",
-        "status": "ACCEPTED",
-        "datasetKey": GBIF_BACKBONE_KEY,
-        "limit": limit,
-        "offset": offset
-    }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-    except Exception as e:
-        print(f"Error querying GBIF: {e}")
-        return
-
-    # 3. Extract Names and IDs
-    new_animals = []
-    for r in data.get('results', []):
-        if 'canonicalName' in r and 'key' in r:
-            new_animals.append({
-                'name': r['canonicalName'],
-                'id': r['key']
-            })
-
-    if not new_animals:
-        print("No species found.")
-        return
-
-    # 4. Add to Queue (Ignore Duplicates by GBIF ID)
     conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    checkpoints = Checkpoints(conn, "scout")
+    if restart:
+        checkpoints.reset(family_key)
+    if offset is None:
+        if checkpoints.is_done(family_key):
+            print(f"✅ Family {family_name} was already fully scouted (use --restart to scout it again).")
+            conn.close()
+            return
+        offset = checkpoints.offset(family_key)
+    print(f"🔭 Scout looking for members of family: {family_name} (limit={limit}, offset={offset})")
+
+    # 2. Page through GBIF species UNDER this family key, queueing each page as it arrives
     count = 0
-    for animal in new_animals:
-        try:
-            c.execute("""
-                INSERT INTO research_queue (animal_name, gbif_id, taxonomy_source, priority, status, entity_type, entity_id) 
+    pages = client.gbif_pages(offset=offset, max_results=limit, higherTaxonKey=family_key,
+                              rank="SPECIES", status="ACCEPTED", datasetKey=GBIF_BACKBONE_KEY)
+    try:
+        for next_offset, results in pages:
+            rows = [(r['canonicalName'], r['key'], f"GBIF_Expansion_{family_name}", 5, "PENDING", "species", str(r['key']))
+                    for r in results if 'canonicalName' in r and 'key' in r]
+            # Ignore duplicates by GBIF ID; the checkpoint commits with the page it covers
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO research_queue (animal_name, gbif_id, taxonomy_source, priority, status, entity_type, entity_id) 
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (animal['name'], animal['id'], f"GBIF_Expansion_{family_name}", 5, "PENDING", "species", str(animal['id'])))
-            count += 1
-        except sqlite3.IntegrityError:
-            pass # Already exists
+            """, rows)
+            count += conn.total_changes - before
+            checkpoints.save(family_key, next_offset)
+            conn.commit()
+        else:
+            if limit is None or next_offset - offset < limit:
+                checkpoints.complete(family_key)
+                conn.commit()
+    except requests.RequestException as e:
+        print(f"Error querying GBIF: {e} (progress saved, rerun to resume)")
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+    if count == 0:
+        print("No new species found.")
     print(f"🔭 Scout added {count} new species to the queue from family {family_name}.")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Scout species for a given family.")
     parser.add_argument("family", type=str, help="The biological family name (e.g., Felidae)")
-    parser.add_argument("--limit", type=int, default=50, help="Number of results to fetch")
-    parser.add_argument("--offset", type=int, default=0, help="Pagination offset")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of species to fetch this run (default: all)")
+    parser.add_argument("--offset", type=int, default=None, help="Start at this offset instead of the saved checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Forget saved checkpoints and scout from the beginning")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Query a local GBIF backbone snapshot instead of the API")
     
     args = parser.parse_args()
-    expand_taxonomy(args.family, limit=args.limit, offset=args.offset)
+    if args.backbone:
+        client = LocalBackbone(args.backbone)
+    expand_taxonomy(args.family, limit=args.limit, offset=args.offset, restart=args.restart)
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+def init_checkpoints(conn):
+    # One row per (scout run type, GBIF taxon): how far its listing got and whether it is done
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scout_checkpoints (
+            scope TEXT,
+            taxon_key TEXT,
+            next_offset INTEGER DEFAULT 0,
+            done INTEGER DEFAULT 0,
+            updated_at TEXT,
+            PRIMARY KEY (scope, taxon_key)
+        )
+    ''')
+
+class Checkpoints:
+    """
+    Per-taxon progress for one kind of scouting run (the scope), kept in the orchestrator DB
+    so an interrupted run picks up where it stopped. Writes go through the caller's
+    connection; commit them together with the queue rows they describe.
+    """
+    def __init__(self, conn, scope):
+        self.conn = conn
+        self.scope = scope
+        init_checkpoints(conn)
+
+    def _get(self, taxon_key):
+        return self.conn.execute("SELECT next_offset, done FROM scout_checkpoints WHERE scope = ? AND taxon_key = ?",
+                                 (self.scope, str(taxon_key))).fetchone()
+
+    def is_done(self, taxon_key):
+        row = self._get(taxon_key)
+        return bool(row and row[1])
+
+    def offset(self, taxon_key):
+        row = self._get(taxon_key)
+        return row[0] if row and not row[1] else 0
+
+    def save(self, taxon_key, next_offset, done=False):
+        self.conn.execute("""
+            INSERT OR REPLACE INTO scout_checkpoints (scope, taxon_key, next_offset, done, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (self.scope, str(taxon_key), next_offset, int(done), datetime.now().isoformat()))
+
+    def complete(self, taxon_key):
+        row = self._get(taxon_key)
+        self.save(taxon_key, row[0] if row else 0, done=True)
+
+    def completed(self):
+        return {key for (key,) in self.conn.execute(
+            "SELECT taxon_key FROM scout_checkpoints WHERE scope = ? AND done = 1", (self.scope,))}
+
+    def reset(self, taxon_key=None):
+        """Forgets progress for one taxon, or for the whole scope."""
+        if taxon_key is None:
+            self.conn.execute("DELETE FROM scout_checkpoints WHERE scope = ?", (self.scope,))
+        else:
+            self.conn.execute("DELETE FROM scout_checkpoints WHERE scope = ? AND taxon_key = ?",
+                              (self.scope, str(taxon_key)))
+        self.conn.commit()
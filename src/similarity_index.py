@@ -0,0 +1,175 @@
+import math
+import sqlite3
+
+DB_PATH = 'data/orchestrator.db'
+
+# Taxa that get a sensory fingerprint
+TAXON_TYPES = ('species', 'family')
+
+# Features of a taxon: its own HAS_SENSE targets (modalities and sub_types) plus,
+# for families, those of their member species.
+FEATURES_QUERY = """
+    SELECT t.id, t.name, t.type, e.target
+    FROM nodes t
+    JOIN edges e ON e.source = t.id AND e.relationship = 'HAS_SENSE'
+    WHERE t.type IN ('species', 'family') {filter}
+    UNION
+    SELECT f.id, f.name, f.type, e2.target
+    FROM nodes f
+    JOIN edges m ON m.target = f.id AND m.relationship = 'MEMBER_OF'
+    JOIN edges e2 ON e2.source = m.source AND e2.relationship = 'HAS_SENSE'
+    WHERE f.type = 'family' {filter_f}
+"""
+
+def init_similarity_index(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS feature_bits (
+            feature_id TEXT PRIMARY KEY,
+            bit INTEGER UNIQUE
+        )
+    ''')
+    # bits is the little-endian bitset of the taxon's features
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS taxon_features (
+            taxon_id TEXT PRIMARY KEY,
+            taxon_type TEXT,
+            name TEXT,
+            bits BLOB
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_taxon_features_type ON taxon_features(taxon_type)")
+
+def pack_bits(value):
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'little')
+
+def unpack_bits(blob):
+    return int.from_bytes(blob, 'little')
+
+def _feature_bits(conn):
+    return dict(conn.execute("SELECT feature_id, bit FROM feature_bits"))
+
+def _compute(conn, taxon_ids=None):
+    """Returns {taxon_id: (type, name, bitset)}, assigning bits to features seen for the first time."""
+    if taxon_ids is None:
+        query = FEATURES_QUERY.format(filter='', filter_f='')
+    else:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched_taxa (taxon_id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM touched_taxa")
+        conn.executemany("INSERT OR IGNORE INTO touched_taxa VALUES (?)", [(t,) for t in taxon_ids])
+        query = FEATURES_QUERY.format(filter="AND t.id IN (SELECT taxon_id FROM touched_taxa)",
+                                      filter_f="AND f.id IN (SELECT taxon_id FROM touched_taxa)")
+
+    bits = _feature_bits(conn)
+    next_bit = max(bits.values(), default=-1) + 1
+    taxa = {}
+    new_features = []
+    for taxon_id, name, taxon_type, feature in conn.execute(query).fetchall():
+        if feature not in bits:
+            bits[feature] = next_bit
+            new_features.append((feature, next_bit))
+            next_bit += 1
+        _, _, value = taxa.get(taxon_id, (taxon_type, name, 0))
+        taxa[taxon_id] = (taxon_type, name, value | (1 << bits[feature]))
+    conn.executemany("INSERT INTO feature_bits (feature_id, bit) VALUES (?, ?)", new_features)
+    return taxa
+
+def rebuild_similarity_index(conn):
+    """Recomputes every taxon fingerprint from the graph, within the caller's transaction."""
+    init_similarity_index(conn)
+    conn.execute("DELETE FROM taxon_features")
+    conn.execute("DELETE FROM feature_bits")
+    taxa = _compute(conn)
+    conn.executemany("INSERT INTO taxon_features (taxon_id, taxon_type, name, bits) VALUES (?, ?, ?, ?)",
+                     [(tid, ttype, name, pack_bits(value)) for tid, (ttype, name, value) in sorted(taxa.items())])
+    return len(taxa)
+
+def update_similarity_index(conn, taxon_ids):
+    """Recomputes the fingerprints of the given taxa (e.g. those the archivist just touched)."""
+    taxon_ids = [t for t in set(taxon_ids) if t.split(':', 1)[0] in TAXON_TYPES]
+    if not taxon_ids:
+        return 0
+    init_similarity_index(conn)
+    taxa = _compute(conn, taxon_ids)
+    conn.executemany("DELETE FROM taxon_features WHERE taxon_id = ?", [(t,) for t in taxon_ids if t not in taxa])
+    conn.executemany("INSERT OR REPLACE INTO taxon_features (taxon_id, taxon_type, name, bits) VALUES (?, ?, ?, ?)",
+                     [(tid, ttype, name, pack_bits(value)) for tid, (ttype, name, value) in sorted(taxa.items())])
+    return len(taxon_ids)
+
+def jaccard(a, b):
+    union = (a | b).bit_count()
+    return (a & b).bit_count() / union if union else 0.0
+
+def cosine(a, b):
+    norm = math.sqrt(a.bit_count() * b.bit_count())
+    return (a & b).bit_count() / norm if norm else 0.0
+
+METRICS = {'jaccard': jaccard, 'cosine': cosine}
+
+class SimilarityIndex:
+    """In-memory view of the persisted fingerprints for one taxon type."""
+    def __init__(self, taxon_type='family', db_path=DB_PATH):
+        conn = sqlite3.connect(db_path)
+        try:
+            init_similarity_index(conn)
+            rows = conn.execute("""
+                SELECT taxon_id, name, bits FROM taxon_features WHERE taxon_type = ? ORDER BY taxon_id
+            """, (taxon_type,)).fetchall()
+            self.features = {bit: feature for feature, bit in _feature_bits(conn).items()}
+        finally:
+            conn.close()
+        self.taxon_type = taxon_type
+        self.bits = {}
+        self.names = {}
+        # Taxa sharing an identical fingerprint are scored once
+        self.groups = {}
+        for taxon_id, name, blob in rows:
+            value = unpack_bits(blob)
+            self.bits[taxon_id] = value
+            self.names[taxon_id] = name
+            self.groups.setdefault(value, []).append(taxon_id)
+
+    def resolve(self, taxon):
+        if taxon in self.bits:
+            return taxon
+        taxon_id = f"{self.taxon_type}:{taxon}"
+        if taxon_id in self.bits:
+            return taxon_id
+        raise KeyError(f"No {self.taxon_type} fingerprint for {taxon}")
+
+    def feature_names(self, taxon):
+        value = self.bits[self.resolve(taxon)]
+        return sorted(self.features[bit] for bit in range(value.bit_length()) if value >> bit & 1)
+
+    def most_similar(self, taxon, k=20, metric='jaccard'):
+        """Returns [(name, score)] for the k taxa most similar to taxon, best first."""
+        score = METRICS[metric]
+        taxon_id = self.resolve(taxon)
+        query = self.bits[taxon_id]
+        scored = []
+        for value, members in self.groups.items():
+            s = score(query, value)
+            scored.extend((-s, self.names[m], m) for m in members if m != taxon_id)
+        scored.sort()
+        return [(name, -neg) for neg, name, _ in scored[:k]]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Find taxa with a similar sensory repertoire.")
+    parser.add_argument("taxon", nargs='?', help="Taxon name, e.g. Carcharhinidae")
+    parser.add_argument("--type", default='family', choices=TAXON_TYPES, help="Taxon type (default: family)")
+    parser.add_argument("--k", type=int, default=20, help="Number of neighbours")
+    parser.add_argument("--metric", default='jaccard', choices=sorted(METRICS))
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every fingerprint from the graph first")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        conn = sqlite3.connect(DB_PATH)
+        count = rebuild_similarity_index(conn)
+        conn.commit()
+        conn.close()
+        print(f"🧬 Fingerprinted {count} taxa.")
+    if args.taxon:
+        index = SimilarityIndex(args.type)
+        print(f"🧬 {args.taxon}: {', '.join(index.feature_names(args.taxon))}")
+        for name, s in index.most_similar(args.taxon, k=args.k, metric=args.metric):
+            print(f"  {s:.3f}  {name}")
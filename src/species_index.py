@@ -0,0 +1,114 @@
+import os
+import json
+import sqlite3
+from src.normalizer import canonical_modality
+from src.vault_codec import read_record
+
+DB_PATH = 'data/orchestrator.db'
+VAULT_DIR = 'data/vault'
+
+def init_species_index(conn):
+    """Creates the family -> species index (keyed by vault file, looked up by family)."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS family_species_index (
+            record_path TEXT PRIMARY KEY,
+            family TEXT,
+            gbif_id INTEGER,
+            scientific_name TEXT,
+            common_name TEXT,
+            modalities JSON
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_family_species_family ON family_species_index(family)")
+
+def _index_row(data, filepath):
+    identity = data.get('identity', {})
+    family = identity.get('taxonomy', {}).get('family')
+    claims = []
+    for mod in data.get('sensory_modalities', []):
+        domain = canonical_modality(mod.get('modality_domain'))
+        claim = {"modality_domain": domain, "sub_type": mod.get('sub_type')}
+        if claim not in claims:
+            claims.append(claim)
+    return (os.path.basename(filepath), family, identity.get('gbif_id'),
+            identity.get('scientific_name'), identity.get('common_name'), json.dumps(claims))
+
+def _upsert(c, rows):
+    c.executemany("""
+        INSERT OR REPLACE INTO family_species_index
+            (record_path, family, gbif_id, scientific_name, common_name, modalities)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+
+def index_species(data, filepath, db_path=DB_PATH, conn=None):
+    """
+    Incrementally (re)indexes a single species record after it is saved.
+    With conn the update joins the caller's transaction and the caller commits.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        init_species_index(conn)
+        _upsert(conn.cursor(), [_index_row(data, filepath)])
+        if own_conn:
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+def rebuild_species_index(vault_dir=VAULT_DIR, db_path=DB_PATH):
+    """Builds the index from scratch out of every species record in the vault."""
+    rows = []
+    for filename in sorted(os.listdir(vault_dir)):
+        if not filename.endswith('.json'):
+            continue
+        filepath = os.path.join(vault_dir, filename)
+        try:
+            rows.append(_index_row(read_record(filepath), filepath))
+        except Exception as e:
+            print(f"  ⚠ Could not index {filepath}: {e}")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        init_species_index(conn)
+        c = conn.cursor()
+        c.execute("DELETE FROM family_species_index")
+        _upsert(c, rows)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"🗂  Indexed {len(rows)} species records from {vault_dir}")
+    return len(rows)
+
+def species_for_family(family_name, db_path=DB_PATH, conn=None):
+    """Returns the indexed species records (with their modality claims) for a family."""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        init_species_index(conn)
+        c = conn.cursor()
+        c.execute("""
+            SELECT gbif_id, scientific_name, common_name, modalities
+            FROM family_species_index
+            WHERE family = ?
+            ORDER BY scientific_name
+        """, (family_name,))
+        return [{
+            "gbif_id": gbif_id,
+            "scientific_name": sci_name,
+            "common_name": common_name,
+            "modalities": json.loads(modalities) if modalities else []
+        } for gbif_id, sci_name, common_name, modalities in c.fetchall()]
+    finally:
+        if own_conn:
+            conn.close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the family -> species index from the species vault.")
+    parser.add_argument("--vault", type=str, default=VAULT_DIR, help="Species vault directory")
+    args = parser.parse_args()
+    rebuild_species_index(vault_dir=args.vault)
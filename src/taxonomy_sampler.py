@@ -1,60 +1,68 @@
 import requests
 import sqlite3
 import os
-import wikipediaapi
+from concurrent.futures import ThreadPoolExecutor
+from src.http_client import PooledClient
+from src.wiki_checker import WikiChecker, TITLES_PER_REQUEST
+from src.scout_checkpoints import Checkpoints
+from src.gbif_backbone import LocalBackbone, BACKBONE_DB, drop_extinct
 
 DB_PATH = 'data/orchestrator.db'
 ANIMALIA_KEY = 1
 WIKI_USER_AGENT = "UmweltProject/1.0 (https://github.com/your-repo-here; contact@example.com)"
+WORKERS = 8
+COMMIT_BATCH = 500 # Queue rows written per transaction
+SPECIES_SCAN_LIMIT = 5000 # Species listed per family while looking for documented ones
 
 class TaxonomySampler:
-    def __init__(self, families_per_order=5, species_per_family=10):
+    def __init__(self, families_per_order=5, species_per_family=10, workers=WORKERS, client=None, gbif=None):
         self.families_per_order = families_per_order
         self.species_per_family = species_per_family
-        self.wiki = wikipediaapi.Wikipedia(user_agent=WIKI_USER_AGENT, language='en')
+        self.client = client or PooledClient(headers={"User-Agent": WIKI_USER_AGENT})
+        # Taxonomy comes from the live API unless a local backbone snapshot is given
+        self.gbif = gbif or self.client
+        self.wiki = WikiChecker(self.client, DB_PATH)
         self.conn = sqlite3.connect(DB_PATH)
+        self.checkpoints = Checkpoints(self.conn, "sampler")
+        # Orders fan out to families; each level has its own pool so a task only
+        # ever waits on the level below it and the pools cannot deadlock.
+        self.order_pool = ThreadPoolExecutor(workers)
+        self.family_pool = ThreadPoolExecutor(workers)
 
     def has_wiki(self, name):
         """Quick check if a Wikipedia page exists."""
+        return self.wiki_flags([name])[0]
+
+    def wiki_flags(self, names):
+        """Whether each name has a Wikipedia page, resolved in batched, cached queries."""
         try:
-            return self.wiki.page(name).exists()
-        except:
-            return False
+            pages = self.wiki.exists_many(names)
+        except requests.RequestException as e:
+            print(f"  ⚠️ Wikipedia check failed: {e}")
+            return [False] * len(names)
+        return [pages[name] for name in names]
 
     def get_all_orders(self):
         print("📡 Fetching orders in Animalia...")
-        url = "https://api.gbif.org/v1/species/search"
-        params = {
-            "higherTaxonKey": ANIMALIA_KEY,
-            "rank": "ORDER",
-            "status": "ACCEPTED",
-            "limit": 1000
-        }
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
+        params = dict(higherTaxonKey=ANIMALIA_KEY, rank="ORDER", status="ACCEPTED")
         # Filter out extinct/fossil orders
-        return [o for o in resp.json().get("results", []) if not o.get("extinct")]
+        return drop_extinct(self.gbif.gbif_all(**params), self.gbif, self.client, **params)
 
     def score_families(self, order_key):
-        """Fetches families and scores them by richness and documentation."""
-        url = "https://api.gbif.org/v1/species/search"
-        params = {
-            "higherTaxonKey": order_key,
-            "rank": "FAMILY",
-            "status": "ACCEPTED",
-            "limit": 50 
-        }
-        resp = requests.get(url, params=params)
-        families = resp.json().get("results", [])
-        
+        """Fetches every family of an order and scores them by richness and documentation."""
+        families = self.gbif.gbif_all(higherTaxonKey=order_key, rank="FAMILY", status="ACCEPTED")
+        # Richest first, so equal scores keep the larger family ahead
+        families.sort(key=lambda x: x.get("numDescendants", 0), reverse=True)
+        flags = self.wiki_flags([f.get("canonicalName") for f in families])
+
         scored = []
-        for f in families:
+        for f, has_page in zip(families, flags):
             name = f.get("canonicalName")
             # Heuristic Score:
             # 1. log10 of species count (richness)
             # 2. +5 points for having a Wikipedia page
             richness = f.get("numDescendants", 1)
-            wiki_bonus = 5 if self.has_wiki(name) else 0
+            wiki_bonus = 5 if has_page else 0
             score = (richness ** 0.5) + wiki_bonus # Using sqrt to avoid extreme skew
             
             scored.append({
@@ -69,25 +77,25 @@ class TaxonomySampler:
 
     def pick_best_species_list(self, family_key, family_name):
         """Picks a list of species that are likely to have good research data."""
-        url = "https://api.gbif.org/v1/species/search"
-        params = {
-            "higherTaxonKey": family_key,
-            "rank": "SPECIES",
-            "status": "ACCEPTED",
-            "limit": 50 # Look at top 50 to find the best ones
-        }
-        resp = requests.get(url, params=params)
-        species_list = resp.json().get("results", [])
-        
+        species_list = []
+        flags = []
+        # Page through the family until enough species have a Wikipedia page. One page is one
+        # batched Wikipedia query, so a well-documented family costs a single lookup.
+        for _, page in self.gbif.gbif_pages(higherTaxonKey=family_key, rank="SPECIES", status="ACCEPTED",
+                                            page_size=TITLES_PER_REQUEST, max_results=SPECIES_SCAN_LIMIT):
+            species_list.extend(page)
+            flags.extend(self.wiki_flags([s.get("canonicalName") for s in page]))
+            if sum(flags) >= self.species_per_family:
+                break
+
         selected_species = []
         
         # Priority 1: Species with a Wikipedia page
-        for s in species_list:
+        for s, has_page in zip(species_list, flags):
             if len(selected_species) >= self.species_per_family:
                 break
             
-            name = s.get("canonicalName")
-            if self.has_wiki(name):
+            if has_page:
                 s['pick_method'] = "Wiki-confirmed"
                 selected_species.append(s)
         
@@ -106,28 +114,60 @@ class TaxonomySampler:
         
         return selected_species
 
-    def run(self, limit_orders=None):
+    def sample_order(self, order):
+        """Returns [(family, species_list)] for one order's top families."""
+        try:
+            top_families = self.score_families(order.get("key"))
+            species_lists = self.family_pool.map(lambda f: self.pick_best_species_list(f['key'], f['name']),
+                                                 top_families)
+            return list(zip(top_families, species_lists))
+        except requests.RequestException as e:
+            print(f"  ⚠️ Failed to sample order {order.get('canonicalName')}: {e}")
+            return []
+
+    def enqueue(self, rows, done_orders=()):
+        """
+        Inserts queue rows in one transaction, checkpointing the orders they complete;
+        returns how many rows were new.
+        """
+        before = self.conn.total_changes
+        self.conn.executemany("""
+            INSERT OR IGNORE INTO research_queue (animal_name, gbif_id, taxonomy_source, priority, status, entity_type, entity_id) 
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        changed = self.conn.total_changes - before
+        for order_key in done_orders:
+            self.checkpoints.complete(order_key)
+        self.conn.commit()
+        return changed
+
+    def run(self, limit_orders=None, restart=False):
+        if restart:
+            self.checkpoints.reset()
         orders = self.get_all_orders()
         if limit_orders:
             orders = orders[:limit_orders]
+        completed = self.checkpoints.completed()
+        if completed:
+            orders = [o for o in orders if str(o.get("key")) not in completed]
+            print(f"⏩ Resuming: skipping {len(completed)} orders finished by an earlier run.")
         
         print(f"✅ Sampling {len(orders)} orders...")
         
-        c = self.conn.cursor()
         total_added = 0
-        
-        for order in orders:
+        rows = []
+        done_orders = []
+        # map() yields in submission order, so the queue comes out the same however requests finish
+        for order, families in zip(orders, self.order_pool.map(self.sample_order, orders)):
             order_name = order.get("canonicalName")
             print(f"\n🌿 Order: {order_name}")
-            
-            top_families = self.score_families(order.get("key"))
-            if not top_families:
+
+            if not families:
                 print(f"  ⚠️ No families found for order {order_name}")
                 continue
+            done_orders.append(order.get("key"))
 
-            for f in top_families:
-                species_list = self.pick_best_species_list(f['key'], f['name'])
-                
+            for f, species_list in families:
                 if not species_list:
                      print(f"  ⚠️ No species found for family: {f['name']}")
                      continue
@@ -135,26 +175,23 @@ class TaxonomySampler:
                 print(f"  > Family {f['name']}: Found {len(species_list)} species")
 
                 for species in species_list:
-                    sci_name = species.get("scientificName")
                     canon_name = species.get("canonicalName")
                     gbif_id = species.get("key")
                     pick_method = species.get("pick_method", "Unknown")
                     
                     reason = f"Sampler: {order_name} > {f['name']} ({f['reason']}, Pick: {pick_method})"
-                    
-                    try:
-                        c.execute("""
-                            INSERT INTO research_queue (animal_name, gbif_id, taxonomy_source, priority, status, entity_type, entity_id) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (canon_name, gbif_id, reason, 10, "PENDING", "species", str(gbif_id)))
-                        # print(f"    ➕ {canon_name}")
-                        total_added += 1
-                    except sqlite3.IntegrityError:
-                        pass # print(f"    ⏩ Already in queue: {canon_name}")
-            
-            self.conn.commit()
-        
-        print(f"\n✨ Sampler finished. Added {total_added} species.")
+                    rows.append((canon_name, gbif_id, reason, 10, "PENDING", "species", str(gbif_id)))
+
+            if len(rows) >= COMMIT_BATCH:
+                total_added += self.enqueue(rows, done_orders)
+                rows = []
+                done_orders = []
+
+        total_added += self.enqueue(rows, done_orders)
+        for pool in (self.order_pool, self.family_pool):
+            pool.shutdown()
+        print(f"\n✨ Sampler finished. Added {total_added} species "
+              f"({self.wiki.requests} Wikipedia queries).")
 
 if __name__ == "__main__":
     import argparse
@@ -162,7 +199,12 @@ if __name__ == "__main__":
     parser.add_argument("--limit", type=int, default=None, help="Limit the number of orders to process (for testing)")
     parser.add_argument("--families", type=int, default=3, help="Number of families to sample per order")
     parser.add_argument("--species", type=int, default=10, help="Number of species to sample per family")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent requests per stage (default: %(default)s)")
+    parser.add_argument("--restart", action="store_true", help="Forget checkpoints and sample every order again")
+    parser.add_argument("--backbone", nargs="?", const=BACKBONE_DB, help="Query a local GBIF backbone snapshot instead of the API")
     args = parser.parse_args()
 
-    sampler = TaxonomySampler(families_per_order=args.families, species_per_family=args.species)
-    sampler.run(limit_orders=args.limit)
+    gbif = LocalBackbone(args.backbone) if args.backbone else None
+    sampler = TaxonomySampler(families_per_order=args.families, species_per_family=args.species, workers=args.workers,
+                              gbif=gbif)
+    sampler.run(limit_orders=args.limit, restart=args.restart)
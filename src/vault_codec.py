@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+
+# Optional binary backends. The plain JSON codecs always work; the others are
+# only available when their package is installed.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+CODECS = ('json', 'compact', 'msgpack', 'cbor')
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yml")
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+ZSTD_LEVEL = 10
+
+def vault_settings(config_path=CONFIG_PATH, environ=os.environ):
+    """
+    (codec, compress) for new writes: UMWELT_VAULT_CODEC / UMWELT_VAULT_ZSTD from the
+    environment, else VAULT_CODEC / VAULT_ZSTD from config.yml, else plain indented JSON.
+    A codec whose package is missing falls back to 'compact' rather than failing every save.
+    """
+    config = {}
+    if yaml is not None and os.path.exists(config_path):
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+    codec = str(environ.get('UMWELT_VAULT_CODEC') or config.get('VAULT_CODEC') or 'json').lower()
+    compress = environ.get('UMWELT_VAULT_ZSTD', config.get('VAULT_ZSTD', False))
+    if isinstance(compress, str):
+        compress = compress.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    if codec not in CODECS:
+        print(f"⚠ Unknown vault codec '{codec}', writing 'json'")
+        codec = 'json'
+    if (codec == 'msgpack' and msgpack is None) or (codec == 'cbor' and cbor2 is None):
+        print(f"⚠ Vault codec '{codec}' is not installed, writing 'compact' JSON")
+        codec = 'compact'
+    if compress and zstandard is None:
+        print("⚠ 'zstandard' is not installed, writing vault records uncompressed")
+        compress = False
+    return codec, bool(compress)
+
+# Codec used for new writes. 'json' keeps the historical json.dump layout
+# (indent=2); set VAULT_CODEC to 'compact', 'msgpack' or 'cbor' for smaller records.
+DEFAULT_CODEC, DEFAULT_COMPRESS = vault_settings()
+
+def _encode(data, codec):
+    if codec == 'json':
+        return json.dumps(data, indent=2).encode('utf-8')
+    if codec == 'compact':
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if codec == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("msgpack codec requested but 'msgpack' is not installed")
+        return msgpack.packb(data, use_bin_type=True)
+    if codec == 'cbor':
+        if cbor2 is None:
+            raise RuntimeError("cbor codec requested but 'cbor2' is not installed")
+        return cbor2.dumps(data)
+    raise ValueError(f"Unknown vault codec: {codec}")
+
+def detect_format(raw):
+    """Identifies the codec of an encoded record from its leading bytes."""
+    if raw.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    head = raw.lstrip()[:1]
+    if head in (b'{', b'['):
+        return 'json'
+    first = raw[0] if raw else None
+    # Records are always maps: msgpack fixmap/map16/map32 vs. CBOR major type 5.
+    if first is not None and (0x80 <= first <= 0x8f or first in (0xde, 0xdf)):
+        return 'msgpack'
+    if first is not None and (0xa0 <= first <= 0xbb or first == 0xbf):
+        return 'cbor'
+    raise ValueError("Unrecognized vault record format")
+
+def encode_record(data, codec=None, compress=None):
+    """
+    Serializes a record dict to bytes with the given codec (optionally zstd-wrapped);
+    unset arguments use the configured defaults.
+    """
+    raw = _encode(data, codec or DEFAULT_CODEC)
+    if compress is None:
+        compress = DEFAULT_COMPRESS
+    if compress:
+        if zstandard is None:
+            raise RuntimeError("zstd compression requested but 'zstandard' is not installed")
+        raw = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return raw
+
+def decode_record(raw):
+    """Deserializes bytes produced by any supported codec, detecting the format."""
+    fmt = detect_format(raw)
+    if fmt == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Record is zstd-compressed but 'zstandard' is not installed")
+        return decode_record(zstandard.ZstdDecompressor().decompress(raw))
+    if fmt == 'json':
+        return json.loads(raw.decode('utf-8'))
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise RuntimeError("Record is msgpack-encoded but 'msgpack' is not installed")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    if cbor2 is None:
+        raise RuntimeError("Record is CBOR-encoded but 'cbor2' is not installed")
+    return cbor2.loads(raw)
+
+def read_record(filepath):
+    """Loads a vault record regardless of the codec it was written with."""
+    with open(filepath, 'rb') as f:
+        return decode_record(f.read())
+
+def write_record(filepath, data, codec=None, compress=None):
+    """Writes a vault record atomically and returns the number of bytes written."""
+    raw = encode_record(data, codec, compress)
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp_path, filepath)
+    return len(raw)
+
+def content_hash(data):
+    """Codec-independent hash of a record's content."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def convert_vault(vault_dir, codec, compress=False):
+    """Re-encodes every record in a vault directory with the given codec."""
+    files = sorted(os.path.join(vault_dir, f) for f in os.listdir(vault_dir) if f.endswith('.json'))
+    before = after = 0
+    for filepath in files:
+        before += os.path.getsize(filepath)
+        try:
+            after += write_record(filepath, read_record(filepath), codec, compress)
+        except Exception as e:
+            after += os.path.getsize(filepath)
+            print(f"  ⚠ Could not convert {filepath}: {e}")
+    print(f"✨ Converted {len(files)} records in {vault_dir} to '{codec}'"
+          f"{' + zstd' if compress else ''}: {before:,} → {after:,} bytes")
+    return before, after
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Re-encode vault records with a different codec.")
+    parser.add_argument("vault_dirs", nargs='+', help="Vault directories (e.g. data/vault data/family_vault)")
+    parser.add_argument("--codec", choices=CODECS, default='compact', help="Target codec")
+    parser.add_argument("--zstd", action="store_true", help="Wrap records in zstd compression")
+    args = parser.parse_args()
+
+    for vault_dir in args.vault_dirs:
+        convert_vault(vault_dir, args.codec, compress=args.zstd)
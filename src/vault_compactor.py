@@ -0,0 +1,303 @@
+import os
+import re
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import ValidationError
+from src.models import AnimalSensoryData, FamilySensoryProfile
+from src.family_aggregator import merge_notes, merge_profile_dicts
+from src.change_log import record_changes
+from src.range_merge import merge_modality_ranges, rebuild_range_index, species_key, family_key
+from src.species_index import rebuild_species_index
+from src.vault_codec import read_record, decode_record, write_record, encode_record, content_hash
+
+SPECIES_VAULT_DIR = 'data/vault'
+FAMILY_VAULT_DIR = 'data/family_vault'
+CHUNK_SIZE = 64
+
+# Taxonomy values the LLM emits when it does not know the answer
+PLACEHOLDER_NAMES = {'unknown', 'not available', 'not specified in context', 'unspecified', 'none', 'null', 'n/a', ''}
+
+SPECIES_FILE_PATTERN = re.compile(r'^(\d+)(?:_| - )')
+FAMILY_FILE_PATTERN = re.compile(r'^(\d+)_(.+)\.json$')
+
+def is_placeholder(name):
+    return name is None or str(name).strip().lower() in PLACEHOLDER_NAMES
+
+def _norm_text(text):
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+def evidence_fingerprint(ev):
+    """Identifies near-duplicate evidence: same page (URL + title) or, without a URL, the same citation text."""
+    url = (ev.get('url') or '').strip().lower()
+    url = re.sub(r'^https?://(www\.)?', '', url).rstrip('/')
+    if url:
+        basis = f"{url}|{_norm_text(ev.get('title'))}"
+    else:
+        basis = _norm_text(ev.get('citation'))
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:16]
+
+def dedupe_evidence(evidence):
+    kept = []
+    seen = set()
+    for ev in evidence:
+        fp = evidence_fingerprint(ev)
+        if fp not in seen:
+            seen.add(fp)
+            kept.append(ev)
+    return kept
+
+def canonical_species(data):
+    """Rewrites a species record in canonical form. Returns (record, evidence_removed)."""
+    identity = data.setdefault('identity', {})
+    names = {identity.get('common_name'), identity.get('scientific_name')}
+    aliases = []
+    for alias in identity.get('aliases', []):
+        if alias not in names and alias not in aliases:
+            aliases.append(alias)
+    identity['aliases'] = aliases
+
+    taxonomy = identity.setdefault('taxonomy', {})
+    for rank in ('class', 'order', 'family'):
+        if is_placeholder(taxonomy.get(rank)):
+            taxonomy[rank] = 'Unknown'
+
+    # Fold repeated (domain, sub_type) claims into one modality each
+    evidence_before = 0
+    merged = {}
+    for mod in data.get('sensory_modalities', []):
+        evidence_before += len(mod.get('evidence', []))
+        key = (mod.get('modality_domain'), mod.get('sub_type'))
+        if key not in merged:
+            merged[key] = mod
+            continue
+        target = merged[key]
+        target['evidence'] = target.get('evidence', []) + mod.get('evidence', [])
+        if not target.get('mechanism') and mod.get('mechanism'):
+            target['mechanism'] = mod['mechanism']
+        merge_modality_ranges(target, mod)
+
+    evidence_after = 0
+    for mod in merged.values():
+        mod['evidence'] = dedupe_evidence(mod.get('evidence', []))
+        evidence_after += len(mod['evidence'])
+    data['sensory_modalities'] = list(merged.values())
+
+    try:
+        data = AnimalSensoryData(**data).model_dump(by_alias=True, exclude_none=True, mode='json')
+    except ValidationError:
+        pass # Keep legacy records that predate the schema as plain dicts
+    return data, evidence_before - evidence_after
+
+def canonical_family(data):
+    """Rewrites a family profile in canonical form."""
+    for mod_data in data.get('sensory_modalities', {}).values():
+        if 'notes' in mod_data:
+            mod_data['notes'] = merge_notes(mod_data['notes'], '')
+        if 'inferred_from_species' in mod_data:
+            mod_data['inferred_from_species'] = list(dict.fromkeys(mod_data['inferred_from_species']))
+    # Drop repeats but keep the order: reordering alone reclaims nothing and would rewrite the file
+    data['sources'] = list(dict.fromkeys(data.get('sources', [])))
+
+    try:
+        data = FamilySensoryProfile(**data).model_dump(exclude_none=True, exclude_defaults=True, mode='json')
+    except ValidationError:
+        pass
+    return data
+
+def target_filename(kind, data, filename):
+    """
+    The name a record is written back under: '{gbif_id}_{name}.json', taking the GBIF ID
+    from a numbered filename when the record itself lacks one. None for placeholder families.
+    """
+    if kind == 'species':
+        identity = data.get('identity', {})
+        match = SPECIES_FILE_PATTERN.match(filename)
+        gbif_id = identity.get('gbif_id') or (match.group(1) if match else None)
+        name = identity.get('scientific_name')
+        return f"{gbif_id}_{name.replace(' ', '_')}.json" if gbif_id and name else filename
+    if is_placeholder(data.get('family_name')):
+        return None
+    match = FAMILY_FILE_PATTERN.match(filename)
+    gbif_id = data.get('gbif_id') or (match.group(1) if match else None)
+    return f"{gbif_id}_{data['family_name']}.json" if gbif_id else f"{data['family_name']}.json"
+
+def resolve_targets(args):
+    """Worker entry point: [(path, target filename)] for a chunk of files."""
+    kind, paths = args
+    targets = []
+    for path in paths:
+        try:
+            targets.append((path, target_filename(kind, read_record(path), os.path.basename(path))))
+        except Exception:
+            targets.append((path, os.path.basename(path))) # Left alone; compact_group reports it
+    return targets
+
+def group_files(kind, targets):
+    """
+    Groups files by the filename they will be written to, so no two groups share a target
+    (two parallel workers writing one file would lose a group's merged data). A family
+    profile without a GBIF ID joins the numbered profile of the same name when there is
+    exactly one. Returns [(target, paths)] with the file already at the target first.
+    """
+    groups = {}
+    placeholders = []
+    for path, target in targets:
+        if target is None:
+            placeholders.append((None, [path]))
+        else:
+            groups.setdefault(target, []).append(path)
+
+    if kind == 'family':
+        numbered = {}
+        for target in groups:
+            match = FAMILY_FILE_PATTERN.match(target)
+            if match:
+                numbered.setdefault(match.group(2), []).append(target)
+        for target in [t for t in groups if not FAMILY_FILE_PATTERN.match(t)]:
+            candidates = numbered.get(target[:-len('.json')], [])
+            if len(candidates) == 1:
+                groups[candidates[0]].extend(groups.pop(target))
+
+    ordered = [(target, sorted(paths, key=lambda p: (os.path.basename(p) != target, ' - ' in os.path.basename(p), p)))
+               for target, paths in sorted(groups.items())]
+    return ordered + placeholders
+
+def _new_stats():
+    return {"records": 0, "bytes_before": 0, "bytes_after": 0, "files_folded": 0,
+            "placeholders_removed": 0, "evidence_removed": 0, "errors": 0}
+
+def _entity_id(kind, data, path):
+    return species_key(data, path) if kind == 'species' else family_key(data)
+
+def compact_group(kind, paths, codec=None, dry_run=False, target=None):
+    """
+    Folds a group of files into one canonical record, written to target (a filename in the
+    same directory; by default the one the record resolves to). A lone record whose content
+    is already canonical is left untouched. Returns (stats, changes) where changes are
+    change-log rows for the rewrite.
+    """
+    stats = _new_stats()
+    changes = []
+    stats['bytes_before'] = sum(os.path.getsize(p) for p in paths)
+    raws = []
+    for p in paths:
+        with open(p, 'rb') as f:
+            raws.append(f.read())
+    records = [decode_record(raw) for raw in raws]
+    original_hashes = [content_hash(r) for r in records]
+    deleted = [(kind, _entity_id(kind, r, p), 'DELETE', None, p) for r, p in zip(records, paths)]
+    base = records[0]
+
+    if kind == 'species':
+        for other in records[1:]:
+            for alias in other.get('identity', {}).get('aliases', []):
+                base.setdefault('identity', {}).setdefault('aliases', []).append(alias)
+            base['sensory_modalities'] = base.get('sensory_modalities', []) + other.get('sensory_modalities', [])
+            if not base.get('identity', {}).get('gbif_id') and other.get('identity', {}).get('gbif_id'):
+                base['identity']['gbif_id'] = other['identity']['gbif_id']
+        target = target or target_filename(kind, base, os.path.basename(paths[0]))
+        match = SPECIES_FILE_PATTERN.match(target)
+        if match and not base.get('identity', {}).get('gbif_id'):
+            base.setdefault('identity', {})['gbif_id'] = int(match.group(1))
+        final, evidence_removed = canonical_species(base)
+        stats['evidence_removed'] = evidence_removed
+    else:
+        if is_placeholder(base.get('family_name')):
+            if not dry_run:
+                for p in paths:
+                    os.remove(p)
+            stats['placeholders_removed'] = len(paths)
+            return stats, deleted
+        target = target or target_filename(kind, base, os.path.basename(paths[0]))
+        for other in records[1:]:
+            base = merge_profile_dicts(base, other)
+        final = canonical_family(base)
+    target = os.path.join(os.path.dirname(paths[0]), target)
+
+    stats['records'] = 1
+    stats['files_folded'] = len(paths) - 1
+
+    # Removed files first, then the surviving record, so the latest change per entity is the upsert
+    changes.extend(row for row in deleted if os.path.abspath(row[4]) != os.path.abspath(target))
+    final_hash = content_hash(final)
+    if changes or final_hash != original_hashes[0]:
+        changes.append((kind, _entity_id(kind, final, target), 'UPSERT', final_hash, target))
+
+    encoded = encode_record(final, codec)
+    if not changes and (codec is None or encoded == raws[0]):
+        # Already compact: re-encoding would only churn the file (and e.g. turn 1e-6 into 1e-06)
+        stats['bytes_after'] = stats['bytes_before']
+        return stats, changes
+    stats['bytes_after'] = len(encoded)
+    if dry_run:
+        return stats, changes
+
+    write_record(target, final, codec)
+    for p in paths:
+        if os.path.abspath(p) != os.path.abspath(target):
+            os.remove(p)
+    return stats, changes
+
+def compact_chunk(args):
+    """Worker entry point: compacts a chunk of file groups."""
+    kind, groups, codec, dry_run = args
+    totals = _new_stats()
+    changes = []
+    for target, paths in groups:
+        try:
+            stats, group_changes = compact_group(kind, paths, codec, dry_run, target=target)
+            changes.extend(group_changes)
+        except Exception as e:
+            print(f"  ⚠ Could not compact {paths[0]}: {e}")
+            stats = _new_stats()
+            stats['errors'] = 1
+        for key, value in stats.items():
+            totals[key] += value
+    return totals, changes
+
+def compact_vault(vault_dir, kind, workers=None, codec=None, dry_run=False, chunk_size=CHUNK_SIZE):
+    """Compacts one vault directory in parallel chunks. Returns (stats, changes)."""
+    files = sorted(os.path.join(vault_dir, f) for f in os.listdir(vault_dir) if f.endswith('.json'))
+    totals = _new_stats()
+    changes = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Resolve every file's target first, so groups are final before anything is written
+        file_chunks = [(kind, files[i:i + chunk_size]) for i in range(0, len(files), chunk_size)]
+        targets = [t for chunk in pool.map(resolve_targets, file_chunks) for t in chunk]
+        groups = group_files(kind, targets)
+        chunks = [(kind, groups[i:i + chunk_size], codec, dry_run) for i in range(0, len(groups), chunk_size)]
+        for stats, chunk_changes in pool.map(compact_chunk, chunks):
+            changes.extend(chunk_changes)
+            for key, value in stats.items():
+                totals[key] += value
+    return totals, changes
+
+def run_compaction(workers=None, codec=None, dry_run=False):
+    print(f"🧹 Compacting vaults{' (dry run)' if dry_run else ''}...")
+    grand_total = 0
+    for vault_dir, kind in ((SPECIES_VAULT_DIR, 'species'), (FAMILY_VAULT_DIR, 'family')):
+        stats, changes = compact_vault(vault_dir, kind, workers=workers, codec=codec, dry_run=dry_run)
+        if not dry_run:
+            record_changes(changes)
+        reclaimed = stats['bytes_before'] - stats['bytes_after']
+        grand_total += reclaimed
+        print(f"  {vault_dir}: {stats['records']} records, {stats['files_folded']} legacy files folded, "
+              f"{stats['placeholders_removed']} placeholders removed, {stats['evidence_removed']} duplicate evidence "
+              f"dropped, {len(changes)} changes, {stats['errors']} errors")
+        print(f"    {stats['bytes_before']:,} → {stats['bytes_after']:,} bytes ({reclaimed:,} reclaimed)")
+
+    if not dry_run:
+        # Filenames may have changed; refresh the lookup indexes
+        rebuild_species_index(vault_dir=SPECIES_VAULT_DIR)
+        rebuild_range_index()
+    print(f"✨ Compaction complete. {grand_total:,} bytes reclaimed.")
+    return grand_total
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Rewrite vault records in canonical form and reclaim space.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--codec", type=str, default=None, help="Codec for rewritten records (default: vault_codec.DEFAULT_CODEC)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be reclaimed without writing")
+    args = parser.parse_args()
+    run_compaction(workers=args.workers, codec=args.codec, dry_run=args.dry_run)
@@ -1,8 +1,18 @@
 import sqlite3
 import json
+from src.graph_export import export_graph
 
 DB_PATH = 'data/orchestrator.db'
 
+TOP_SENSES_QUERY = """
+    SELECT target, COUNT(*) as frequency
+    FROM edges
+    WHERE relationship = 'HAS_SENSE'
+    GROUP BY target
+    ORDER BY frequency DESC
+    LIMIT 10
+"""
+
 def get_graph_summary():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -22,14 +32,7 @@ def get_graph_summary():
         print(f"  {rel}: {count}")
         
     # 3. Top Senses (Modality popularity)
-    c.execute("""
-        SELECT target, COUNT(*) as frequency 
-        FROM edges 
-        WHERE relationship = 'HAS_SENSE' 
-        GROUP BY target 
-        ORDER BY frequency DESC 
-        LIMIT 10
-    """)
+    c.execute(TOP_SENSES_QUERY)
     print("\nTop 10 Sensory Modalities (across families & species):")
     for modality, freq in c.fetchall():
         clean_name = modality.replace('modality:', '')
@@ -38,30 +41,10 @@ def get_graph_summary():
     conn.close()
 
 def export_for_gephi():
-    """Simple CSV export for Gephi visualization."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    os.makedirs('data/graph_export', exist_ok=True)
-    
-    # Export Nodes
-    c.execute("SELECT id, name, type FROM nodes")
-    with open('data/graph_export/nodes.csv', 'w') as f:
-        f.write("ID,Label,Type\n")
-        for row in c.fetchall():
-            f.write(f'"{row[0]}","{row[1]}","{row[2]}"\n')
-            
-    # Export Edges
-    c.execute("SELECT source, target, relationship FROM edges")
-    with open('data/graph_export/edges.csv', 'w') as f:
-        f.write("Source,Target,Type\n")
-        for row in c.fetchall():
-            f.write(f'"{row[0]}","{row[1]}","{row[2]}"\n')
-            
-    conn.close()
+    """CSV export for Gephi visualization (see src/graph_export.py for GraphML, JSONL and columnar formats)."""
+    export_graph(['csv'], db_path=DB_PATH)
     print("\n💾 Graph exported to data/graph_export/nodes.csv and edges.csv")
 
 if __name__ == "__main__":
-    import os
     get_graph_summary()
     export_for_gephi()
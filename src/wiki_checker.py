@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DB_PATH = 'data/orchestrator.db'
+WIKI_API = "https://en.wikipedia.org/w/api.php"
+TITLES_PER_REQUEST = 50 # MediaWiki's limit for anonymous clients
+# Pages get written, so a "no page" answer is only trusted for a while
+NEGATIVE_TTL = timedelta(days=30)
+
+def init_wiki_cache(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS wiki_titles (
+            title TEXT PRIMARY KEY,
+            page_exists INTEGER,
+            resolved_title TEXT,
+            checked_at TEXT
+        )
+    ''')
+
+def resolve_batch(response, titles):
+    """
+    Maps each requested title to the page title it resolves to (after MediaWiki's
+    normalization and redirects), or None if there is no such page.
+    """
+    query = response.get("query", {})
+    hops = {}
+    for step in query.get("normalized", []) + query.get("redirects", []):
+        hops[step["from"]] = step["to"]
+    existing = {page["title"] for page in query.get("pages", [])
+                if not page.get("missing") and not page.get("invalid")}
+    resolved = {}
+    for title in titles:
+        current = title
+        for _ in range(3): # normalized -> redirect -> (normalized) target
+            current = hops.get(current, current)
+        resolved[title] = current if current in existing else None
+    return resolved
+
+class WikiChecker:
+    """
+    Batched Wikipedia page-existence checks with a persistent cache in wiki_titles.
+    Thread-safe, so sampler workers can share one instance.
+    """
+    def __init__(self, client, db_path=DB_PATH):
+        self.client = client
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.requests = 0
+        init_wiki_cache(self.conn)
+        self.conn.commit()
+        stale = (datetime.now() - NEGATIVE_TTL).isoformat()
+        self.cache = {title: bool(exists) for title, exists, checked_at in self.conn.execute(
+            "SELECT title, page_exists, checked_at FROM wiki_titles") if exists or checked_at >= stale}
+
+    def exists_many(self, titles):
+        """Returns {title: bool} for every title, querying up to 50 uncached titles per request."""
+        result = {}
+        pending = []
+        with self.lock:
+            for title in titles:
+                if not title or '|' in title:
+                    result[title] = False # Not a valid page title
+                elif title in self.cache:
+                    result[title] = self.cache[title]
+                elif title not in pending:
+                    pending.append(title)
+
+        for start in range(0, len(pending), TITLES_PER_REQUEST):
+            batch = pending[start:start + TITLES_PER_REQUEST]
+            response = self.client.get_json(WIKI_API, {
+                "action": "query", "titles": "|".join(batch), "redirects": 1,
+                "format": "json", "formatversion": 2,
+            })
+            resolved = resolve_batch(response, batch)
+            now = datetime.now().isoformat()
+            with self.lock:
+                self.requests += 1
+                for title, target in resolved.items():
+                    self.cache[title] = target is not None
+                self.conn.executemany("""
+                    INSERT OR REPLACE INTO wiki_titles (title, page_exists, resolved_title, checked_at)
+                    VALUES (?, ?, ?, ?)
+                """, [(title, target is not None, target, now) for title, target in resolved.items()])
+                self.conn.commit()
+            for title, target in resolved.items():
+                result[title] = target is not None
+        return {title: result[title] for title in titles}
+
+    def exists(self, title):
+        return self.exists_many([title])[title]
+
+    def close(self):
+        self.conn.close()
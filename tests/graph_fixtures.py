@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import shutil
+
+def species_record(common_name, family, order, modalities, klass="Mammalia"):
+    """A minimal species record; modalities are domain names or (domain, sub_type) pairs."""
+    modalities = [(m, None) if isinstance(m, str) else m for m in modalities]
+    return {
+        "identity": {
+            "common_name": common_name,
+            "scientific_name": common_name,
+            "taxonomy": {"class": klass, "order": order, "family": family}
+        },
+        "sensory_modalities": [
+            {"modality_domain": domain, "sub_type": sub_type, "stimulus_type": "Test", "evidence": []}
+            for domain, sub_type in modalities
+        ],
+        "meta": {"data_quality_flag": "Low_Data"}
+    }
+
+class GraphTestCase(unittest.TestCase):
+    """
+    Points the archivist at a scratch database and vaults named after `prefix`,
+    removed again in tearDown.
+    """
+    prefix = 'test_graph'
+
+    def setUp(self):
+        self.test_db = f'{self.prefix}.db'
+        self.species_vault = f'{self.prefix}_vault'
+        self.family_vault = f'{self.prefix}_family_vault'
+        for d in (self.species_vault, self.family_vault):
+            os.makedirs(d, exist_ok=True)
+
+        self.patchers = [
+            patch('src.archivist.DB_PATH', self.test_db),
+            patch('src.archivist.SPECIES_VAULT_DIR', self.species_vault),
+            patch('src.archivist.FAMILY_VAULT_DIR', self.family_vault),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        for d in (self.species_vault, self.family_vault):
+            shutil.rmtree(d, ignore_errors=True)
+
+    def write_species(self, filename, data):
+        path = os.path.join(self.species_vault, filename)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        # Force a visible mtime change even on coarse-grained filesystems
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 1))
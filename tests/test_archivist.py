@@ -0,0 +1,120 @@
+import unittest
+import os
+import json
+import sqlite3
+from src.archivist import GraphArchivist, CHANGE_CONSUMER
+from src.change_log import record_change, get_checkpoint
+from src.similarity_index import SimilarityIndex
+from tests.graph_fixtures import GraphTestCase, species_record
+
+class TestArchivist(GraphTestCase):
+    prefix = 'test_archive'
+
+    def setUp(self):
+        super().setUp()
+        self.write_species('1_Dolphin.json', species_record(
+            "Dolphin", "Delphinidae", "Artiodactyla", [("Mechanoreception", "Echolocation")]))
+        self.write_species('2_Orca.json', species_record(
+            "Orca", "Delphinidae", "Artiodactyla", [("Mechanoreception", "Hearing")]))
+        with open(os.path.join(self.family_vault, '9_Delphinidae.json'), 'w') as f:
+            json.dump({
+                "family_name": "Delphinidae",
+                "order_name": "Artiodactyla",
+                "sensory_modalities": {"vision": {"presence": "common"}, "smell": {"presence": "unknown"}},
+                "confidence": "HIGH",
+                "sources": []
+            }, f)
+
+    def graph(self):
+        conn = sqlite3.connect(self.test_db)
+        nodes = sorted(conn.execute("SELECT id, name, type FROM nodes").fetchall())
+        edges = sorted(conn.execute("SELECT source, target, relationship, attributes FROM edges").fetchall())
+        conn.close()
+        return nodes, edges
+
+    def rebuilt_graph(self):
+        GraphArchivist(rebuild=True).run()
+        return self.graph()
+
+    def test_incremental_run_matches_full_rebuild(self):
+        GraphArchivist().run()
+        self.assertIn(('modality:Photoreception', 'Photoreception', 'modality'), self.graph()[0])
+
+        # Change one species and remove another
+        self.write_species('1_Dolphin.json', species_record(
+            "Dolphin", "Delphinidae", "Artiodactyla", [("Electroreception", "Passive Electroreception")]))
+        os.remove(os.path.join(self.species_vault, '2_Orca.json'))
+        GraphArchivist().run()
+        incremental = self.graph()
+
+        self.assertNotIn(('species:Orca', 'Orca', 'species'), incremental[0])
+        self.assertNotIn(('sub_type:Echolocation', 'Echolocation', 'sub_type'), incremental[0])
+        # The family node is still supported by the remaining species and the family profile
+        self.assertIn(('family:Delphinidae', 'Delphinidae', 'family'), incremental[0])
+        self.assertEqual(incremental, self.rebuilt_graph())
+
+    def fingerprints(self):
+        fingerprints = {}
+        for taxon_type in ('species', 'family'):
+            index = SimilarityIndex(taxon_type, db_path=self.test_db)
+            fingerprints.update({taxon: index.feature_names(taxon) for taxon in index.bits})
+        return fingerprints
+
+    def test_similarity_index_tracks_incremental_runs(self):
+        GraphArchivist().run()
+        self.assertEqual(SimilarityIndex('species', db_path=self.test_db).most_similar('Dolphin', k=1), [('Orca', 0.5)])
+
+        os.remove(os.path.join(self.species_vault, '2_Orca.json'))
+        self.write_species('3_Porpoise.json', species_record(
+            "Porpoise", "Delphinidae", "Artiodactyla", [("Mechanoreception", "Echolocation")]))
+        GraphArchivist().run()
+        incremental = self.fingerprints()
+        self.assertNotIn('species:Orca', incremental)
+        self.assertEqual(SimilarityIndex('species', db_path=self.test_db).most_similar('Dolphin', k=1), [('Porpoise', 1.0)])
+
+        GraphArchivist(rebuild=True).run()
+        self.assertEqual(incremental, self.fingerprints())
+
+    def test_noop_run_leaves_graph_untouched(self):
+        GraphArchivist().run()
+        before = self.graph()
+        GraphArchivist().run()
+        self.assertEqual(self.graph(), before)
+
+    def test_incremental_run_reads_change_log(self):
+        record_change('species', 1, 'UPSERT', record_path=os.path.join(self.species_vault, '1_Dolphin.json'),
+                      db_path=self.test_db)
+        GraphArchivist().run()
+
+        # Once checkpointed, only logged paths are re-derived
+        self.write_species('2_Orca.json', species_record(
+            "Orca", "Delphinidae", "Artiodactyla", [("Thermoreception", "Infrared")]))
+        self.write_species('3_Porpoise.json', species_record(
+            "Porpoise", "Delphinidae", "Artiodactyla", [("Mechanoreception", "Echolocation")]))
+        record_change('species', 3, 'UPSERT', record_path=os.path.join(self.species_vault, '3_Porpoise.json'),
+                      db_path=self.test_db)
+        GraphArchivist().run()
+        nodes = self.graph()[0]
+        self.assertIn(('species:Porpoise', 'Porpoise', 'species'), nodes)
+        self.assertNotIn(('sub_type:Infrared', 'Infrared', 'sub_type'), nodes)
+
+        conn = sqlite3.connect(self.test_db)
+        self.assertEqual(get_checkpoint(conn, CHANGE_CONSUMER), 2)
+        conn.close()
+
+        # A full scan catches edits made outside the save paths
+        GraphArchivist(full_scan=True).run()
+        self.assertEqual(self.graph(), self.rebuilt_graph())
+        self.assertIn(('sub_type:Infrared', 'Infrared', 'sub_type'), self.graph()[0])
+
+    def test_parallel_parse_matches_serial(self):
+        for i in range(3, 8):
+            self.write_species(f'{i}_Bat{i}.json', species_record(
+                f"Bat{i}", "Vespertilionidae", "Chiroptera", [("Mechanoreception", "Echolocation")]))
+        GraphArchivist(rebuild=True, workers=1).run()
+        serial = self.graph()
+        GraphArchivist(rebuild=True, workers=2, chunk_size=2).run()
+        self.assertEqual(self.graph(), serial)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import shutil
+from src.assets import script_tags, inline_json, import_assets, load_pins, ASSETS
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.vendor_dir = 'test_vendor_assets'
+        self.out_dir = 'test_asset_pages'
+        os.makedirs(self.vendor_dir, exist_ok=True)
+        for filename, _ in ASSETS.values():
+            with open(os.path.join(self.vendor_dir, filename), 'w') as f:
+                f.write('var s = "</script>";')
+        self.patcher = patch('src.assets.ASSET_DIR', self.vendor_dir)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        for d in (self.vendor_dir, self.out_dir):
+            shutil.rmtree(d, ignore_errors=True)
+
+    def test_modes(self):
+        page = os.path.join(self.out_dir, 'page.html')
+        self.assertIn('https://', script_tags(['d3'], page, mode='cdn'))
+
+        inline = script_tags(['d3'], page, mode='inline')
+        self.assertEqual(inline.count('</script>'), 1)
+        self.assertIn('<\\/script>', inline)
+
+        # Local mode copies each asset next to the pages once, shared by every page there
+        local = script_tags(['d3', 'd3-sankey'], page, mode='local')
+        self.assertIn('src="assets/', local)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.out_dir, 'assets'))),
+                         sorted(filename for filename, _ in ASSETS.values()))
+
+    def test_missing_asset_falls_back_to_cdn(self):
+        os.remove(os.path.join(self.vendor_dir, ASSETS['d3'][0]))
+        self.assertEqual(script_tags(['d3'], 'page.html', mode='inline'), f'<script src="{ASSETS["d3"][1]}"></script>')
+
+    def test_pins_are_recorded_and_checked(self):
+        source_dir = os.path.join(self.out_dir, 'downloads')
+        os.makedirs(source_dir)
+        for filename, url in ASSETS.values():
+            with open(os.path.join(source_dir, url.rsplit('/', 1)[1]), 'w') as f:
+                f.write(f'// {filename}')
+        import_assets(source_dir)
+        pins = load_pins()
+        self.assertEqual(sorted(pins), sorted(filename for filename, _ in ASSETS.values()))
+        self.assertIn('// d3-7.9.0', script_tags(['d3'], 'page.html', mode='inline'))
+
+        # A vendored file that no longer matches its pin is refused, on load and on import
+        with open(os.path.join(self.vendor_dir, ASSETS['d3'][0]), 'a') as f:
+            f.write('tampered')
+        with self.assertRaises(ValueError):
+            script_tags(['d3'], 'page.html', mode='inline')
+        with open(os.path.join(source_dir, 'd3.min.js'), 'a') as f:
+            f.write('tampered')
+        with self.assertRaises(ValueError):
+            import_assets(source_dir)
+        self.assertEqual(load_pins(), pins)
+
+    def test_inline_json_round_trips(self):
+        data = {"name": "</script><b>"}
+        encoded = inline_json(data)
+        self.assertNotIn('</', encoded)
+        self.assertEqual(json.loads(encoded), data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import sqlite3
+from src.change_log import record_change, record_changes, changes_since, commit_checkpoint, get_checkpoint
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_change_log.db'
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def record(self, entity_id, op='UPSERT', data=None):
+        return record_change('species', entity_id, op, record_path=f"vault/{entity_id}.json",
+                             data=data or {"v": 1}, db_path=self.test_db)
+
+    def test_sequence_numbers_increase_in_append_order(self):
+        seqs = [self.record(entity_id) for entity_id in (3, 1, 2)]
+        self.assertEqual(seqs, sorted(seqs))
+
+        changes, high_water = changes_since('reader', db_path=self.test_db)
+        self.assertEqual([c['entity_id'] for c in changes], ['3', '1', '2'])
+        self.assertEqual([c['seq'] for c in changes], seqs)
+        self.assertEqual(high_water, seqs[-1])
+
+    def test_collapse_keeps_latest_change_per_entity(self):
+        self.record(1, data={"v": 1})
+        self.record(2)
+        self.record(1, data={"v": 2})
+        last = self.record(1, op='DELETE')
+
+        changes, _ = changes_since('reader', db_path=self.test_db)
+        self.assertEqual([(c['entity_id'], c['op']) for c in changes], [('2', 'UPSERT'), ('1', 'DELETE')])
+        self.assertEqual(changes[-1]['seq'], last)
+
+        changes, _ = changes_since('reader', db_path=self.test_db, collapse=False)
+        self.assertEqual(len(changes), 4)
+
+    def test_checkpoint_advances_per_consumer(self):
+        record_changes([('family', 9703, 'UPSERT', 'abc', 'family_vault/9703_Felidae.json'),
+                        ('family', 9701, 'UPSERT', 'def', 'family_vault/9701_Canidae.json')], db_path=self.test_db)
+        changes, high_water = changes_since('graph', db_path=self.test_db)
+        self.assertEqual(len(changes), 2)
+        commit_checkpoint('graph', high_water, db_path=self.test_db)
+
+        self.assertEqual(changes_since('graph', db_path=self.test_db), ([], high_water))
+        # Other consumers keep their own position
+        self.assertEqual(len(changes_since('export', db_path=self.test_db)[0]), 2)
+
+        later = self.record(7)
+        changes, new_high = changes_since('graph', db_path=self.test_db)
+        self.assertEqual([c['seq'] for c in changes], [later])
+        self.assertEqual(new_high, later)
+
+    def test_shared_connection_defers_to_callers_commit(self):
+        conn = sqlite3.connect(self.test_db)
+        record_change('species', 1, 'UPSERT', record_path='vault/1.json', conn=conn)
+        self.assertEqual(changes_since('reader', db_path=self.test_db)[0], [])
+        conn.commit()
+        conn.close()
+        self.assertEqual(len(changes_since('reader', db_path=self.test_db)[0]), 1)
+
+    def test_unknown_op_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.record(1, op='MERGE')
+        conn = sqlite3.connect(self.test_db)
+        self.assertEqual(get_checkpoint(conn, 'reader'), 0)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
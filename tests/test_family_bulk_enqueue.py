@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import sqlite3
+import threading
+import requests
+from src import family_bulk_enqueue
+
+KEYS = {"Felidae": 9703, "Canidae": 9701, "Ursidae": 9681}
+
+class FakeGBIF:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matched = []
+
+    def gbif_match(self, name, **params):
+        with self.lock:
+            self.matched.append(name)
+        if name == "Brokenidae":
+            raise requests.ConnectionError("connection reset")
+        return {"usageKey": KEYS[name], "matchType": "EXACT"} if name in KEYS else {"matchType": "NONE"}
+
+    def gbif_search(self, higherTaxonKey, limit, **params):
+        return {"results": [{"canonicalName": f"Species {higherTaxonKey}-{i}"} for i in range(limit)]}
+
+class TestFamilyBulkEnqueue(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_family_enqueue.db'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE TABLE research_queue (id INTEGER PRIMARY KEY, animal_name TEXT, taxonomy_source TEXT)")
+        conn.execute("""
+            CREATE TABLE family_research_queue (
+                family_name TEXT PRIMARY KEY,
+                gbif_id INTEGER,
+                order_name TEXT,
+                representative_species TEXT,
+                status TEXT DEFAULT 'PENDING',
+                priority INTEGER DEFAULT 5
+            )
+        """)
+        sources = [f"Sampler: Carnivora > {f} (Score: 9.1, Pick: Wiki-confirmed)"
+                   for f in ("Felidae", "Canidae", "Ursidae", "Nowhereidae", "Brokenidae")]
+        conn.executemany("INSERT INTO research_queue (animal_name, taxonomy_source) VALUES (?, ?)",
+                         [(f"Species {i}", s) for i, s in enumerate(sources + sources)])
+        # Queued earlier without metadata, and one already researched
+        conn.execute("INSERT INTO family_research_queue (family_name, order_name) VALUES ('Canidae', 'Carnivora')")
+        conn.execute("INSERT INTO family_research_queue (family_name, order_name, status) VALUES ('Ursidae', 'Carnivora', 'COMPLETED')")
+        conn.commit()
+        conn.close()
+        self.patcher = patch('src.family_bulk_enqueue.DB_PATH', self.test_db)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def test_resolves_concurrently_and_skips_duplicates(self):
+        gbif = FakeGBIF()
+        with patch('src.family_bulk_enqueue.RESOLVE_BATCH', 2):
+            family_bulk_enqueue.bulk_enqueue(gbif=gbif, workers=4)
+        self.assertNotIn("Ursidae", gbif.matched)
+
+        conn = sqlite3.connect(self.test_db)
+        rows = {name: (gbif_id, reps, status) for name, gbif_id, reps, status in conn.execute(
+            "SELECT family_name, gbif_id, representative_species, status FROM family_research_queue")}
+        conn.close()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows["Felidae"][0], 9703)
+        self.assertEqual(json.loads(rows["Felidae"][1]), ["Species 9703-0", "Species 9703-1", "Species 9703-2"])
+        self.assertEqual(rows["Canidae"][0], 9701) # Backfilled
+        self.assertEqual(rows["Ursidae"], (None, None, "COMPLETED"))
+        # Unresolved families are still queued for the researcher to try again
+        self.assertEqual(rows["Nowhereidae"][:2], (None, None))
+        self.assertEqual(rows["Brokenidae"][:2], (None, None))
+
+        # A second run only retries what is still unresolved
+        gbif = FakeGBIF()
+        family_bulk_enqueue.bulk_enqueue(gbif=gbif)
+        self.assertEqual(sorted(gbif.matched), ["Brokenidae", "Nowhereidae"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+import os
+import zipfile
+from src.gbif_backbone import import_backbone, LocalBackbone
+from src.taxonomy_sampler import TaxonomySampler
+from src import discovery, family_scout
+
+HEADER = ["taxonID", "datasetID", "parentNameUsageID", "acceptedNameUsageID", "originalNameUsageID",
+          "scientificName", "scientificNameAuthorship", "canonicalName", "genericName", "specificEpithet",
+          "infraspecificEpithet", "taxonRank", "nameAccordingTo", "namePublishedIn", "taxonomicStatus",
+          "nomenclaturalStatus", "taxonRemarks", "kingdom", "phylum", "class", "order", "family", "genus"]
+
+# key, parent, accepted, name, rank, status, kingdom
+TAXA = [
+    (1, None, None, "Animalia", "kingdom", "accepted", "Animalia"),
+    (44, 1, None, "Chordata", "phylum", "accepted", "Animalia"),
+    (359, 44, None, "Mammalia", "class", "accepted", "Animalia"),
+    (732, 359, None, "Carnivora", "order", "accepted", "Animalia"),
+    (733, 359, None, "Creodonta", "order", "accepted", "Animalia"),
+    (9703, 732, None, "Felidae", "family", "accepted", "Animalia"),
+    (9701, 732, None, "Canidae", "family", "accepted", "Animalia"),
+    (2435022, 9703, None, "Panthera", "genus", "accepted", "Animalia"),
+    (5219404, 2435022, None, "Panthera leo", "species", "accepted", "Animalia"),
+    (5219436, 2435022, None, "Panthera tigris", "species", "accepted", "Animalia"),
+    (5219426, 2435022, None, "Panthera pardus", "species", "doubtful", "Animalia"),
+    (2434864, 9701, None, "Vulpes", "genus", "accepted", "Animalia"),
+    (5219243, 2434864, None, "Vulpes vulpes", "species", "accepted", "Animalia"),
+    (7193910, 2435022, 5219404, "Felis leo", "species", "homotypic synonym", "Animalia"),
+    (6, None, None, "Plantae", "kingdom", "accepted", "Plantae"),
+    (7707728, 6, None, "Tracheophyta", "phylum", "accepted", "Plantae"),
+]
+
+class TestGBIFBackbone(unittest.TestCase):
+    def setUp(self):
+        self.tsv = 'test_Taxon.tsv'
+        self.zip = 'test_backbone.zip'
+        self.db = 'test_backbone.db'
+        self.profile = 'test_SpeciesProfile.tsv'
+        with open(self.tsv, 'w') as f:
+            f.write('\t'.join(HEADER) + '\n')
+            for key, parent, accepted, name, rank, status, kingdom in TAXA:
+                row = dict.fromkeys(HEADER, '')
+                row.update(taxonID=str(key), parentNameUsageID=str(parent or ''), acceptedNameUsageID=str(accepted or ''),
+                           canonicalName=name, scientificName=name, taxonRank=rank, taxonomicStatus=status,
+                           kingdom=kingdom)
+                f.write('\t'.join(row[h] for h in HEADER) + '\n')
+
+    def tearDown(self):
+        for path in (self.tsv, self.zip, self.db, self.profile):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_import_builds_nested_sets_and_counts(self):
+        self.assertEqual(import_backbone(self.tsv, self.db), 14) # Plantae rows are skipped
+        backbone = LocalBackbone(self.db)
+        carnivora = backbone.conn.execute("SELECT * FROM taxa WHERE key = 732").fetchone()
+        self.assertEqual(carnivora['num_descendants'], 8)
+        self.assertEqual(carnivora['num_species'], 4)
+        self.assertIsNone(backbone.conn.execute("SELECT lft FROM taxa WHERE key = 7193910").fetchone()[0])
+
+        families = backbone.gbif_all(higherTaxonKey=1, rank="FAMILY", status="ACCEPTED")
+        self.assertEqual({f['canonicalName']: f['numDescendants'] for f in families}, {"Felidae": 4, "Canidae": 2})
+        species = backbone.gbif_search(higherTaxonKey=9703, rank="SPECIES", status="ACCEPTED", limit=1)
+        self.assertEqual(len(species["results"]), 1)
+        self.assertFalse(species["endOfRecords"])
+        pages = list(backbone.gbif_pages(page_size=1, higherTaxonKey=9703, rank="SPECIES"))
+        self.assertEqual([offset for offset, _ in pages], [1, 2, 3])
+
+        self.assertEqual(backbone.gbif_match(name="Felidae", rank="FAMILY")["usageKey"], 9703)
+        self.assertEqual(backbone.gbif_match(name="Felis leo")["acceptedUsageKey"], 5219404)
+        self.assertEqual(backbone.gbif_match(name="Felidae", rank="ORDER")["matchType"], "NONE")
+        backbone.close()
+
+    def test_scouts_query_the_snapshot(self):
+        with open(self.profile, 'w') as f:
+            f.write("taxonID\tisMarine\tisExtinct\n733\tfalse\ttrue\n732\tfalse\tfalse\n")
+        with zipfile.ZipFile(self.zip, 'w') as z:
+            z.write(self.tsv, 'backbone/Taxon.tsv')
+            z.write(self.profile, 'backbone/SpeciesProfile.tsv')
+        import_backbone(self.zip, self.db, kingdom=None)
+        backbone = LocalBackbone(self.db)
+        self.assertTrue(backbone.has_extinct_flags)
+        self.assertEqual(backbone.gbif_match(name="Creodonta")["usageKey"], 733)
+        with patch('src.discovery.client', backbone), patch('src.family_scout.client', backbone):
+            self.assertEqual([o['canonicalName'] for o in discovery.get_all_orders()], ["Carnivora"])
+            self.assertEqual([f['canonicalName'] for f in discovery.get_top_families_for_order(732)],
+                             ["Felidae", "Canidae"])
+            self.assertEqual([f['key'] for f in family_scout.get_families_for_order("Carnivora", limit=1)], [9703])
+        backbone.close()
+
+    def test_snapshot_without_profiles_filters_extinct_orders_via_the_api(self):
+        import_backbone(self.tsv, self.db)
+        backbone = LocalBackbone(self.db)
+        self.assertFalse(backbone.has_extinct_flags)
+
+        class FakeAPI:
+            def gbif_all(self, **params):
+                return [{"key": 732}, {"key": 733, "extinct": True}]
+        with patch('src.discovery.client', backbone), patch('src.discovery.api_client', FakeAPI()):
+            self.assertEqual([o['canonicalName'] for o in discovery.get_all_orders()], ["Carnivora"])
+        with patch('src.taxonomy_sampler.DB_PATH', self.db + '.sampler'):
+            sampler = TaxonomySampler(workers=1, client=FakeAPI(), gbif=backbone)
+            self.assertEqual([o['canonicalName'] for o in sampler.get_all_orders()], ["Carnivora"])
+            sampler.conn.close()
+        os.remove(self.db + '.sampler')
+        backbone.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import sqlite3
+from src.archivist import GraphArchivist
+from src.graph_engine import GraphEngine
+from src.graph_matrix import family_modality_matrix, order_modality_matrix
+from src.generate_sankey import sankey_flows
+from tests.graph_fixtures import GraphTestCase, species_record
+
+class TestGraphEngine(GraphTestCase):
+    prefix = 'test_engine'
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot = 'test_engine_snapshot.pkl'
+        records = [
+            species_record("Little Brown Bat", "Vespertilionidae", "Chiroptera", ["Mechanoreception", "Photoreception"]),
+            species_record("Big Brown Bat", "Vespertilionidae", "Chiroptera", ["Mechanoreception", "Photoreception"]),
+            species_record("Fruit Bat", "Pteropodidae", "Chiroptera", ["Photoreception", "Chemoreception"]),
+            species_record("Wolf", "Canidae", "Carnivora", ["Chemoreception", "Mechanoreception"]),
+        ]
+        for i, record in enumerate(records):
+            self.write_species(f"{i}_species.json", record)
+        GraphArchivist(rebuild=True, workers=1).run()
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.exists(self.snapshot):
+            os.remove(self.snapshot)
+
+    def test_rollups_and_neighbors(self):
+        engine = GraphEngine.from_db(self.test_db)
+        self.assertEqual(engine.rollup('species', 'order'), {"Chiroptera": 3, "Carnivora": 1})
+        self.assertEqual(engine.rollup('species', 'family'), {"Vespertilionidae": 2, "Pteropodidae": 1, "Canidae": 1})
+        self.assertEqual(engine.rollup('family', 'order'), {"Chiroptera": 2, "Carnivora": 1})
+
+        members = {engine.ids[i] for i in engine.neighbors('family:Vespertilionidae', 'MEMBER_OF', direction='in')}
+        self.assertEqual(members, {"species:Little Brown Bat", "species:Big Brown Bat"})
+
+        cooccurrence = engine.modality_cooccurrence()
+        self.assertEqual(cooccurrence[("Mechanoreception", "Photoreception")], 2)
+        self.assertEqual(cooccurrence[("Chemoreception", "Mechanoreception")], 1)
+
+    def test_modality_matrix(self):
+        matrix = family_modality_matrix(db_path=self.test_db)
+        self.assertEqual(matrix.rows, ["Canidae", "Pteropodidae", "Vespertilionidae"])
+        self.assertEqual(matrix.columns, ["Chemoreception", "Mechanoreception", "Photoreception"])
+        self.assertEqual(matrix.values, [[1, 1, 0], [1, 0, 1], [0, 2, 2]])
+
+        # Explicit labels fix the layout; unknown labels are zero-filled
+        orders = order_modality_matrix(rows=["Chiroptera"], columns=["Photoreception"], db_path=self.test_db)
+        self.assertEqual(orders.records('order'), [{"order": "Chiroptera", "Photoreception": 0}])
+
+    def test_sankey_flows(self):
+        conn = sqlite3.connect(self.test_db)
+        data = sankey_flows(conn, top_orders=1, top_families=1, with_class=True)
+        conn.close()
+        names = [(n["type"], n["name"]) for n in data["nodes"]]
+        flows = {(names[l["source"]][1], names[l["target"]]): l["value"] for l in data["links"]}
+        self.assertEqual(flows[("Mammalia", ("order", "Chiroptera"))], 3)
+        self.assertEqual(flows[("Mammalia", ("order", "Other"))], 1)
+        self.assertEqual(flows[("Chiroptera", ("family", "Vespertilionidae"))], 2)
+        # Pteropodidae misses the family cut and Canidae's order the order cut; both fold into Other
+        self.assertEqual(flows[("Chiroptera", ("family", "Other"))], 1)
+        self.assertEqual(flows[("Other", ("family", "Other"))], 1)
+        self.assertEqual(flows[("Vespertilionidae", ("modality", "Mechanoreception"))], 2)
+        self.assertEqual(flows[("Other", ("modality", "Chemoreception"))], 2)
+
+    def test_snapshot_round_trip(self):
+        engine = GraphEngine.load(self.test_db, self.snapshot)
+        self.assertTrue(os.path.exists(self.snapshot))
+        restored = GraphEngine.load_snapshot(self.snapshot)
+        self.assertEqual(restored.ids, engine.ids)
+        self.assertEqual(restored.rollup(), engine.rollup())
+        self.assertEqual(GraphEngine.load(self.test_db, self.snapshot).signature, engine.signature)
+
+if __name__ == '__main__':
+    unittest.main()
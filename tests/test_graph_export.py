@@ -0,0 +1,74 @@
+import unittest
+import os
+import csv
+import json
+import shutil
+import sqlite3
+import xml.etree.ElementTree as ET
+from src.graph_export import export_graph, pa
+
+AWKWARD = 'O\'Brien "Sharpnose", <shark> & co'
+
+class TestGraphExport(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_export.db'
+        self.out_dir = 'test_export_out'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE TABLE nodes (id TEXT PRIMARY KEY, name TEXT, type TEXT)")
+        conn.execute("CREATE TABLE edges (source TEXT, target TEXT, relationship TEXT, attributes JSON)")
+        conn.executemany("INSERT INTO nodes VALUES (?, ?, ?)", [
+            (f"species:{AWKWARD}", AWKWARD, 'species'),
+            ('sub_type:Passive Electroreception', 'Passive Electroreception', 'sub_type'),
+            ('modality:Electroreception', 'Electroreception', 'modality'),
+        ])
+        conn.executemany("INSERT INTO edges VALUES (?, ?, ?, ?)", [
+            (f"species:{AWKWARD}", 'sub_type:Passive Electroreception', 'HAS_SENSE',
+             json.dumps({"min": 0.005, "max": 1.0, "unit": "uV/cm"})),
+            (f"species:{AWKWARD}", 'modality:Electroreception', 'HAS_SENSE', json.dumps({"source": "species_data"})),
+            ('sub_type:Passive Electroreception', 'modality:Electroreception', 'INSTANCE_OF', None),
+        ])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+
+    def export(self, *formats):
+        return export_graph(formats, out_dir=self.out_dir, db_path=self.test_db, chunk_size=2)
+
+    def test_csv_and_jsonl_escape_names(self):
+        self.export('csv', 'jsonl')
+        with open(os.path.join(self.out_dir, 'nodes.csv'), newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["ID", "Label", "Type"])
+        self.assertIn([f"species:{AWKWARD}", AWKWARD, 'species'], rows)
+
+        with open(os.path.join(self.out_dir, 'edges.jsonl')) as f:
+            edges = [json.loads(line) for line in f]
+        self.assertEqual(len(edges), 3)
+        by_target = {e["target"]: e for e in edges}
+        self.assertEqual(by_target['sub_type:Passive Electroreception']["attributes"]["unit"], "uV/cm")
+
+    def test_graphml_is_well_formed(self):
+        path, = self.export('graphml')
+        ns = {'g': 'http://graphml.graphdrawing.org/xmlns'}
+        graph = ET.parse(path).getroot().find('g:graph', ns)
+        self.assertEqual(len(graph.findall('g:node', ns)), 3)
+        self.assertIn(f"species:{AWKWARD}", [n.get('id') for n in graph.findall('g:node', ns)])
+        maxima = [d.text for d in graph.iter('{http://graphml.graphdrawing.org/xmlns}data') if d.get('key') == 'max']
+        self.assertEqual(maxima, ['1.0'])
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_columnar_exports(self):
+        import pyarrow.parquet as pq
+        self.export('parquet', 'arrow')
+        edges = pq.read_table(os.path.join(self.out_dir, 'edges.parquet'))
+        self.assertEqual(edges.num_rows, 3)
+        self.assertEqual(sorted(v for v in edges.column('max').to_pylist() if v is not None), [1.0])
+        nodes = pa.ipc.open_file(os.path.join(self.out_dir, 'nodes.arrow')).read_all()
+        self.assertIn(AWKWARD, nodes.column('name').to_pylist())
+
+if __name__ == '__main__':
+    unittest.main()
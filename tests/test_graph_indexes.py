@@ -0,0 +1,44 @@
+import unittest
+import sqlite3
+from src.archivist import GraphArchivist
+from src import visualizer, generate_heatmap, generate_sankey, graph_matrix
+from tests.graph_fixtures import GraphTestCase, species_record
+
+# The hot read queries and sample parameters. Every step of their plans must
+# be an index SEARCH; a SCAN means an index went missing or stopped matching.
+HOT_QUERIES = {
+    'visualizer.TOP_SENSES_QUERY': (visualizer.TOP_SENSES_QUERY, ()),
+    'generate_heatmap.TOP_ORDERS_QUERY': (generate_heatmap.TOP_ORDERS_QUERY, generate_heatmap.NOISE),
+    'generate_heatmap.MODALITY_FREQUENCY_QUERY': (generate_heatmap.MODALITY_FREQUENCY_QUERY, ()),
+    'graph_matrix.MODALITY_MATRIX_QUERY': (graph_matrix.MODALITY_MATRIX_QUERY, ('family', 'order')),
+    'generate_sankey.FLOWS_QUERY': (generate_sankey.FLOWS_QUERY, ()),
+}
+
+# Reading a materialized CTE back is expected; only scans of the graph tables are flagged
+CTE_SCANS = ('SCAN membership', 'SCAN m')
+
+class TestGraphIndexes(GraphTestCase):
+    prefix = 'test_graph_indexes'
+
+    def setUp(self):
+        super().setUp()
+        orders = ['Chiroptera', 'Carnivora', 'Primates', 'Rodentia']
+        modalities = [('Mechanoreception', 'Echolocation'), ('Photoreception', 'Color Vision'),
+                      ('Chemoreception', 'Olfaction')]
+        for i in range(200):
+            order = orders[i % len(orders)]
+            domain, sub_type = modalities[i % len(modalities)]
+            record = species_record(f"Species {i}", f"{order}Family{i % 10}", order, [(domain, sub_type)])
+            self.write_species(f"{i}_Species.json", record)
+        GraphArchivist(rebuild=True, workers=1).run()
+
+    def test_hot_queries_use_indexes(self):
+        conn = sqlite3.connect(self.test_db)
+        for name, (query, params) in HOT_QUERIES.items():
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            scans = [step for step in plan if step.startswith('SCAN') and step not in CTE_SCANS]
+            self.assertEqual(scans, [], f"{name} scans a table:\n" + "\n".join(plan))
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import math
+import sqlite3
+from src.archivist import GraphArchivist
+from src.graph_layout import ensure_layout
+from src.generate_interactive_graph import build_graph_data
+from tests.graph_fixtures import GraphTestCase, species_record
+
+class TestGraphLayout(GraphTestCase):
+    prefix = 'test_layout'
+
+    def setUp(self):
+        super().setUp()
+        records = [species_record(f"Bat {i}", "Vespertilionidae", "Chiroptera", ["Mechanoreception"]) for i in range(5)]
+        records.append(species_record("Wolf", "Canidae", "Carnivora", ["Chemoreception"]))
+        for i, record in enumerate(records):
+            self.write_species(f"{i}_species.json", record)
+        GraphArchivist(rebuild=True, workers=1).run()
+
+    def test_layout_is_stored_and_deterministic(self):
+        layout = ensure_layout(self.test_db)
+        self.assertEqual(layout, ensure_layout(self.test_db, force=True))
+
+        # Species sit close to their family, far closer than the families sit to each other
+        fx, fy, _ = layout["family:Vespertilionidae"]
+        for i in range(5):
+            x, y, parent = layout[f"species:Bat {i}"]
+            self.assertEqual(parent, "family:Vespertilionidae")
+            self.assertLess(math.hypot(x - fx, y - fy), 10)
+
+    def test_graph_data_is_columnar(self):
+        conn = sqlite3.connect(self.test_db)
+        data, tiles = build_graph_data(conn, ensure_layout(self.test_db), tile_size=5)
+        conn.close()
+        family = data["name"].index("Vespertilionidae")
+        self.assertEqual(data["size"][family], 5)
+        self.assertEqual(len(data["x"]), len(data["name"]))
+        self.assertNotIn('species', [data["types"][t] for t in data["type"]])
+
+        # Species live in tiles that cover their own coordinates, with senses indexed into the skeleton
+        self.assertEqual(data["tiles"], {key: len(tile["name"]) for key, tile in tiles.items()})
+        self.assertEqual(sum(data["tiles"].values()), 6)
+        for key, tile in tiles.items():
+            tx, ty = map(int, key.split('_'))
+            for x, y in zip(tile["x"], tile["y"]):
+                self.assertEqual((math.floor(x / 5), math.floor(y / 5)), (tx, ty))
+            senses = {data["name"][t] for t in tile["senses"][1::2]}
+            self.assertTrue(senses <= {"Mechanoreception", "Chemoreception"})
+
+if __name__ == '__main__':
+    unittest.main()
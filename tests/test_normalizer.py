@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+import os
+import sqlite3
+from src.normalizer import canonical_node, canonical_modality, normalize_key, normalize_database, UNMAPPED_LABELS
+
+class TestNormalizer(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_normalizer.db'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE TABLE nodes (id TEXT PRIMARY KEY, name TEXT, type TEXT)")
+        conn.execute("""
+            CREATE TABLE edges (source TEXT, target TEXT, relationship TEXT, attributes JSON,
+                                PRIMARY KEY (source, target, relationship))
+        """)
+        # A graph from before archive-time canonicalization
+        conn.executemany("INSERT INTO nodes VALUES (?, ?, ?)", [
+            ('species:Mole', 'Mole', 'species'),
+            ('family:Talpidae', 'Talpidae', 'family'),
+            ('modality:vision', 'vision', 'modality'),
+            ('modality:Photoreception', 'Photoreception', 'modality'),
+            ('modality:Chemoreception', 'Chemoreception', 'modality'),
+            ('sub_type:Olfaction', 'Olfaction', 'sub_type'),
+            ('sub_type:Eimer Organ', 'Eimer Organ', 'sub_type'),
+        ])
+        conn.executemany("INSERT INTO edges VALUES (?, ?, ?, ?)", [
+            ('family:Talpidae', 'modality:vision', 'HAS_SENSE', '{"prevalence": "rare"}'),
+            ('species:Mole', 'modality:Photoreception', 'HAS_SENSE', None),
+            ('species:Mole', 'modality:vision', 'HAS_SENSE', None),
+            ('species:Mole', 'modality:Chemoreception', 'HAS_SENSE', None),
+            ('sub_type:Olfaction', 'modality:Chemoreception', 'INSTANCE_OF', None),
+            ('species:Mole', 'sub_type:Olfaction', 'HAS_SENSE', None),
+            ('sub_type:Eimer Organ', 'modality:vision', 'INSTANCE_OF', None),
+        ])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def test_canonical_node(self):
+        self.assertEqual(canonical_node(' vision', 'modality'), ('modality:Photoreception', 'Photoreception', 'modality'))
+        self.assertEqual(canonical_node('Olfaction', 'sub_type'), ('modality:Chemoreception', 'Chemoreception', 'modality'))
+        self.assertEqual(canonical_node('Eimer Organ', 'sub_type'), ('sub_type:Eimer Organ', 'Eimer Organ', 'sub_type'))
+        self.assertIsNone(canonical_node('  ', 'sub_type'))
+
+    def test_canonical_modality_folds_spelling_variants(self):
+        self.assertEqual(normalize_key(' Lateral_Lines '), 'lateral line')
+        for label in ('HEARING', 'hearing/audition', 'touch - somatosensation', 'Statocysts'):
+            self.assertEqual(canonical_modality(label), 'Mechanoreception')
+        self.assertEqual(canonical_modality('smell/olfaction'), 'Chemoreception')
+        self.assertEqual(canonical_modality('photosensitivity'), 'Photoreception')
+        self.assertEqual(canonical_modality('thermoception'), 'Thermoreception')
+        # Sub_types only collapse on exact keys
+        self.assertEqual(canonical_node('UV Vision', 'sub_type'), ('sub_type:UV Vision', 'UV Vision', 'sub_type'))
+
+    def test_unmapped_labels_are_counted(self):
+        UNMAPPED_LABELS.clear()
+        canonical_modality('hygroreception')
+        canonical_modality('hygroreception')
+        self.assertEqual(canonical_modality('hygroreception'), 'hygroreception')
+        self.assertEqual(UNMAPPED_LABELS['hygroreception'], 3)
+
+    def test_migration_merges_labels(self):
+        with patch('src.normalizer.DB_PATH', self.test_db):
+            normalize_database()
+        conn = sqlite3.connect(self.test_db)
+        nodes = {r[0] for r in conn.execute("SELECT id FROM nodes")}
+        edges = {r[:3] for r in conn.execute("SELECT source, target, relationship FROM edges")}
+        conn.close()
+
+        self.assertEqual(nodes, {'species:Mole', 'family:Talpidae', 'modality:Photoreception',
+                                 'modality:Chemoreception', 'sub_type:Eimer Organ'})
+        self.assertEqual(edges, {
+            ('family:Talpidae', 'modality:Photoreception', 'HAS_SENSE'),
+            ('species:Mole', 'modality:Photoreception', 'HAS_SENSE'),
+            ('species:Mole', 'modality:Chemoreception', 'HAS_SENSE'),
+            ('sub_type:Eimer Organ', 'modality:Photoreception', 'INSTANCE_OF'),
+        })
+
+if __name__ == '__main__':
+    unittest.main()
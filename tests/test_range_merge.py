@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+from src.range_merge import (
+    normalize_unit, union_intervals, intersect_intervals,
+    merge_modality_ranges, merge_family_ranges, RangeIndex, family_ranges, index_record, rebuild_range_index
+)
+from src.vault_codec import write_record
+
+def hearing(lo, hi, unit, citation):
+    return {
+        "modality_domain": "Mechanoreception",
+        "sub_type": "Hearing",
+        "stimulus_type": "Acoustic Pressure Wave",
+        "quantitative_data": {"min": lo, "max": hi, "unit": unit, "context": "Physiological Limit"},
+        "evidence": [{"source_type": "Primary Study", "citation": citation}]
+    }
+
+class TestRangeMerge(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_ranges.db'
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def test_normalize_unit(self):
+        self.assertEqual(normalize_unit('kHz'), ('Hz', 1000))
+        self.assertEqual(normalize_unit(' hertz '), ('Hz', 1))
+        self.assertEqual(normalize_unit('uV/cm'), ('uV/cm', 1))
+
+    def test_union_and_intersection(self):
+        self.assertEqual(union_intervals([(30, 50), (10, 20), (15, 35)]), [[10, 50]])
+        self.assertEqual(union_intervals([(1, 2), (3, 4)]), [[1, 2], [3, 4]])
+        self.assertEqual(intersect_intervals([(10, 40), (20, 60)]), [20, 40])
+        self.assertIsNone(intersect_intervals([(1, 2), (3, 4)]))
+
+    def test_species_merge_normalizes_units(self):
+        existing = hearing(20, 20000, 'Hz', 'Study A')
+        merge_modality_ranges(existing, hearing(15, 150, 'kHz', 'Study B'))
+        qd = existing['quantitative_data']
+        self.assertEqual((qd['min'], qd['max'], qd['unit']), (20, 150000, 'Hz'))
+        group = existing['range_summary']['Hz']
+        self.assertEqual(group['union'], [[20, 150000]])
+        self.assertEqual(group['intersection'], [15000, 20000])
+        self.assertEqual(len(group['sources']), 2)
+
+        # Re-merging the same source is idempotent
+        merge_modality_ranges(existing, hearing(15, 150, 'kHz', 'Study B'))
+        self.assertEqual(len(existing['range_summary']['Hz']['sources']), 2)
+
+    def test_family_merge_ignores_placeholder_ranges(self):
+        existing = {"presence": "common", "frequency_range_hz": {"min": 0.0, "max": 0.0}}
+        merge_family_ranges(existing, {"frequency_range_hz": {"min": 100.0, "max": 2000.0}}, source='run-1')
+        merge_family_ranges(existing, {"frequency_range_hz": {"min": 50.0, "max": 500.0}}, source='run-2')
+        self.assertEqual(existing['frequency_range_hz'], {"min": 50.0, "max": 2000.0})
+        self.assertEqual(existing['frequency_range_summary']['intersection'], [100.0, 500.0])
+        self.assertEqual([b['source'] for b in existing['frequency_range_summary']['sources']], ['run-1', 'run-2'])
+
+    def test_inverted_family_range_is_reordered(self):
+        mod = {"presence": "common", "frequency_range_hz": {"min": 8000.0, "max": 200.0}}
+        merge_family_ranges(mod, source='run-1')
+        self.assertEqual(mod['frequency_range_hz'], {"min": 200.0, "max": 8000.0})
+        self.assertEqual(family_ranges({"sensory_modalities": {"hearing": mod}}), [('hearing', 'Hz', [[200.0, 8000.0]])])
+
+        # A profile saved before bounds were ordered still indexes instead of tripping the R*Tree
+        index_record('family', 9703, [('hearing', 'Hz', [[8000.0, 200.0]])], db_path=self.test_db)
+        index = RangeIndex(self.test_db)
+        self.assertEqual(index.query(1, 2, unit='kHz'), [('family', '9703', 'hearing', 200.0, 8000.0)])
+        index.close()
+
+    def test_range_index_query(self):
+        index = RangeIndex(self.test_db)
+        index.replace('species', 2440502, [('Echolocation', 'Hz', [[1000.0, 150000.0]])])
+        index.replace('species', 2436436, [('Hearing', 'Hz', [[20.0, 20000.0]])])
+        index.replace('family', 2211, [('vision', 'Hz', [[4.3e14, 7.5e14]])])
+        hits = index.query(25, 40, unit='kHz')
+        self.assertEqual([(kind, key) for kind, key, *_ in hits], [('species', '2440502')])
+
+        # Replacing a taxon drops its previous intervals
+        index.replace('species', 2440502, [('Echolocation', 'Hz', [[1000.0, 10000.0]])])
+        self.assertEqual(index.query(25, 40, unit='kHz'), [])
+        index.close()
+
+    def test_rebuild_drops_records_no_longer_in_the_vaults(self):
+        species_vault, family_vault = 'test_ranges_vault', 'test_ranges_family_vault'
+        for d in (species_vault, family_vault):
+            os.makedirs(d, exist_ok=True)
+        self.addCleanup(shutil.rmtree, species_vault, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, family_vault, ignore_errors=True)
+        write_record(os.path.join(species_vault, '2440502_Myotis_lucifugus.json'), {
+            "identity": {"gbif_id": 2440502}, "sensory_modalities": [hearing(10, 120, 'kHz', "Griffin 1958")]
+        }, codec='json')
+        # A placeholder family that compaction has since removed from the vault
+        index_record('family', 'Unknownidae', [('hearing', 'Hz', [[100.0, 5000.0]])], db_path=self.test_db)
+
+        with patch('src.range_merge.SPECIES_VAULT_DIR', species_vault), \
+             patch('src.range_merge.FAMILY_VAULT_DIR', family_vault):
+            rebuild_range_index(db_path=self.test_db)
+        index = RangeIndex(self.test_db)
+        self.assertEqual(index.query(1, 200, unit='kHz'), [('species', '2440502', 'Hearing', 10000.0, 120000.0)])
+        self.assertEqual(index.c.execute("SELECT COUNT(*) FROM range_rtree").fetchone()[0], 1)
+        index.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import shutil
+import sqlite3
+from src.reports import report_product, load_product, PRODUCTS
+
+calls = []
+
+@report_product('test_node_count')
+def node_count(conn, node_type='species'):
+    calls.append(node_type)
+    return {"count": conn.execute("SELECT COUNT(*) FROM nodes WHERE type = ?", (node_type,)).fetchone()[0]}
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_reports.db'
+        self.cache_dir = 'test_report_cache'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE TABLE nodes (id TEXT PRIMARY KEY, name TEXT, type TEXT)")
+        conn.execute("CREATE TABLE edges (source TEXT, target TEXT, relationship TEXT, attributes JSON)")
+        conn.execute("INSERT INTO nodes VALUES ('species:Wolf', 'Wolf', 'species')")
+        conn.commit()
+        conn.close()
+        calls.clear()
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def load(self, **params):
+        return load_product('test_node_count', db_path=self.test_db, cache_dir=self.cache_dir, **params)
+
+    def test_products_are_cached_per_graph_version(self):
+        self.assertEqual(self.load(), {"count": 1})
+        self.assertEqual(self.load(), {"count": 1})
+        self.assertEqual(calls, ['species'])
+
+        # Different parameters are separate products
+        self.assertEqual(self.load(node_type='family'), {"count": 0})
+        self.assertEqual(calls, ['species', 'family'])
+
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("INSERT INTO nodes VALUES ('species:Fox', 'Fox', 'species')")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.load(), {"count": 2})
+        # Products from the previous graph version are pruned
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_unknown_product(self):
+        self.assertIn('test_node_count', PRODUCTS)
+        with self.assertRaises(KeyError):
+            load_product('no_such_product', db_path=self.test_db, cache_dir=self.cache_dir)
+
+if __name__ == '__main__':
+    unittest.main()
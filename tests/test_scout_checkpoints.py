@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch
+import os
+import sqlite3
+import requests
+from src.http_client import PooledClient
+from src import scout
+
+SPECIES = [{"key": 100 + i, "canonicalName": f"Species {i}"} for i in range(25)]
+
+class PagedGBIF(PooledClient):
+    """Serves SPECIES in GBIF's offset/limit pages; optionally fails once at a given offset."""
+    def __init__(self, fail_at=None):
+        super().__init__()
+        self.fail_at = fail_at
+        self.calls = []
+
+    def gbif_search(self, offset=0, limit=20, **params):
+        self.calls.append((offset, limit))
+        if offset == self.fail_at:
+            self.fail_at = None
+            raise requests.ConnectionError("connection reset")
+        results = SPECIES[offset:offset + limit]
+        return {"results": results, "endOfRecords": offset + limit >= len(SPECIES)}
+
+    def gbif_pages(self, page_size=10, **params):
+        return super().gbif_pages(page_size=page_size, **params)
+
+class TestScoutCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_scout.db'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("""
+            CREATE TABLE research_queue (
+                id INTEGER PRIMARY KEY,
+                animal_name TEXT UNIQUE,
+                gbif_id TEXT,
+                taxonomy_source TEXT,
+                priority INTEGER,
+                status TEXT,
+                entity_type TEXT,
+                entity_id TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+        self.patchers = [
+            patch('src.scout.DB_PATH', self.test_db),
+            patch('src.scout.get_family_key', lambda name: 42),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def queued(self):
+        conn = sqlite3.connect(self.test_db)
+        names = [n for (n,) in conn.execute("SELECT animal_name FROM research_queue ORDER BY id")]
+        conn.close()
+        return names
+
+    def test_gbif_pages_stops_at_end_and_limit(self):
+        client = PagedGBIF()
+        pages = list(client.gbif_pages(page_size=10, higherTaxonKey=42))
+        self.assertEqual([offset for offset, _ in pages], [10, 20, 25])
+        self.assertEqual(len(client.gbif_all(page_size=10)), len(SPECIES))
+
+        client = PagedGBIF()
+        pages = list(client.gbif_pages(page_size=10, offset=5, max_results=12))
+        self.assertEqual(client.calls, [(5, 10), (15, 2)])
+        self.assertEqual(sum(len(r) for _, r in pages), 12)
+
+    def test_interrupted_scout_resumes_from_checkpoint(self):
+        with patch('src.scout.client', PagedGBIF(fail_at=20)):
+            scout.expand_taxonomy("Testidae")
+        self.assertEqual(len(self.queued()), 20)
+
+        resumed = PagedGBIF()
+        with patch('src.scout.client', resumed):
+            scout.expand_taxonomy("Testidae")
+        self.assertEqual(resumed.calls[0], (20, 10))
+        self.assertEqual(self.queued(), [s["canonicalName"] for s in SPECIES])
+
+        # A finished family is not fetched again unless restarted
+        again = PagedGBIF()
+        with patch('src.scout.client', again):
+            scout.expand_taxonomy("Testidae")
+            self.assertEqual(again.calls, [])
+            scout.expand_taxonomy("Testidae", restart=True)
+        self.assertEqual(again.calls[0], (0, 10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+from src.models import FamilySensoryProfile
+from src.family_aggregator import FamilyAggregator
+from src.species_index import index_species, rebuild_species_index, species_for_family
+from src.vault_codec import read_record, write_record
+
+def species(gbif_id, name, family, *modalities):
+    return {
+        "identity": {"common_name": name.split()[-1].title(), "scientific_name": name, "gbif_id": gbif_id,
+                     "taxonomy": {"class": "Mammalia", "order": "Carnivora", "family": family}},
+        "sensory_modalities": [{"modality_domain": domain, "sub_type": sub_type} for domain, sub_type in modalities],
+    }
+
+LION = species(5219404, "Panthera leo", "Felidae", ("vision", "Scotopic"), ("Photoreception", "Scotopic"))
+TIGER = species(5219436, "Panthera tigris", "Felidae", ("hearing", "Audition"))
+FOX = species(5219243, "Vulpes vulpes", "Canidae", ("Magnetoreception", "Compass"))
+
+class TestSpeciesIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_species_index.db'
+        self.test_vault = 'test_species_index_vault'
+        self.test_family_vault = 'test_species_index_family_vault'
+        os.makedirs(self.test_vault, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        for d in (self.test_vault, self.test_family_vault):
+            if os.path.exists(d):
+                shutil.rmtree(d)
+
+    def save(self, record):
+        path = os.path.join(self.test_vault, f"{record['identity']['gbif_id']}_{record['identity']['scientific_name'].replace(' ', '_')}.json")
+        write_record(path, record)
+        index_species(record, path, db_path=self.test_db)
+        return path
+
+    def test_index_species_updates_on_resave(self):
+        self.save(LION)
+        [lion] = species_for_family("Felidae", db_path=self.test_db)
+        # Spelling variants fold to one canonical claim
+        self.assertEqual(lion["modalities"], [{"modality_domain": "Photoreception", "sub_type": "Scotopic"}])
+
+        self.save(species(5219404, "Panthera leo", "Felidae", ("hearing", "Audition")))
+        [lion] = species_for_family("Felidae", db_path=self.test_db)
+        self.assertEqual(lion["modalities"], [{"modality_domain": "Mechanoreception", "sub_type": "Audition"}])
+
+    def test_species_for_family_and_rebuild(self):
+        for record in (TIGER, FOX, LION):
+            self.save(record)
+        felids = species_for_family("Felidae", db_path=self.test_db)
+        self.assertEqual([s["scientific_name"] for s in felids], ["Panthera leo", "Panthera tigris"])
+        self.assertEqual(species_for_family("Ursidae", db_path=self.test_db), [])
+
+        # A rebuild drops rows whose files are gone and skips unreadable files
+        os.remove(os.path.join(self.test_vault, "5219436_Panthera_tigris.json"))
+        with open(os.path.join(self.test_vault, "broken.json"), 'w') as f:
+            f.write("{not json")
+        self.assertEqual(rebuild_species_index(self.test_vault, db_path=self.test_db), 2)
+        self.assertEqual([s["scientific_name"] for s in species_for_family("Felidae", db_path=self.test_db)],
+                         ["Panthera leo"])
+        self.assertEqual(len(species_for_family("Canidae", db_path=self.test_db)), 1)
+
+    def test_family_profile_links_supporting_species(self):
+        for record in (LION, TIGER, FOX):
+            self.save(record)
+        profile = FamilySensoryProfile(
+            family_name="Felidae", order_name="Carnivora", gbif_id=9703, confidence="MEDIUM", sources=["run-1"],
+            sensory_modalities={"Vision": {"presence": "common", "notes": "Tapetum lucidum."},
+                                "Hearing": {"presence": "common", "notes": "Broad range."},
+                                "Electroreception": {"presence": "unknown", "notes": ""}})
+        with patch('src.family_aggregator.DB_PATH', self.test_db), \
+             patch('src.family_aggregator.FAMILY_VAULT_DIR', self.test_family_vault):
+            FamilyAggregator().save_profile(profile)
+
+        saved = read_record(os.path.join(self.test_family_vault, "9703_Felidae.json"))
+        self.assertEqual([s["gbif_id"] for s in saved["supporting_species"]], [5219404, 5219436])
+        modalities = saved["sensory_modalities"]
+        self.assertEqual(modalities["Vision"]["supporting_species"], [5219404])
+        self.assertEqual(modalities["Hearing"]["supporting_species"], [5219436])
+        self.assertEqual(modalities["Electroreception"]["supporting_species"], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import patch
+import os
+import time
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from src.http_client import HostLimiter, PooledClient
+from src.taxonomy_sampler import TaxonomySampler
+from src.wiki_checker import TITLES_PER_REQUEST
+
+WIKI_PAGES = {"Family 0-1", "Family 2-3", "Species 0-1-4", "Species 1-0-2", "Species 2-3-0"}
+
+class FakeGBIF:
+    """Three orders of four families of six species, answering after a random delay."""
+    def __init__(self):
+        self.limiter = HostLimiter()
+        self.rng = random.Random(0)
+        self.searches = []
+        self.page_sizes = []
+
+    def gbif_search(self, higherTaxonKey, rank, offset=0, limit=20, **params):
+        time.sleep(self.rng.random() * 0.01)
+        self.searches.append((higherTaxonKey, offset))
+        if rank == "ORDER":
+            results = [{"key": f"o{o}", "canonicalName": f"Order {o}"} for o in range(3)]
+        elif rank == "FAMILY":
+            o = higherTaxonKey[1:]
+            results = [{"key": f"f{o}-{f}", "canonicalName": f"Family {o}-{f}", "numDescendants": 10 + f}
+                       for f in range(4)]
+        else:
+            o, f = higherTaxonKey[1:].split('-')
+            results = [{"key": f"s{o}-{f}-{s}", "canonicalName": f"Species {o}-{f}-{s}"} for s in range(6)]
+        return {"results": results[offset:offset + limit], "endOfRecords": offset + limit >= len(results)}
+
+    # Small pages, so listings always span several requests
+    def gbif_pages(self, page_size=3, **params):
+        self.page_sizes.append(page_size)
+        return PooledClient.gbif_pages(self, page_size=min(page_size, 3), **params)
+
+    gbif_all = PooledClient.gbif_all
+
+class TestTaxonomySampler(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_sampler.db'
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("""
+            CREATE TABLE research_queue (
+                id INTEGER PRIMARY KEY,
+                animal_name TEXT UNIQUE,
+                gbif_id TEXT,
+                taxonomy_source TEXT,
+                priority INTEGER,
+                status TEXT,
+                entity_type TEXT,
+                entity_id TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+        self.patchers = [
+            patch('src.taxonomy_sampler.DB_PATH', self.test_db),
+            patch.object(TaxonomySampler, 'wiki_flags', lambda self, names: [n in WIKI_PAGES for n in names]),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def sample(self, workers):
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("DELETE FROM research_queue")
+        conn.commit()
+        TaxonomySampler(families_per_order=2, species_per_family=2, workers=workers, client=FakeGBIF()).run(restart=True)
+        rows = conn.execute("SELECT animal_name, taxonomy_source FROM research_queue ORDER BY id").fetchall()
+        conn.close()
+        return rows
+
+    def test_concurrent_run_matches_serial(self):
+        serial = self.sample(workers=1)
+        self.assertEqual(serial, self.sample(workers=8))
+        self.assertEqual(len(serial), 3 * 2 * 2)
+
+        # Wiki-backed families and species win their slots
+        names = [name for name, _ in serial]
+        self.assertEqual(names[:4], ["Species 0-1-4", "Species 0-1-0", "Species 0-3-0", "Species 0-3-1"])
+        self.assertIn("Pick: Wiki-confirmed", dict(serial)["Species 0-1-4"])
+
+    def test_listings_are_not_cut_off_at_one_page(self):
+        gbif = FakeGBIF()
+        sampler = TaxonomySampler(families_per_order=1, species_per_family=2, workers=1, client=gbif)
+        # The richest family is on the second page of the order's listing
+        [top] = sampler.score_families("o1")
+        self.assertEqual(top["name"], "Family 1-3")
+        self.assertEqual([offset for key, offset in gbif.searches if key == "o1"], [0, 3])
+
+        # With too few documented species, the whole family is listed before filling from GBIF order
+        picks = sampler.pick_best_species_list("f1-0", "Family 1-0")
+        self.assertEqual([s["canonicalName"] for s in picks], ["Species 1-0-2", "Species 1-0-0"])
+        self.assertEqual([offset for key, offset in gbif.searches if key == "f1-0"], [0, 3])
+        # Species pages match one batched Wikipedia query
+        self.assertEqual(gbif.page_sizes[-1], TITLES_PER_REQUEST)
+        sampler.conn.close()
+
+    def test_host_limiter_caps_concurrency(self):
+        limiter = HostLimiter({'api.gbif.org': 2})
+        active = []
+        peak = []
+        def request(_):
+            with limiter.slot('api.gbif.org'):
+                active.append(1)
+                peak.append(len(active))
+                time.sleep(0.005)
+                active.pop()
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(request, range(20)))
+        self.assertLessEqual(max(peak), 2)
+
+if __name__ == '__main__':
+    unittest.main()
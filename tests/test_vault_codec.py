@@ -0,0 +1,113 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import shutil
+from src import vault_codec
+from src.vault_codec import read_record, write_record, detect_format
+
+RECORD = {
+    "identity": {
+        "common_name": "Bonobo",
+        "scientific_name": "Pan paniscus",
+        "gbif_id": 100492307,
+        "aliases": ["Pygmy chimpanzee"],
+        "taxonomy": {"class": "Mammalia", "order": "Primates", "family": "Hominidae"}
+    },
+    "sensory_modalities": [
+        {
+            "modality_domain": "Mechanoreception",
+            "sub_type": "Hearing",
+            "stimulus_type": "Acoustic Pressure Wave",
+            "quantitative_data": {"min": 16.0, "max": 30000.0, "unit": "Hz", "context": "Physiological Limit"},
+            "evidence": [{"source_type": "Review Paper", "source_name": "Wikipedia", "citation": "Pérez 2002"}]
+        }
+    ],
+    "meta": {"data_quality_flag": "Low_Data"}
+}
+
+class TestVaultCodec(unittest.TestCase):
+    def setUp(self):
+        self.test_vault = 'test_codec_vault'
+        os.makedirs(self.test_vault, exist_ok=True)
+        self.path = os.path.join(self.test_vault, '100492307_Pan_paniscus.json')
+
+    def tearDown(self):
+        if os.path.exists(self.test_vault):
+            shutil.rmtree(self.test_vault)
+
+    @patch.multiple('src.vault_codec', DEFAULT_CODEC='json', DEFAULT_COMPRESS=False)
+    def test_default_codec_is_readable_json(self):
+        write_record(self.path, RECORD)
+        with open(self.path, 'r') as f:
+            self.assertEqual(json.load(f), RECORD)
+
+    def test_json_codec_matches_json_dump(self):
+        # Records written before the codecs existed must not be rewritten by their next save
+        write_record(self.path, RECORD, codec='json')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), json.dumps(RECORD, indent=2).encode('utf-8'))
+
+    def test_compact_is_smaller_and_round_trips(self):
+        pretty = write_record(self.path, RECORD, codec='json')
+        compact = write_record(self.path, RECORD, codec='compact')
+        self.assertLess(compact, pretty)
+        self.assertEqual(read_record(self.path), RECORD)
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    @unittest.skipIf(vault_codec.msgpack is None, "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        write_record(self.path, RECORD, codec='msgpack')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(detect_format(f.read()), 'msgpack')
+        self.assertEqual(read_record(self.path), RECORD)
+
+    @unittest.skipIf(vault_codec.cbor2 is None, "cbor2 not installed")
+    def test_cbor_round_trip(self):
+        write_record(self.path, RECORD, codec='cbor')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(detect_format(f.read()), 'cbor')
+        self.assertEqual(read_record(self.path), RECORD)
+
+    @unittest.skipIf(vault_codec.zstandard is None, "zstandard not installed")
+    def test_zstd_wrapped_record(self):
+        write_record(self.path, RECORD, codec='compact', compress=True)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(detect_format(f.read()), 'zstd')
+        self.assertEqual(read_record(self.path), RECORD)
+
+    @patch.multiple('src.vault_codec', DEFAULT_CODEC='compact', DEFAULT_COMPRESS=False)
+    def test_writes_use_configured_codec(self):
+        # researcher and family_aggregator call write_record without a codec
+        size = write_record(self.path, RECORD)
+        with open(self.path, 'rb') as f:
+            self.assertNotIn(b'\n', f.read())
+        self.assertEqual(size, len(vault_codec.encode_record(RECORD, 'compact')))
+
+    def test_settings_from_config_and_environment(self):
+        config = os.path.join(self.test_vault, 'config.yml')
+        with open(config, 'w') as f:
+            f.write('GEMINI_API_KEY: "x"\nVAULT_CODEC: "compact"\n')
+        if vault_codec.yaml is not None:
+            self.assertEqual(vault_codec.vault_settings(config, {}), ('compact', False))
+        self.assertEqual(vault_codec.vault_settings(config, {'UMWELT_VAULT_CODEC': 'JSON'}), ('json', False))
+        self.assertEqual(vault_codec.vault_settings('missing.yml', {}), ('json', False))
+        # Bad or unavailable settings fall back instead of breaking every save
+        self.assertEqual(vault_codec.vault_settings('missing.yml', {'UMWELT_VAULT_CODEC': 'yaml'}), ('json', False))
+        if vault_codec.msgpack is None:
+            self.assertEqual(vault_codec.vault_settings('missing.yml', {'UMWELT_VAULT_CODEC': 'msgpack'})[0], 'compact')
+        if vault_codec.zstandard is not None:
+            self.assertTrue(vault_codec.vault_settings('missing.yml', {'UMWELT_VAULT_ZSTD': 'yes'})[1])
+
+    def test_unknown_codec_rejected(self):
+        with self.assertRaises(ValueError):
+            write_record(self.path, RECORD, codec='yaml')
+
+    def test_convert_vault(self):
+        write_record(self.path, RECORD, codec='json')
+        before, after = vault_codec.convert_vault(self.test_vault, 'compact')
+        self.assertLess(after, before)
+        self.assertEqual(read_record(self.path), RECORD)
+
+if __name__ == '__main__':
+    unittest.main()
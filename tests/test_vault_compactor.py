@@ -0,0 +1,112 @@
+import unittest
+import os
+import json
+import shutil
+from src.vault_compactor import compact_vault
+from src.vault_codec import read_record, write_record
+
+def evidence(url, citation="Smith 2001"):
+    return {"source_type": "Review Paper", "source_name": "Wikipedia", "url": url, "title": "Lion", "citation": citation}
+
+def species(common_name, scientific_name, gbif_id, *modalities, aliases=()):
+    return {
+        "identity": {"common_name": common_name, "scientific_name": scientific_name, "gbif_id": gbif_id,
+                     "aliases": list(aliases), "taxonomy": {"class": "Mammalia", "order": "Carnivora", "family": "Felidae"}},
+        "sensory_modalities": list(modalities),
+        "meta": {"data_quality_flag": "Low_Data"},
+    }
+
+def lion(*modalities, aliases=()):
+    return species("Lion", "Panthera leo", 5219404, *modalities, aliases=aliases)
+
+def modality(domain, sub_type, *evidence_items):
+    return {"modality_domain": domain, "sub_type": sub_type, "stimulus_type": "Light",
+            "evidence": list(evidence_items)}
+
+def family(name, gbif_id=None, sources=(), **modalities):
+    return {"family_name": name, "order_name": "Carnivora", "gbif_id": gbif_id, "confidence": "MEDIUM",
+            "sources": list(sources), "generated_at": "2026-01-04T12:31:43.891621",
+            "sensory_modalities": {k: {"presence": "common", "notes": v} for k, v in modalities.items()}}
+
+class TestVaultCompactor(unittest.TestCase):
+    def setUp(self):
+        self.vault = 'test_compactor_vault'
+        os.makedirs(self.vault, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.exists(self.vault):
+            shutil.rmtree(self.vault)
+
+    def write(self, filename, record):
+        write_record(os.path.join(self.vault, filename), record, codec='json')
+
+    def files(self):
+        return sorted(os.listdir(self.vault))
+
+    def compact(self, kind):
+        return compact_vault(self.vault, kind, workers=2, chunk_size=1)
+
+    def test_folds_legacy_files_and_dedupes_evidence(self):
+        self.write("5219404_Panthera_leo.json", lion(
+            modality("Photoreception", "Scotopic Vision", evidence("https://en.wikipedia.org/wiki/Lion"))))
+        self.write("5219404 - Lion.json", lion(
+            modality("Photoreception", "Scotopic Vision", evidence("http://www.en.wikipedia.org/wiki/Lion/")),
+            modality("Mechanoreception", "Hearing"), aliases=["African lion"]))
+        stats, changes = self.compact('species')
+
+        self.assertEqual(self.files(), ["5219404_Panthera_leo.json"])
+        self.assertEqual((stats['files_folded'], stats['evidence_removed']), (1, 1))
+        record = read_record(os.path.join(self.vault, "5219404_Panthera_leo.json"))
+        self.assertEqual([m['sub_type'] for m in record['sensory_modalities']], ["Scotopic Vision", "Hearing"])
+        self.assertEqual(len(record['sensory_modalities'][0]['evidence']), 1)
+        self.assertEqual(record['identity']['aliases'], ["African lion"])
+        self.assertEqual([op for _, _, op, _, _ in changes], ['DELETE', 'UPSERT'])
+
+    def test_files_resolving_to_one_target_are_merged(self):
+        # Unnumbered, but its identity carries the GBIF ID: it resolves to the numbered file's name
+        self.write("Panthera_leo.json", lion(modality("Mechanoreception", "Hearing")))
+        self.write("5219404_Panthera_leo.json", lion(modality("Photoreception", "Scotopic Vision")))
+        self.write("Puma.json", species("Puma", "Puma concolor", None, modality("Chemoreception", "Olfaction")))
+        stats, _ = self.compact('species')
+
+        self.assertEqual(self.files(), ["5219404_Panthera_leo.json", "Puma.json"])
+        record = read_record(os.path.join(self.vault, "5219404_Panthera_leo.json"))
+        self.assertEqual(sorted(m['sub_type'] for m in record['sensory_modalities']), ["Hearing", "Scotopic Vision"])
+        self.assertEqual((stats['records'], stats['files_folded']), (2, 1))
+
+    def test_family_placeholders_and_collisions(self):
+        self.write("Unknown.json", family("Unknown"))
+        self.write("9703_Felidae.json", family("Felidae", 9703, ["run-1"], vision="Tapetum lucidum."))
+        self.write("Felidae.json", family("Felidae", 9703, ["run-2"], hearing="Broad range."))
+        self.write("1_Ursidae.json", family("Ursidae", 1, ["run-1"], smell="Keen."))
+        self.write("2_Ursidae.json", family("Ursidae", 2, ["run-1"], smell="Keen."))
+        # Unnumbered with an ID that is already taken by a numbered file of the same name
+        self.write("Ursidae.json", family("Ursidae", 2, ["run-2"], hearing="Good."))
+        stats, _ = self.compact('family')
+
+        self.assertEqual(self.files(), ["1_Ursidae.json", "2_Ursidae.json", "9703_Felidae.json"])
+        self.assertEqual(stats['placeholders_removed'], 1)
+        felidae = read_record(os.path.join(self.vault, "9703_Felidae.json"))
+        self.assertEqual(sorted(felidae['sensory_modalities']), ["hearing", "vision"])
+        self.assertEqual(sorted(read_record(os.path.join(self.vault, "2_Ursidae.json"))['sensory_modalities']),
+                         ["hearing", "smell"])
+        self.assertEqual(sorted(read_record(os.path.join(self.vault, "1_Ursidae.json"))['sensory_modalities']), ["smell"])
+
+    def test_compact_records_are_left_untouched(self):
+        record = family("Felidae", 9703, ["run-b", "run-a"], vision="Tapetum lucidum.")
+        record["sensory_modalities"]["vision"]["frequency_range_hz"] = {"min": 1e-6, "max": 0.1}
+        path = os.path.join(self.vault, "9703_Felidae.json")
+        with open(path, 'w') as f:
+            # How older records spell small numbers; re-encoding would write 1e-06
+            f.write(json.dumps(record, indent=2).replace("1e-06", "1e-6"))
+        with open(path, 'rb') as f:
+            before = f.read()
+
+        stats, changes = self.compact('family')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(stats['bytes_after'], stats['bytes_before'])
+        self.assertEqual(changes, [])
+
+if __name__ == '__main__':
+    unittest.main()
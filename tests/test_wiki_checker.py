@@ -0,0 +1,66 @@
+import unittest
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from src.wiki_checker import WikiChecker, TITLES_PER_REQUEST
+
+PAGES = {"Canidae", "Red fox"}
+REDIRECTS = {"Vulpes vulpes": "Red fox"}
+
+class FakeMediaWiki:
+    """Answers action=query like the MediaWiki API (formatversion=2)."""
+    def __init__(self):
+        self.calls = []
+
+    def get_json(self, url, params):
+        titles = params["titles"].split("|")
+        self.calls.append(titles)
+        normalized = [{"from": t, "to": t[0].upper() + t[1:]} for t in titles if t[0].islower()]
+        names = [t[0].upper() + t[1:] for t in titles]
+        redirects = [{"from": t, "to": REDIRECTS[t]} for t in names if t in REDIRECTS]
+        targets = [REDIRECTS.get(t, t) for t in names]
+        pages = [{"title": t} if t in PAGES else {"title": t, "missing": True} for t in targets]
+        return {"query": {"normalized": normalized, "redirects": redirects, "pages": pages}}
+
+class TestWikiChecker(unittest.TestCase):
+    def setUp(self):
+        self.test_db = 'test_wiki_cache.db'
+
+    def tearDown(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def test_batches_follow_redirects_and_cache(self):
+        client = FakeMediaWiki()
+        checker = WikiChecker(client, self.test_db)
+        titles = ["canidae", "Vulpes vulpes", "Nothing here"] + [f"Taxon {i}" for i in range(60)]
+        result = checker.exists_many(titles)
+        self.assertTrue(result["canidae"])
+        self.assertTrue(result["Vulpes vulpes"])
+        self.assertFalse(result["Nothing here"])
+        self.assertEqual([len(c) for c in client.calls], [TITLES_PER_REQUEST, len(titles) - TITLES_PER_REQUEST])
+        checker.close()
+
+        # A new checker answers from the persistent cache, negatives included
+        client = FakeMediaWiki()
+        checker = WikiChecker(client, self.test_db)
+        self.assertEqual(checker.exists_many(titles), result)
+        self.assertEqual(client.calls, [])
+        self.assertFalse(checker.exists(None))
+        checker.close()
+
+    def test_negative_results_expire(self):
+        conn = sqlite3.connect(self.test_db)
+        WikiChecker(FakeMediaWiki(), self.test_db).close()
+        old = (datetime.now() - timedelta(days=365)).isoformat()
+        conn.execute("INSERT INTO wiki_titles VALUES ('Red fox', 0, NULL, ?)", (old,))
+        conn.commit()
+        conn.close()
+        client = FakeMediaWiki()
+        checker = WikiChecker(client, self.test_db)
+        self.assertTrue(checker.exists("Red fox"))
+        self.assertEqual(client.calls, [["Red fox"]])
+        checker.close()
+
+if __name__ == '__main__':
+    unittest.main()